@@ -0,0 +1,136 @@
+"""Pong rules for the batch simulator, plus a plain-Python reference.
+
+The vectorized functions mirror the p5.js logic in code_gen.get_game_logic()
+with the player's keyboard replaced by the per-instance key bitmask
+(KEY_UP / KEY_DOWN). `scalar_step` runs the same rules one instance at a time
+on dicts and serves as the baseline in bench_batch.py.
+"""
+import numpy as np
+
+KEY_UP = 0
+KEY_DOWN = 1
+
+def init_paddles(sim, p1, p2):
+    c = sim.config
+    p1.x = 40
+    p2.x = c['screen_width'] - 40 - c['paddle_width']
+    for p in (p1, p2):
+        p.y = c['screen_height'] / 2 - c['paddle_height'] / 2
+        p.width = c['paddle_width']
+        p.height = c['paddle_height']
+
+def init_ball(sim, b):
+    c = sim.config
+    b.x = c['screen_width'] / 2
+    b.y = c['screen_height'] / 2
+    b.radius = c['ball_radius']
+    b.speedX = c['ball_start_speed_x']
+    b.speedY = c['ball_start_speed_y']
+
+def init_score(sim, s):
+    s.p1 = 0
+    s.p2 = 0
+
+def move_paddle1(sim, p, out):
+    c = sim.config
+    out.assign(p)
+    dy = (sim.key_down(KEY_DOWN).astype(np.float32) - sim.key_down(KEY_UP)) * c['paddle_speed']
+    out.y = np.clip(p.y + dy, 0, c['screen_height'] - p.height)
+
+def move_paddle2(sim, p, b, out):
+    c = sim.config
+    out.assign(p)
+    center = p.y + p.height / 2
+    step = c['paddle_speed'] * 0.85
+    dy = np.where(b.y > center + 10, step, np.where(b.y < center - 10, -step, 0))
+    out.y = np.clip(p.y + dy, 0, c['screen_height'] - p.height)
+
+def move_ball(sim, b, p1, p2, out):
+    c = sim.config
+    out.assign(b)
+    out.x += b.speedX
+    out.y += b.speedY
+
+    wall = (out.y - out.radius <= 0) | (out.y + out.radius >= c['screen_height'])
+    out.speedY[wall] *= -1
+    out.y = np.where(wall, np.where(out.y <= 0, out.radius, c['screen_height'] - out.radius), out.y)
+
+    hit1 = ((out.speedX < 0) & (out.x - out.radius <= p1.x + p1.width) & (out.x + out.radius >= p1.x)
+            & (out.y >= p1.y) & (out.y <= p1.y + p1.height))
+    out.speedX[hit1] *= -1.05
+    out.x = np.where(hit1, p1.x + p1.width + out.radius, out.x)
+
+    hit2 = ((out.speedX > 0) & (out.x + out.radius >= p2.x) & (out.x - out.radius <= p2.x + p2.width)
+            & (out.y >= p2.y) & (out.y <= p2.y + p2.height))
+    out.speedX[hit2] *= -1.05
+    out.x = np.where(hit2, p2.x - out.radius, out.x)
+
+    # A ball leaving the screen is served again from the centre.
+    gone = (out.x < 0) | (out.x > c['screen_width'])
+    if gone.any():
+        out.x[gone] = c['screen_width'] / 2
+        out.y[gone] = c['screen_height'] / 2
+        out.speedX[gone] = c['ball_start_speed_x']
+        out.speedY[gone] = c['ball_start_speed_y']
+
+def check_score(sim, b, s, out):
+    out.p1 = s.p1 + (b.x > sim.config['screen_width'])
+    out.p2 = s.p2 + (b.x < 0)
+
+LOGIC = {
+    "InitPaddles": init_paddles,
+    "InitBall": init_ball,
+    "InitScore": init_score,
+    "MovePaddle1": move_paddle1,
+    "MovePaddle2": move_paddle2,
+    "MoveBall": move_ball,
+    "CheckScore": check_score,
+}
+
+# --- Plain-Python reference (one instance per call) ---
+
+def scalar_setup(c):
+    paddle = {"y": c['screen_height'] / 2 - c['paddle_height'] / 2, "width": c['paddle_width'], "height": c['paddle_height']}
+    return {
+        "paddle1": dict(paddle, x=40),
+        "paddle2": dict(paddle, x=c['screen_width'] - 40 - c['paddle_width']),
+        "ball": {"x": c['screen_width'] / 2, "y": c['screen_height'] / 2, "radius": c['ball_radius'],
+                 "speedX": c['ball_start_speed_x'], "speedY": c['ball_start_speed_y']},
+        "score": {"p1": 0, "p2": 0},
+    }
+
+def scalar_step(c, s, keys):
+    """One Loop tick for one instance; returns the new state dict."""
+    p1, p2, b, score = s["paddle1"], s["paddle2"], s["ball"], s["score"]
+
+    p1_out = dict(p1)
+    p1_out["y"] += (((keys >> KEY_DOWN) & 1) - ((keys >> KEY_UP) & 1)) * c['paddle_speed']
+    p1_out["y"] = max(0, min(c['screen_height'] - p1["height"], p1_out["y"]))
+
+    p2_out = dict(p2)
+    center = p2["y"] + p2["height"] / 2
+    if b["y"] > center + 10:
+        p2_out["y"] += c['paddle_speed'] * 0.85
+    elif b["y"] < center - 10:
+        p2_out["y"] -= c['paddle_speed'] * 0.85
+    p2_out["y"] = max(0, min(c['screen_height'] - p2["height"], p2_out["y"]))
+
+    b_out = dict(b)
+    b_out["x"] += b["speedX"]
+    b_out["y"] += b["speedY"]
+    if b_out["y"] - b_out["radius"] <= 0 or b_out["y"] + b_out["radius"] >= c['screen_height']:
+        b_out["speedY"] *= -1
+        b_out["y"] = b_out["radius"] if b_out["y"] <= 0 else c['screen_height'] - b_out["radius"]
+    if (b_out["speedX"] < 0 and b_out["x"] - b_out["radius"] <= p1["x"] + p1["width"] and b_out["x"] + b_out["radius"] >= p1["x"]
+            and p1["y"] <= b_out["y"] <= p1["y"] + p1["height"]):
+        b_out["speedX"] *= -1.05
+        b_out["x"] = p1["x"] + p1["width"] + b_out["radius"]
+    if (b_out["speedX"] > 0 and b_out["x"] + b_out["radius"] >= p2["x"] and b_out["x"] - b_out["radius"] <= p2["x"] + p2["width"]
+            and p2["y"] <= b_out["y"] <= p2["y"] + p2["height"]):
+        b_out["speedX"] *= -1.05
+        b_out["x"] = p2["x"] - b_out["radius"]
+    if b_out["x"] < 0 or b_out["x"] > c['screen_width']:
+        b_out = scalar_setup(c)["ball"]
+
+    score_out = {"p1": score["p1"] + (b["x"] > c['screen_width']), "p2": score["p2"] + (b["x"] < 0)}
+    return {"paddle1": p1_out, "paddle2": p2_out, "ball": b_out, "score": score_out}
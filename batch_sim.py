@@ -0,0 +1,204 @@
+"""Vectorized batch runtime for project specs.
+
+Runs many instances of one spec in lockstep from Python. Every table column is
+a NumPy array with a leading batch dimension, so a Logic function is written
+once against whole columns and updates all instances at the same time:
+
+    sim = BatchSim("pong.yaml", batch=10000)
+
+    @sim.logic("MoveBall")
+    def move_ball(sim, ball, paddle1, paddle2, ball_out):
+        ball_out.assign(ball)
+        ball_out.x += ball.speedX
+        ...
+
+    sim.setup()
+    sim.step(1000)
+
+Logic functions receive the simulator, their input tables (read-only _curr
+views) and then their output tables, in the order the spec declares them. As in
+the C backend's pointer mode, tables written in Loop live in two preallocated
+ping-pong slots, so an output holds stale data on entry and must be written in
+full; assigning to a column (`out.y = expr`) copies into the existing array.
+Branches are per-instance boolean masks (`np.where`, `out.x[mask] = ...`), and
+`sim.reset(mask)` re-runs Setup for just the masked instances.
+"""
+import numpy as np
+
+from code_gen import loop_written_tables
+from spec_ir import as_spec, load_spec_file
+
+DTYPES = {"float": np.float32, "int": np.int32, "bool": np.bool_}
+
+def allocate_table(table, batch):
+    """Zeroed column arrays for one table over the whole batch."""
+    columns = {}
+    if table.is_entity:
+        columns["count"] = np.zeros(batch, dtype=np.int32)
+    for col in table.columns.values():
+        dtype = DTYPES.get(col.type, np.float64)
+        if table.is_entity:
+            columns[col.name] = np.zeros((batch, table.capacity_value), dtype=dtype)
+        elif col.is_array:
+            columns[col.name] = np.zeros((batch, col.length), dtype=dtype)
+        elif col.is_bitgrid:
+            # The C layout: one row of 64-cell words per grid row
+            width, height = col.shape
+            columns[col.name] = np.zeros((batch, height, -(-width // 64)), dtype=np.uint64)
+        else:
+            columns[col.name] = np.zeros(batch, dtype=dtype)
+    return columns
+
+class TableView:
+    """Attribute access to one buffer of a table; assignments write in place."""
+
+    __slots__ = ("_name", "_columns")
+
+    def __init__(self, name, columns):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_columns", columns)
+
+    def __getattr__(self, col_name):
+        try:
+            return self._columns[col_name]
+        except KeyError:
+            raise AttributeError(f"table {self._name!r} has no column {col_name!r}") from None
+
+    def __setattr__(self, col_name, value):
+        if col_name not in self._columns:
+            raise AttributeError(f"table {self._name!r} has no column {col_name!r}")
+        np.copyto(self._columns[col_name], value, casting="unsafe")
+
+    def columns(self):
+        return self._columns
+
+    def assign(self, other):
+        """Copy every column from another view of the same table."""
+        for col_name, column in self._columns.items():
+            np.copyto(column, other._columns[col_name])
+
+    def assign_where(self, mask, other):
+        """Copy every column from `other` for the instances where mask is set."""
+        for col_name, column in self._columns.items():
+            row_mask = mask.reshape(mask.shape + (1,) * (column.ndim - 1))
+            np.copyto(column, other._columns[col_name], where=row_mask)
+
+class BatchSim:
+    """`batch` instances of one spec stepped together."""
+
+    def __init__(self, spec, batch, logic=None, seed=0):
+        if isinstance(spec, str) and spec.endswith((".yaml", ".yml")):
+            spec = load_spec_file(spec)
+        spec = as_spec(spec)
+        self.spec = spec
+        self.batch = batch
+        self.config = dict(spec.config)
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.zeros(batch, dtype=np.uint32)   # per-instance input bitmask
+        self.tick = 0
+        self.functions = spec.functions
+        self.procedures = spec.procedures
+        self.swapped = loop_written_tables(spec)
+        self._impl = {}
+        self._scratch = None
+
+        self._slots = {}
+        self._curr = {}
+        for table in spec.tables.values():
+            slots = [allocate_table(table, batch)]
+            if table.name in self.swapped:
+                slots.append(allocate_table(table, batch))
+            self._slots[table.name] = [TableView(table.name, columns) for columns in slots]
+            self._curr[table.name] = 0
+        for name, fn in (logic or {}).items():
+            self.register(name, fn)
+
+    # --- Logic registry ---
+
+    def register(self, name, fn):
+        if name not in self.functions:
+            raise KeyError(f"spec has no function {name!r}")
+        self._impl[name] = fn
+
+    def logic(self, name):
+        """Decorator form of register()."""
+        def decorator(fn):
+            self.register(name, fn)
+            return fn
+        return decorator
+
+    # --- State access ---
+
+    def curr(self, table_name):
+        return self._slots[table_name][self._curr[table_name]]
+
+    def next(self, table_name):
+        slots = self._slots[table_name]
+        return slots[(self._curr[table_name] + 1) % len(slots)]
+
+    def key_down(self, bit):
+        """Boolean mask of the instances holding key `bit` this tick."""
+        return ((self.keys >> np.uint32(bit)) & np.uint32(1)).astype(bool)
+
+    # --- Execution ---
+
+    def _call(self, func):
+        impl = self._impl.get(func.name)
+        if impl is None:
+            if not func.outputs:
+                return   # nothing to write, so an unregistered function is a no-op
+            raise KeyError(f"no batch implementation registered for {func.name!r}")
+        # Init functions fill the current buffer directly, like the C wrappers.
+        out_views = [self.curr(t.name) if func.is_init else self.next(t.name) for t in func.outputs]
+        impl(self, *[self.curr(t.name) for t in func.inputs], *out_views)
+
+    def run_procedure(self, proc_name):
+        proc = self.procedures.get(proc_name)
+        for func in (proc.functions if proc else ()):
+            self._call(func)
+        if proc_name == "Loop":
+            for table_name in self.swapped:
+                self._curr[table_name] ^= 1
+            self.tick += 1
+
+    def setup(self):
+        self.run_procedure("Setup")
+
+    def step(self, ticks=1, keys=None):
+        """Run Loop `ticks` times. `keys` may be an array of shape (ticks, batch)."""
+        for t in range(ticks):
+            if keys is not None:
+                np.copyto(self.keys, keys[t])
+            self.run_procedure("Loop")
+
+    def reset(self, mask):
+        """Re-run Setup for the instances where mask is True, leaving the rest alone."""
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return
+        if self._scratch is None:
+            # Setup runs into one extra single-buffered copy of the state,
+            # allocated on first use and reused afterwards.
+            self._scratch = {name: TableView(name, allocate_table(table, self.batch))
+                             for name, table in self.spec.tables.items()}
+        else:
+            # Zeroed like a fresh state, so an Init that writes only some
+            # columns cannot mask in rows left over from the previous reset.
+            for view in self._scratch.values():
+                for column in view.columns().values():
+                    column.fill(0)
+        setup = self.procedures.get('Setup')
+        for func in (setup.functions if setup else ()):
+            impl = self._impl.get(func.name)
+            if impl is None:
+                if not func.outputs:
+                    continue    # same rule as _call(): nothing to write
+                raise KeyError(f"no batch implementation registered for {func.name!r}")
+            impl(self, *[self._scratch[t.name] for t in func.inputs + func.outputs])
+        for name, view in self._scratch.items():
+            self.curr(name).assign_where(mask, view)
+
+    def snapshot(self, index):
+        """Plain-Python copy of one instance's _curr tables, handy for debugging."""
+        return {name: {col: array[index].tolist() for col, array in self.curr(name).columns().items()}
+                for name in self._slots}
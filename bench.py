@@ -0,0 +1,128 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+RESULTS_PATH = os.path.join("generated", "bench_results.json")
+BASELINE_PATH = "bench_baseline.json"
+
+def find_programs(projects):
+    if projects:
+        return [os.path.join("generated", f"{name}_code.c") for name in projects]
+    return sorted(glob.glob(os.path.join("generated", "*_code.c")))
+
+def compile_benchmark(c_path, build_dir, cc, cflags):
+    """Compile one generated program with its benchmark entry point enabled.
+
+    Logic implementations are taken from <project>_logic.c next to the spec when
+    it exists; otherwise the generated placeholder logic is used, and the
+    numbers measure only the framework (wrappers, swaps, procedures).
+    """
+    project = os.path.basename(c_path)[:-len("_code.c")]
+    binary = os.path.join(build_dir, f"{project}_bench")
+    sources = [c_path]
+    defines = ["-DPTF_BENCH"]
+    logic_path = f"{project}_logic.c"
+    if os.path.exists(logic_path):
+        sources.append(logic_path)
+    else:
+        defines.append("-DPTF_STUB_LOGIC")
+    cmd = [cc, *cflags, *defines, *sources, "-o", binary, "-lm", "-pthread"]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"compile failed: {' '.join(cmd)}\n{proc.stderr}")
+    return project, binary, "stub" if "-DPTF_STUB_LOGIC" in defines else logic_path
+
+def run_benchmark(binary, ticks, seed, runs):
+    """Run the binary `runs` times and keep the fastest (least disturbed) run."""
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run([binary, str(ticks), str(seed)], capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{binary} exited with {proc.returncode}\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or result["mean_ns"] < best["mean_ns"]:
+            best = result
+    return best
+
+def compare(results, baseline, threshold):
+    """Return human-readable regressions against the saved baseline."""
+    problems = []
+    for project, result in results.items():
+        base = baseline.get(project)
+        if base is None:
+            continue
+        for metric in ("mean_ns", "p50_ns", "p99_ns"):
+            if base[metric] > 0 and result[metric] > base[metric] * (1 + threshold):
+                change = (result[metric] / base[metric] - 1) * 100
+                problems.append(f"{project}: {metric} {base[metric]:.0f} -> {result[metric]:.0f} (+{change:.1f}%)")
+        same_run = (base.get("ticks"), base.get("seed"), base.get("logic")) == (result["ticks"], result["seed"], result["logic"])
+        if same_run and base.get("checksum") != result["checksum"]:
+            problems.append(f"{project}: final state checksum changed ({base.get('checksum')} -> {result['checksum']})")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and benchmark the generated C programs.")
+    parser.add_argument("projects", nargs="*", help="project names to benchmark (default: every generated/*_code.c)")
+    parser.add_argument("--ticks", type=int, default=100000, help="Loop ticks per run (default: 100000)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the input script (default: 1)")
+    parser.add_argument("--runs", type=int, default=3, help="runs per program; the fastest is kept (default: 3)")
+    parser.add_argument("--cc", default=os.environ.get("CC", "cc"), help="C compiler (default: $CC or cc)")
+    parser.add_argument("--cflags", default="-O2", help="compiler flags (default: -O2)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help=f"baseline file (default: {BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    if shutil.which(args.cc) is None:
+        print(f"C compiler {args.cc!r} not found.")
+        return 2
+
+    programs = find_programs(args.projects)
+    if not programs:
+        print("No generated C programs found; run code_gen.py first.")
+        return 2
+
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory() as build_dir:
+        for c_path in programs:
+            try:
+                project, binary, logic = compile_benchmark(c_path, build_dir, args.cc, args.cflags.split())
+                result = run_benchmark(binary, args.ticks, args.seed, args.runs)
+            except Exception as e:
+                print(f"  Error benchmarking {c_path}: {e}")
+                failed = True
+                continue
+            result["logic"] = logic
+            results[project] = result
+            print(f"{project:<12} mean {result['mean_ns']:>10.1f} ns  p50 {result['p50_ns']:>8} ns  "
+                  f"p99 {result['p99_ns']:>8} ns  checksum {result['checksum']}  ({logic} logic)")
+
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Wrote {RESULTS_PATH}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 1 if failed else 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.threshold)
+        for problem in problems:
+            print(f"  REGRESSION {problem}")
+        if problems:
+            return 1
+        print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%}).")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import argparse
+import time
+
+import numpy as np
+
+import batch_pong
+from batch_sim import BatchSim
+
+def bench_vectorized(batch, ticks, seed):
+    sim = BatchSim("pong.yaml", batch=batch, logic=batch_pong.LOGIC, seed=seed)
+    keys = np.random.default_rng(seed).integers(0, 4, size=(ticks, batch), dtype=np.uint32)
+    sim.setup()
+    start = time.perf_counter()
+    sim.step(ticks, keys=keys)
+    elapsed = time.perf_counter() - start
+    return batch * ticks / elapsed, sim
+
+def bench_scalar(instances, ticks, seed, config):
+    keys = np.random.default_rng(seed).integers(0, 4, size=(ticks, instances), dtype=np.uint32).tolist()
+    states = [batch_pong.scalar_setup(config) for _ in range(instances)]
+    start = time.perf_counter()
+    for t in range(ticks):
+        row = keys[t]
+        for i in range(instances):
+            states[i] = batch_pong.scalar_step(config, states[i], row[i])
+    elapsed = time.perf_counter() - start
+    return instances * ticks / elapsed, states
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the NumPy batch simulator with a per-instance Python loop (Pong).")
+    parser.add_argument("--batch", type=int, nargs="+", default=[100, 1000, 10000], help="batch sizes to try")
+    parser.add_argument("--ticks", type=int, default=200, help="Loop ticks per run (default: 200)")
+    parser.add_argument("--scalar-instances", type=int, default=500,
+                        help="instances for the Python loop baseline (its rate does not depend on batch size)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    _, sim = bench_vectorized(1, 1, args.seed)
+    scalar_rate, states = bench_scalar(args.scalar_instances, args.ticks, args.seed, sim.config)
+    print(f"{'python loop':>14}: {scalar_rate:14,.0f} instance-ticks/s")
+    for batch in args.batch:
+        rate, sim = bench_vectorized(batch, args.ticks, args.seed)
+        print(f"{'batch ' + str(batch):>14}: {rate:14,.0f} instance-ticks/s  ({rate / scalar_rate:6.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Scaling benchmark for the code generators.
+
+Synthesizes specs with N tables and N functions (N = 10, 1,000 and 100,000 by
+default, with every function in one long Loop procedure), then measures, for
+each backend and option set, the generation time and the peak Python memory
+of building the output as one string versus streaming it to a file-like
+object. A per-item time that keeps growing with N points at an accidentally
+quadratic pass.
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from code_gen import iter_c_code, iter_graph_json, iter_html_code, write_lines
+from spec_ir import compile_spec
+
+MODES = {
+    # backend -> option set name -> generator keyword arguments
+    "c": {
+        "default": {},
+        "all": {"buffers": "pointer", "threads": 4, "profile": True, "memoize": True},
+    },
+    "html": {
+        "default": {},
+        "all": {"buffers": "inplace", "profile": True, "memoize": True},
+    },
+    "graph": {
+        "default": {},
+    },
+}
+BACKENDS = {"c": iter_c_code, "html": iter_html_code, "graph": iter_graph_json}
+
+def synthesize_spec(n):
+    """A spec with n tables and n functions.
+
+    Every 10th table is an entity table and every 7th plain table carries an
+    array column. One Init function per 50 tables fills them in Setup; every
+    other function reads two tables and writes a third, all in a single Loop.
+    """
+    config = {"screen_width": 800, "screen_height": 600, "grid": 16, "max_rows": 64}
+    tables = {}
+    for i in range(n):
+        if i % 10 == 0:
+            tables[f"t{i}"] = {"kind": "entities", "capacity": "max_rows",
+                               "columns": {"x": "float", "y": "float", "alive": "bool"}}
+        else:
+            columns = {"a": "int", "b": "float", "flag": "bool"}
+            if i % 7 == 0:
+                columns["cells"] = "array[grid * grid]"
+            tables[f"t{i}"] = {"columns": columns}
+    names = list(tables)
+    functions = {}
+    setup, loop = [], []
+    for i in range(n):
+        if i % 50 == 0:
+            name = f"InitF{i}"
+            functions[name] = {"inputs": [], "outputs": names[i:i + 50]}
+            setup.append(name)
+        else:
+            name = f"F{i}"
+            functions[name] = {"inputs": [names[i - 1], names[(i * 7) % n]], "outputs": [names[i]],
+                               "pure": i % 3 != 0}
+            loop.append(name)
+    return {"project_name": f"Synthetic{n}", "config": config, "tables": tables,
+            "functions": functions, "procedures": {"Setup": setup, "Loop": loop}}
+
+class CountingSink:
+    """File-like object that only counts what is written to it."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text):
+        self.chars += len(text)
+
+def run_string(generator, spec, options):
+    return len("\n".join(generator(spec, **options)))
+
+def run_stream(generator, spec, options):
+    sink = CountingSink()
+    write_lines(sink, generator(spec, **options))
+    return sink.chars
+
+def measure(run, generator, spec, options, repeats, min_seconds):
+    """Best wall time over at least `repeats` runs, then peak traced memory in a separate run.
+
+    Fast cases keep repeating until `min_seconds` have been spent on them, so
+    the best time is not a single noisy sub-millisecond sample.
+    """
+    best = None
+    runs = 0
+    total = 0.0
+    while runs < repeats or total < min_seconds:
+        start = time.perf_counter()
+        chars = run(generator, spec, options)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        runs += 1
+        total += elapsed
+    # tracemalloc slows allocation-heavy code down a lot, so it gets its own run.
+    tracemalloc.start()
+    try:
+        run(generator, spec, options)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "runs": runs, "peak_bytes": peak, "chars": chars}
+
+def find_superlinear(results, sizes, max_growth, min_seconds):
+    """Flag runs whose time per item grew more than max_growth between two sizes.
+
+    Sizes below 1,000 are skipped; fixed costs dominate them. A pair is only
+    compared when the smaller size took at least min_seconds per run, since
+    timer noise and cache effects swamp the per-item time of shorter runs.
+    """
+    problems = []
+    by_key = {}
+    for row in results:
+        by_key.setdefault((row["backend"], row["mode"], row["emit"]), {})[row["size"]] = row["seconds"]
+    for (backend, mode, emit), times in by_key.items():
+        checked = [size for size in sizes if size >= 1000 and size in times]
+        for small, large in zip(checked, checked[1:]):
+            if times[small] < min_seconds:
+                continue
+            growth = (times[large] / large) / (times[small] / small)
+            if growth > max_growth:
+                problems.append(f"{backend}/{mode}/{emit}: time per item grew {growth:.1f}x from n={small} to n={large}")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure code generation time and peak memory on synthetic specs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="number of tables and functions per spec (default: 10 1000 100000)")
+    parser.add_argument("--backends", nargs="+", choices=sorted(BACKENDS), default=sorted(BACKENDS))
+    parser.add_argument("--repeats", type=int, default=3, help="minimum timed runs per case; the fastest is kept (default: 3)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="keep repeating a case until this many seconds were spent on it (default: 0.2)")
+    parser.add_argument("--min-compare", type=float, default=0.01,
+                        help="only compare per-item times when the smaller size took at least this many "
+                             "seconds per run (default: 0.01)")
+    parser.add_argument("--max-growth", type=float, default=2.0,
+                        help="allowed growth of time per item between sizes before flagging (default: 2.0)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'n':>7} {'backend':>7} {'mode':>7} {'emit':>6} {'seconds':>9} {'us/item':>8} {'peak MiB':>9} {'output MiB':>10}")
+    for size in args.sizes:
+        spec = compile_spec(synthesize_spec(size))
+        for backend in args.backends:
+            for mode, options in MODES[backend].items():
+                for emit, run in (("string", run_string), ("stream", run_stream)):
+                    row = measure(run, BACKENDS[backend], spec, options, args.repeats, args.min_time)
+                    row.update(size=size, backend=backend, mode=mode, emit=emit)
+                    results.append(row)
+                    print(f"{size:>7} {backend:>7} {mode:>7} {emit:>6} {row['seconds']:>9.3f} "
+                          f"{row['seconds'] / size * 1e6:>8.2f} {row['peak_bytes'] / 2**20:>9.1f} "
+                          f"{row['chars'] / 2**20:>10.1f}")
+                    sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    problems = find_superlinear(results, args.sizes, args.max_growth, args.min_compare)
+    for problem in problems:
+        print(f"SUPERLINEAR {problem}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
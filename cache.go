@@ -0,0 +1,170 @@
+package main
+
+import (
+	"os"
+	"path/filepath"
+	"sort"
+	"strings"
+	"sync"
+	"time"
+)
+
+// fileStamp identifies one version of a file without reading it. A missing
+// file has the zero stamp.
+type fileStamp struct {
+	modTime int64
+	size    int64
+}
+
+func statFile(path string) fileStamp {
+	info, err := os.Stat(path)
+	if err != nil {
+		return fileStamp{}
+	}
+	return fileStamp{info.ModTime().UnixNano(), info.Size()}
+}
+
+// listProjects returns the names of the project specs (*.yaml) in dir.
+func listProjects(dir string) []string {
+	paths, _ := filepath.Glob(filepath.Join(dir, "*.yaml"))
+	names := make([]string, 0, len(paths))
+	for _, path := range paths {
+		names = append(names, strings.TrimSuffix(filepath.Base(path), ".yaml"))
+	}
+	return names
+}
+
+// flightGroup collapses concurrent calls with the same key into one call
+// whose result every caller receives, like golang.org/x/sync/singleflight.
+type flightGroup struct {
+	mu    sync.Mutex
+	calls map[string]*flightCall
+}
+
+type flightCall struct {
+	done chan struct{}
+	val  string
+	err  error
+}
+
+// Do runs fn unless a call for key is already in flight, in which case it
+// waits for that call and returns its result.
+func (g *flightGroup) Do(key string, fn func() (string, error)) (string, error) {
+	g.mu.Lock()
+	if g.calls == nil {
+		g.calls = make(map[string]*flightCall)
+	}
+	if c, ok := g.calls[key]; ok {
+		g.mu.Unlock()
+		<-c.done
+		return c.val, c.err
+	}
+	c := &flightCall{done: make(chan struct{})}
+	g.calls[key] = c
+	g.mu.Unlock()
+
+	c.val, c.err = fn()
+
+	g.mu.Lock()
+	delete(g.calls, key)
+	g.mu.Unlock()
+	close(c.done)
+	return c.val, c.err
+}
+
+// Watcher polls a directory for changes to files with the given extensions.
+// A burst of changes is reported once, after nothing has changed for the
+// debounce interval, so an editor save (truncate, write, rename) triggers a
+// single reload.
+type Watcher struct {
+	dir      string
+	exts     []string
+	interval time.Duration
+	debounce time.Duration
+	onChange func(paths []string)
+	stop     chan struct{}
+	done     chan struct{}
+}
+
+// NewWatcher creates a watcher; call Start to begin polling.
+func NewWatcher(dir string, exts []string, interval, debounce time.Duration, onChange func(paths []string)) *Watcher {
+	return &Watcher{dir: dir, exts: exts, interval: interval, debounce: debounce, onChange: onChange,
+		stop: make(chan struct{}), done: make(chan struct{})}
+}
+
+// Start takes the initial listing and polls in the background until Stop.
+func (w *Watcher) Start() {
+	known := w.scan()
+	go w.run(known)
+}
+
+// Stop ends polling and waits for a pending onChange call to return.
+func (w *Watcher) Stop() {
+	close(w.stop)
+	<-w.done
+}
+
+func (w *Watcher) scan() map[string]fileStamp {
+	stamps := make(map[string]fileStamp)
+	entries, err := os.ReadDir(w.dir)
+	if err != nil {
+		return stamps
+	}
+	for _, entry := range entries {
+		if entry.IsDir() || !w.matches(entry.Name()) {
+			continue
+		}
+		path := filepath.Join(w.dir, entry.Name())
+		stamps[path] = statFile(path)
+	}
+	return stamps
+}
+
+func (w *Watcher) matches(name string) bool {
+	for _, ext := range w.exts {
+		if strings.HasSuffix(name, ext) {
+			return true
+		}
+	}
+	return false
+}
+
+func (w *Watcher) run(known map[string]fileStamp) {
+	defer close(w.done)
+	ticker := time.NewTicker(w.interval)
+	defer ticker.Stop()
+
+	pending := make(map[string]bool)
+	var lastChange time.Time
+	for {
+		select {
+		case <-w.stop:
+			return
+		case now := <-ticker.C:
+			current := w.scan()
+			for path, stamp := range current {
+				if old, ok := known[path]; !ok || old != stamp {
+					pending[path] = true
+					lastChange = now
+				}
+			}
+			for path := range known {
+				if _, ok := current[path]; !ok {
+					pending[path] = true
+					lastChange = now
+				}
+			}
+			known = current
+			if len(pending) == 0 || now.Sub(lastChange) < w.debounce {
+				continue
+			}
+			paths := make([]string, 0, len(pending))
+			for path := range pending {
+				paths = append(paths, path)
+			}
+			sort.Strings(paths)
+			pending = make(map[string]bool)
+			w.onChange(paths)
+		}
+	}
+}
@@ -1,145 +1,1605 @@
-import yaml
-import sys
-import os
+import argparse
+import concurrent.futures
 import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from spec_ir import SpecError, as_spec, load_spec_bytes
+
+# Bump whenever the shape of the generated code changes. The manifest also
+# records a hash of the generator sources, so local edits invalidate outputs
+# even when nobody remembers to bump this.
+GENERATOR_VERSION = "1"
+GENERATOR_SOURCES = [os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "spec_ir.py")]
+MANIFEST_NAME = "manifest.json"
+
+C_BUFFER_MODES = ("copy", "pointer")
+
+# Helpers for bitgrid columns, emitted before the table structs when a spec
+# has any; each column gets thin <Prefix>_<Column>Get()/... wrappers.
+C_BITGRID = """\
+// --- Bit Grids ---
+// Row y of a bitgrid column is words [y * words, (y + 1) * words), with cell x
+// at bit x % 64 of word x / 64. Bits past the width are always zero. Masks
+// hold one uint64 per row, bit i covering column x + i.
+#define PTF_BITGRID_WORDS(width) (((width) + 63) / 64)
+#if defined(__GNUC__)
+#define PTF_POPCOUNT64(v) __builtin_popcountll(v)
+#else
+static inline int PTF_POPCOUNT64(uint64_t v) { int n = 0; for (; v; v &= v - 1) n++; return n; }
+#endif
+static inline uint64_t Ptf_BitWordMask(int width, int w) {
+    int bits = width - 64 * w;
+    return bits <= 0 ? 0 : bits >= 64 ? ~0ull : (1ull << bits) - 1;
+}
+static inline bool Ptf_BitGet(const uint64_t *g, int width, int height, int x, int y) {
+    if (x < 0 || x >= width || y < 0 || y >= height) return false;
+    return (g[y * PTF_BITGRID_WORDS(width) + x / 64] >> (x % 64)) & 1u;
+}
+static inline void Ptf_BitSet(uint64_t *g, int width, int height, int x, int y, bool on) {
+    if (x < 0 || x >= width || y < 0 || y >= height) return;
+    uint64_t *word = &g[y * PTF_BITGRID_WORDS(width) + x / 64], bit = 1ull << (x % 64);
+    *word = on ? *word | bit : *word & ~bit;
+}
+static inline bool Ptf_BitRowFull(const uint64_t *g, int width, int y) {
+    const uint64_t *row = g + y * PTF_BITGRID_WORDS(width);
+    for (int w = 0; w < PTF_BITGRID_WORDS(width); w++) if (row[w] != Ptf_BitWordMask(width, w)) return false;
+    return true;
+}
+// Removes row y; the rows above it move down one and the top row is emptied.
+static inline void Ptf_BitClearRow(uint64_t *g, int width, int y) {
+    int words = PTF_BITGRID_WORDS(width);
+    memmove(g + words, g, sizeof(uint64_t) * words * y);
+    memset(g, 0, sizeof(uint64_t) * words);
+}
+// Removes every full row in one pass, moving the rest down; returns how many went.
+static inline int Ptf_BitClearFullRows(uint64_t *g, int width, int height) {
+    int words = PTF_BITGRID_WORDS(width), dst = height - 1;
+    for (int src = height - 1; src >= 0; src--) {
+        if (Ptf_BitRowFull(g, width, src)) continue;
+        if (dst != src) memcpy(g + dst * words, g + src * words, sizeof(uint64_t) * words);
+        dst--;
+    }
+    memset(g, 0, sizeof(uint64_t) * words * (dst + 1));
+    return dst + 1;
+}
+// True when mask row m placed at column x leaves the row or covers a set cell.
+static inline bool Ptf_BitRowHits(const uint64_t *row, int width, uint64_t m, int x) {
+    if (x < 0) {
+        if (x <= -64 || (m & ((1ull << -x) - 1))) return true;
+        m >>= -x;
+        x = 0;
+    }
+    if (x >= width) return true;
+    int w = x / 64, s = x % 64;
+    uint64_t lo = m << s, hi = s ? m >> (64 - s) : 0;
+    if (lo & ~Ptf_BitWordMask(width, w)) return true;
+    if (hi && (hi & ~Ptf_BitWordMask(width, w + 1))) return true;
+    return (row[w] & lo) || (hi && (row[w + 1] & hi));
+}
+// True when any set bit of the mask, placed with its first row at (x, y), falls
+// outside the grid or on a set cell.
+static inline bool Ptf_BitOverlaps(const uint64_t *g, int width, int height, const uint64_t *mask, int rows, int x, int y) {
+    for (int r = 0; r < rows; r++) {
+        if (!mask[r]) continue;
+        if (y + r < 0 || y + r >= height) return true;
+        if (Ptf_BitRowHits(g + (y + r) * PTF_BITGRID_WORDS(width), width, mask[r], x)) return true;
+    }
+    return false;
+}
+// Sets the cells under the mask at (x, y); bits outside the grid are dropped.
+static inline void Ptf_BitStamp(uint64_t *g, int width, int height, const uint64_t *mask, int rows, int x, int y) {
+    for (int r = 0; r < rows; r++) {
+        uint64_t m = mask[r];
+        int col = x;
+        if (!m || y + r < 0 || y + r >= height || col <= -64 || col >= width) continue;
+        if (col < 0) { m >>= -col; col = 0; }
+        uint64_t *row = g + (y + r) * PTF_BITGRID_WORDS(width);
+        int w = col / 64, s = col % 64;
+        row[w] |= (m << s) & Ptf_BitWordMask(width, w);
+        if (s && w + 1 < PTF_BITGRID_WORDS(width)) row[w + 1] |= (m >> (64 - s)) & Ptf_BitWordMask(width, w + 1);
+    }
+}
+static inline int Ptf_BitCount(const uint64_t *g, int width, int height) {
+    int n = 0;
+    for (int i = 0; i < PTF_BITGRID_WORDS(width) * height; i++) n += PTF_POPCOUNT64(g[i]);
+    return n;
+}
+"""
+
+# Rewind history for generate_c_code(snapshots=True); emitted after
+# Ptf_Serialize()/Ptf_Deserialize() and PTF_SNAPSHOT_SIZE.
+C_HISTORY = """\
+// --- Rewind History ---
+// Every tick is stored as the byte ranges that differ from the newest keyframe,
+// a full snapshot taken every PTF_KEYFRAME_INTERVAL ticks. Frames live in a
+// fixed byte ring; when it is full the oldest keyframe and its deltas go. A
+// keyframe group may fill at most half the ring, so the previous group always
+// survives.
+#ifndef PTF_KEYFRAME_INTERVAL
+#define PTF_KEYFRAME_INTERVAL 60
+#endif
+#ifndef PTF_HISTORY_FRAMES
+#define PTF_HISTORY_FRAMES 600
+#endif
+#ifndef PTF_HISTORY_BYTES
+#define PTF_HISTORY_BYTES (PTF_HISTORY_FRAMES / 4 * PTF_SNAPSHOT_SIZE)
+#endif
+typedef char ptf_history_holds_two_keyframes[PTF_HISTORY_BYTES >= 2 * PTF_SNAPSHOT_SIZE ? 1 : -1];
+
+// key is the sequence number of the frame's keyframe (its own for keyframes).
+typedef struct { long tick, key; size_t offset, size; } PtfFrame;
+static struct {
+    PtfFrame frames[PTF_HISTORY_FRAMES];
+    long first, next, key;   // sequence numbers: oldest frame, next frame, newest keyframe
+    size_t head;             // next free byte
+    size_t group_bytes;      // bytes used by the newest keyframe and its deltas
+    unsigned char bytes[PTF_HISTORY_BYTES];
+    unsigned char keyframe[PTF_SNAPSHOT_SIZE], current[PTF_SNAPSHOT_SIZE], delta[PTF_SNAPSHOT_SIZE];
+} ptf_history;
+long ptf_tick;
+
+#define PTF_FRAME(seq) (&ptf_history.frames[(seq) % PTF_HISTORY_FRAMES])
+
+// Records of [uint32 offset][uint32 length][bytes]; runs closer than 8 equal
+// bytes are merged. Returns SIZE_MAX when the delta would not be smaller than
+// a keyframe.
+static size_t Ptf_DeltaEncode(const unsigned char *cur, const unsigned char *key, unsigned char *out) {
+    size_t size = 0, i = 0;
+    while (i < PTF_SNAPSHOT_SIZE) {
+        if (cur[i] == key[i]) { i++; continue; }
+        size_t end = i + 1;
+        for (size_t j = i + 1; j < PTF_SNAPSHOT_SIZE && j - end < 8; j++) {
+            if (cur[j] != key[j]) end = j + 1;
+        }
+        uint32_t offset = (uint32_t)i, length = (uint32_t)(end - i);
+        if (size + 8 + length >= PTF_SNAPSHOT_SIZE) return SIZE_MAX;
+        memcpy(out + size, &offset, 4);
+        memcpy(out + size + 4, &length, 4);
+        memcpy(out + size + 8, cur + i, length);
+        size += 8 + length;
+        i = end;
+    }
+    return size;
+}
+
+static void Ptf_DeltaApply(unsigned char *dst, const unsigned char *delta, size_t size) {
+    for (size_t i = 0; i < size; ) {
+        uint32_t offset, length;
+        memcpy(&offset, delta + i, 4);
+        memcpy(&length, delta + i + 4, 4);
+        memcpy(dst + offset, delta + i + 8, length);
+        i += 8 + length;
+    }
+}
+
+static void Ptf_HistoryDropOldest(void) {
+    ptf_history.first++;
+    // Deltas are useless without their keyframe
+    while (ptf_history.first < ptf_history.next && PTF_FRAME(ptf_history.first)->key < ptf_history.first) {
+        ptf_history.first++;
+    }
+}
+
+// Offset of `size` free bytes, dropping the oldest frames that are in the way.
+static size_t Ptf_HistoryReserve(size_t size) {
+    size_t start = ptf_history.head;
+    if (start + size > PTF_HISTORY_BYTES) {
+        // Wrap around; everything stored past head is older than what is before it
+        while (ptf_history.first < ptf_history.next && PTF_FRAME(ptf_history.first)->offset >= start) {
+            Ptf_HistoryDropOldest();
+        }
+        start = 0;
+    }
+    while (ptf_history.first < ptf_history.next) {
+        const PtfFrame *oldest = PTF_FRAME(ptf_history.first);
+        if (oldest->offset >= start + size || oldest->offset + oldest->size <= start) break;
+        Ptf_HistoryDropOldest();
+    }
+    return start;
+}
+
+void Ptf_HistoryClear(void) {
+    ptf_history.first = ptf_history.next = ptf_history.key = 0;
+    ptf_history.head = ptf_history.group_bytes = 0;
+}
+
+// Appends the current state as frame ptf_tick.
+void Ptf_HistoryRecord(void) {
+    Ptf_Serialize(ptf_history.current);
+    if (ptf_history.next - ptf_history.first == PTF_HISTORY_FRAMES) Ptf_HistoryDropOldest();
+    bool keyframe = ptf_history.first == ptf_history.next || ptf_history.key < ptf_history.first
+        || ptf_tick - PTF_FRAME(ptf_history.key)->tick >= PTF_KEYFRAME_INTERVAL;
+    size_t size = keyframe ? SIZE_MAX : Ptf_DeltaEncode(ptf_history.current, ptf_history.keyframe, ptf_history.delta);
+    if (size != SIZE_MAX && ptf_history.group_bytes + size > PTF_HISTORY_BYTES / 2) size = SIZE_MAX;
+    size_t start = 0;
+    if (size != SIZE_MAX) {
+        start = Ptf_HistoryReserve(size);
+        keyframe = ptf_history.key < ptf_history.first;   // the reservation dropped our keyframe
+    }
+    if (keyframe || size == SIZE_MAX) {
+        keyframe = true;
+        size = PTF_SNAPSHOT_SIZE;
+        start = Ptf_HistoryReserve(size);
+        ptf_history.key = ptf_history.next;
+        ptf_history.group_bytes = 0;
+        memcpy(ptf_history.keyframe, ptf_history.current, PTF_SNAPSHOT_SIZE);
+    }
+    ptf_history.group_bytes += size;
+    memcpy(ptf_history.bytes + start, keyframe ? ptf_history.current : ptf_history.delta, size);
+    *PTF_FRAME(ptf_history.next) = (PtfFrame){ ptf_tick, ptf_history.key, start, size };
+    ptf_history.next++;
+    ptf_history.head = start + size;
+}
+
+// Oldest tick that Ptf_Rewind() can still reach, or -1 when the history is empty.
+long Ptf_HistoryFirstTick(void) {
+    return ptf_history.first < ptf_history.next ? PTF_FRAME(ptf_history.first)->tick : -1;
+}
+
+// Restores the state of `tick` and forgets every later frame, so the next Loop()
+// continues from there. Returns false when the tick is not in the history.
+bool Ptf_Rewind(long tick) {
+    for (long seq = ptf_history.next - 1; seq >= ptf_history.first; seq--) {
+        const PtfFrame *frame = PTF_FRAME(seq);
+        if (frame->tick != tick) continue;
+        const PtfFrame *key = PTF_FRAME(frame->key);
+        memcpy(ptf_history.keyframe, ptf_history.bytes + key->offset, PTF_SNAPSHOT_SIZE);
+        memcpy(ptf_history.current, ptf_history.keyframe, PTF_SNAPSHOT_SIZE);
+        if (frame != key) Ptf_DeltaApply(ptf_history.current, ptf_history.bytes + frame->offset, frame->size);
+        Ptf_Deserialize(ptf_history.current);
+        ptf_history.key = frame->key;
+        ptf_history.next = seq + 1;
+        ptf_history.head = frame->offset + frame->size;
+        ptf_history.group_bytes = 0;
+        for (long s = frame->key; s <= seq; s++) ptf_history.group_bytes += PTF_FRAME(s)->size;
+        ptf_tick = tick;
+        return true;
+    }
+    return false;
+}
+"""
+
+def loop_written_tables(spec):
+    """Tables written by at least one function called from the Loop procedure."""
+    loop = spec.procedures.get('Loop')
+    return {table.name for func in (loop.functions if loop else ()) for table in func.outputs}
+
+def written_tables(spec):
+    """Tables written by non-Init functions, i.e. tables that can change after Setup."""
+    return {table.name for proc in spec.procedures.values() for func in proc.functions
+            if not func.is_init for table in func.outputs}
+
+def memoized_functions(spec):
+    """Functions whose wrapper may skip the Logic call when no input table changed.
+
+    A function qualifies when it is pure, is not an Init function, has outputs,
+    and is the only writer of each of them; a skipped call then leaves its
+    previous result in place.
+    """
+    writers = {}
+    for proc in spec.procedures.values():
+        for func in proc.functions:
+            if not func.is_init:
+                for table in func.outputs:
+                    writers.setdefault(table.name, set()).add(func.name)
+    return {func.name for func in spec.functions.values()
+            if func.pure and not func.is_init and func.outputs
+            and all(writers.get(table.name) == {func.name} for table in func.outputs)}
+
+def bitgrid_macro(table, col):
+    """Prefix of the C macros and JS constants describing a bitgrid column."""
+    return f"{table.name.upper()}_{col.name.upper()}"
+
+JS_TYPED_ARRAYS = {"float": "Float32Array", "int": "Int32Array", "bool": "Uint8Array"}
+JS_ELEMENT_BYTES = {"Float32Array": 4, "Int32Array": 4, "Uint8Array": 1, "Float64Array": 8}
+
+# The C_BITGRID helpers for p5.js. Columns are Uint32Arrays, so words hold 32
+# cells, and a mask is an array of row numbers.
+JS_BITGRID = """\
+    // --- Bit Grids ---
+    // Row y of a bitgrid column is words [y * words, (y + 1) * words) of a
+    // Uint32Array, with cell x at bit x % 32 of word x >> 5. Bits past the width
+    // are always zero. Masks are arrays of row bits, bit i covering column x + i.
+    function Ptf_BitWords(width) { return (width + 31) >> 5; }
+    function Ptf_BitWordMask(width, w) {
+        const bits = width - 32 * w;
+        return bits <= 0 ? 0 : bits >= 32 ? 0xFFFFFFFF : (1 << bits >>> 0) - 1;
+    }
+    function Ptf_BitGet(g, width, height, x, y) {
+        if (x < 0 || x >= width || y < 0 || y >= height) return false;
+        return ((g[y * Ptf_BitWords(width) + (x >> 5)] >>> (x & 31)) & 1) === 1;
+    }
+    function Ptf_BitSet(g, width, height, x, y, on) {
+        if (x < 0 || x >= width || y < 0 || y >= height) return;
+        const i = y * Ptf_BitWords(width) + (x >> 5), bit = 1 << (x & 31);
+        g[i] = on ? g[i] | bit : g[i] & ~bit;
+    }
+    function Ptf_BitRowFull(g, width, y) {
+        const words = Ptf_BitWords(width);
+        for (let w = 0; w < words; w++) if (g[y * words + w] !== Ptf_BitWordMask(width, w)) return false;
+        return true;
+    }
+    // Removes row y; the rows above it move down one and the top row is emptied.
+    function Ptf_BitClearRow(g, width, y) {
+        const words = Ptf_BitWords(width);
+        g.copyWithin(words, 0, y * words);
+        g.fill(0, 0, words);
+    }
+    // Removes every full row in one pass, moving the rest down; returns how many went.
+    function Ptf_BitClearFullRows(g, width, height) {
+        const words = Ptf_BitWords(width);
+        let dst = height - 1;
+        for (let src = height - 1; src >= 0; src--) {
+            if (Ptf_BitRowFull(g, width, src)) continue;
+            if (dst !== src) g.copyWithin(dst * words, src * words, (src + 1) * words);
+            dst--;
+        }
+        g.fill(0, 0, words * (dst + 1));
+        return dst + 1;
+    }
+    // True when mask row m placed at column x leaves the row or covers a set cell.
+    function Ptf_BitRowHits(g, start, width, m, x) {
+        if (x < 0) {
+            if (x <= -32 || (m & ((1 << -x) - 1))) return true;
+            m >>>= -x;
+            x = 0;
+        }
+        if (x >= width) return true;
+        const w = x >> 5, s = x & 31;
+        const lo = (m << s) >>> 0, hi = s ? m >>> (32 - s) : 0;
+        if ((lo & ~Ptf_BitWordMask(width, w)) || (hi & ~Ptf_BitWordMask(width, w + 1))) return true;
+        return (g[start + w] & lo) !== 0 || (hi !== 0 && (g[start + w + 1] & hi) !== 0);
+    }
+    // True when any set bit of the mask, placed with its first row at (x, y), falls
+    // outside the grid or on a set cell.
+    function Ptf_BitOverlaps(g, width, height, mask, x, y) {
+        for (let r = 0; r < mask.length; r++) {
+            if (!mask[r]) continue;
+            if (y + r < 0 || y + r >= height) return true;
+            if (Ptf_BitRowHits(g, (y + r) * Ptf_BitWords(width), width, mask[r], x)) return true;
+        }
+        return false;
+    }
+    // Sets the cells under the mask at (x, y); bits outside the grid are dropped.
+    function Ptf_BitStamp(g, width, height, mask, x, y) {
+        for (let r = 0; r < mask.length; r++) {
+            let m = mask[r] >>> 0, col = x;
+            if (!m || y + r < 0 || y + r >= height || col <= -32 || col >= width) continue;
+            if (col < 0) { m >>>= -col; col = 0; }
+            const start = (y + r) * Ptf_BitWords(width), w = col >> 5, s = col & 31;
+            g[start + w] |= (m << s) & Ptf_BitWordMask(width, w);
+            if (s && w + 1 < Ptf_BitWords(width)) g[start + w + 1] |= (m >>> (32 - s)) & Ptf_BitWordMask(width, w + 1);
+        }
+    }
+    function Ptf_BitCount(g) {
+        let n = 0;
+        for (let i = 0; i < g.length; i++) {
+            let v = g[i];
+            v = v - ((v >>> 1) & 0x55555555);
+            v = (v & 0x33333333) + ((v >>> 2) & 0x33333333);
+            n += Math.imul((v + (v >>> 4)) & 0x0F0F0F0F, 0x01010101) >>> 24;
+        }
+        return n;
+    }
+"""
+
+# Rewind history for generate_html_code(snapshots=True), the same scheme as
+# C_HISTORY; emitted after Ptf_Serialize()/Ptf_Deserialize().
+JS_HISTORY = """\
+    // --- Rewind History ---
+    // Every tick is stored as the byte ranges that differ from the newest keyframe,
+    // a full snapshot taken every PTF_KEYFRAME_INTERVAL ticks. Frames live in a
+    // fixed byte ring; when it is full the oldest keyframe and its deltas go. A
+    // keyframe group may fill at most half the ring, so the previous group always
+    // survives.
+    const PTF_KEYFRAME_INTERVAL = 60;
+    const PTF_HISTORY_FRAMES = 600;
+    const PTF_HISTORY_BYTES = Math.max(2, Math.floor(PTF_HISTORY_FRAMES / 4)) * PTF_SNAPSHOT_SIZE;
+    const ptfHistory = {
+        // Per frame, by sequence number modulo PTF_HISTORY_FRAMES; key is the
+        // sequence number of the frame's keyframe (its own for keyframes).
+        tick: new Float64Array(PTF_HISTORY_FRAMES),
+        key: new Float64Array(PTF_HISTORY_FRAMES),
+        offset: new Uint32Array(PTF_HISTORY_FRAMES),
+        size: new Uint32Array(PTF_HISTORY_FRAMES),
+        first: 0, next: 0, keySeq: 0,   // oldest frame, next frame, newest keyframe
+        head: 0, groupBytes: 0,         // next free byte; bytes of the newest keyframe group
+        bytes: new Uint8Array(PTF_HISTORY_BYTES),
+        keyframe: new Uint8Array(PTF_SNAPSHOT_SIZE),
+        current: new Uint8Array(PTF_SNAPSHOT_SIZE),
+        delta: new Uint8Array(PTF_SNAPSHOT_SIZE),
+    };
+    let ptfTick = 0;
+
+    // Records of [uint32 offset][uint32 length][bytes]; runs closer than 8 equal
+    // bytes are merged. Returns -1 when the delta would not be smaller than a keyframe.
+    function Ptf_DeltaEncode(cur, key, out) {
+        const view = new DataView(out.buffer, out.byteOffset, out.byteLength);
+        let size = 0, i = 0;
+        while (i < PTF_SNAPSHOT_SIZE) {
+            if (cur[i] === key[i]) { i++; continue; }
+            let end = i + 1;
+            for (let j = i + 1; j < PTF_SNAPSHOT_SIZE && j - end < 8; j++) {
+                if (cur[j] !== key[j]) end = j + 1;
+            }
+            const length = end - i;
+            if (size + 8 + length >= PTF_SNAPSHOT_SIZE) return -1;
+            view.setUint32(size, i, true);
+            view.setUint32(size + 4, length, true);
+            out.set(cur.subarray(i, end), size + 8);
+            size += 8 + length;
+            i = end;
+        }
+        return size;
+    }
 
-def generate_c_code(data):
-    project_name = data.get('project_name', 'Unnamed Project')
-    code = []
-    code.append(f"// Generated Code for Project: {project_name}")
-    code.append("#include <stdbool.h>")
-    code.append("#include <stdio.h>")
-    code.append("#include <stdlib.h>")
-    code.append("#include <math.h>\n")
-
-    if 'config' in data:
-        code.append("// --- Configuration Constants ---")
-        for key, value in data['config'].items():
+    function Ptf_DeltaApply(dst, delta) {
+        const view = new DataView(delta.buffer, delta.byteOffset, delta.byteLength);
+        for (let i = 0; i < delta.length; ) {
+            const offset = view.getUint32(i, true), length = view.getUint32(i + 4, true);
+            dst.set(delta.subarray(i + 8, i + 8 + length), offset);
+            i += 8 + length;
+        }
+    }
+
+    function Ptf_HistoryDropOldest() {
+        const h = ptfHistory;
+        h.first++;
+        // Deltas are useless without their keyframe
+        while (h.first < h.next && h.key[h.first % PTF_HISTORY_FRAMES] < h.first) h.first++;
+    }
+
+    // Offset of `size` free bytes, dropping the oldest frames that are in the way.
+    function Ptf_HistoryReserve(size) {
+        const h = ptfHistory;
+        let start = h.head;
+        if (start + size > PTF_HISTORY_BYTES) {
+            // Wrap around; everything stored past head is older than what is before it
+            while (h.first < h.next && h.offset[h.first % PTF_HISTORY_FRAMES] >= start) Ptf_HistoryDropOldest();
+            start = 0;
+        }
+        while (h.first < h.next) {
+            const oldest = h.first % PTF_HISTORY_FRAMES;
+            if (h.offset[oldest] >= start + size || h.offset[oldest] + h.size[oldest] <= start) break;
+            Ptf_HistoryDropOldest();
+        }
+        return start;
+    }
+
+    function Ptf_HistoryClear() {
+        const h = ptfHistory;
+        h.first = h.next = h.keySeq = 0;
+        h.head = h.groupBytes = 0;
+    }
+
+    // Appends the current state as frame ptfTick.
+    function Ptf_HistoryRecord() {
+        const h = ptfHistory;
+        Ptf_Serialize(h.current);
+        if (h.next - h.first === PTF_HISTORY_FRAMES) Ptf_HistoryDropOldest();
+        let keyframe = h.first === h.next || h.keySeq < h.first
+            || ptfTick - h.tick[h.keySeq % PTF_HISTORY_FRAMES] >= PTF_KEYFRAME_INTERVAL;
+        let size = keyframe ? -1 : Ptf_DeltaEncode(h.current, h.keyframe, h.delta);
+        if (size !== -1 && h.groupBytes + size > PTF_HISTORY_BYTES / 2) size = -1;
+        let start = 0;
+        if (size !== -1) {
+            start = Ptf_HistoryReserve(size);
+            keyframe = h.keySeq < h.first;   // the reservation dropped our keyframe
+        }
+        if (keyframe || size === -1) {
+            keyframe = true;
+            size = PTF_SNAPSHOT_SIZE;
+            start = Ptf_HistoryReserve(size);
+            h.keySeq = h.next;
+            h.groupBytes = 0;
+            h.keyframe.set(h.current);
+        }
+        h.groupBytes += size;
+        h.bytes.set((keyframe ? h.current : h.delta).subarray(0, size), start);
+        const slot = h.next % PTF_HISTORY_FRAMES;
+        h.tick[slot] = ptfTick;
+        h.key[slot] = h.keySeq;
+        h.offset[slot] = start;
+        h.size[slot] = size;
+        h.next++;
+        h.head = start + size;
+    }
+
+    // Oldest tick that Ptf_Rewind() can still reach, or -1 when the history is empty.
+    function Ptf_HistoryFirstTick() {
+        const h = ptfHistory;
+        return h.first < h.next ? h.tick[h.first % PTF_HISTORY_FRAMES] : -1;
+    }
+
+    // Restores the state of `tick` and forgets every later frame, so the next Loop()
+    // continues from there. Returns false when the tick is not in the history.
+    function Ptf_Rewind(tick) {
+        const h = ptfHistory;
+        for (let seq = h.next - 1; seq >= h.first; seq--) {
+            const slot = seq % PTF_HISTORY_FRAMES;
+            if (h.tick[slot] !== tick) continue;
+            const keySeq = h.key[slot], key = keySeq % PTF_HISTORY_FRAMES;
+            h.keyframe.set(h.bytes.subarray(h.offset[key], h.offset[key] + PTF_SNAPSHOT_SIZE));
+            h.current.set(h.keyframe);
+            if (seq !== keySeq) Ptf_DeltaApply(h.current, h.bytes.subarray(h.offset[slot], h.offset[slot] + h.size[slot]));
+            Ptf_Deserialize(h.current);
+            h.keySeq = keySeq;
+            h.next = seq + 1;
+            h.head = h.offset[slot] + h.size[slot];
+            h.groupBytes = 0;
+            for (let s = keySeq; s <= seq; s++) h.groupBytes += h.size[s % PTF_HISTORY_FRAMES];
+            ptfTick = tick;
+            return true;
+        }
+        return false;
+    }
+"""
+
+def analyze_procedure(procedure):
+    """Build the read/write dependency picture for one procedure.
+
+    Functions read _curr and write _next, so a later function never sees an
+    earlier function's output within the same tick. Those pairs are reported as
+    RAW hazards, and functions writing the same table as WAW hazards (the later
+    write wins). Init functions also land their output in _curr, so for them
+    reads are real dependencies.
+
+    Stages group functions that can run concurrently without changing the
+    result of running them in order: a function goes one stage after the
+    latest earlier function it conflicts with (same output table, or a _curr
+    write paired with any access to that table).
+    """
+    hazards = []
+    stages = []
+    last_writer = {}        # table -> most recent writer in this procedure
+    write_stage = {}        # table -> latest stage that writes it
+    read_stage = {}         # table -> latest stage that reads it
+    curr_write_stage = {}   # table -> latest stage that writes its _curr
+
+    for func in procedure.functions:
+        inputs = [table.name for table in func.inputs]
+        outputs = [table.name for table in func.outputs]
+
+        for table in inputs:
+            writer = last_writer.get(table)
+            if writer is not None and not writer.is_init:
+                hazards.append({"kind": "RAW", "table": table, "writer": writer.name, "reader": func.name,
+                                "detail": f"{func.name} reads {table}_curr and does not see {writer.name}'s write to {table}_next"})
+        for table in outputs:
+            writer = last_writer.get(table)
+            if writer is not None:
+                hazards.append({"kind": "WAW", "table": table, "writer": writer.name, "overwriter": func.name,
+                                "detail": f"{func.name} overwrites {writer.name}'s write to {table}"})
+
+        after = -1
+        for table in outputs:
+            after = max(after, write_stage.get(table, -1))
+            if func.is_init:
+                after = max(after, read_stage.get(table, -1))
+        for table in inputs:
+            after = max(after, curr_write_stage.get(table, -1))
+        stage = after + 1
+        if stage == len(stages):
+            stages.append([])
+        stages[stage].append(func.name)
+
+        for table in inputs:
+            read_stage[table] = max(read_stage.get(table, -1), stage)
+        for table in outputs:
+            write_stage[table] = max(write_stage.get(table, -1), stage)
+            if func.is_init:
+                curr_write_stage[table] = max(curr_write_stage.get(table, -1), stage)
+            last_writer[table] = func
+
+    return {"functions": [func.name for func in procedure.functions], "hazards": hazards, "stages": stages}
+
+def analyze_dataflow(data):
+    """Dataflow report for every procedure, suitable for json.dumps."""
+    spec = as_spec(data)
+    return {
+        "project_name": spec.project_name,
+        "procedures": {proc.name: analyze_procedure(proc) for proc in spec.procedures.values()},
+    }
+
+# Canvas graph geometry in CSS pixels. ui/script.js sizes node elements from
+# the artifact, and ui/style.css fixes the title and details line heights.
+GRAPH_NODE_WIDTH = 220
+GRAPH_HEADER_HEIGHT = 71    # padding, borders and title
+GRAPH_LINE_HEIGHT = 18      # one details line
+GRAPH_LAYER_GAP = 140
+GRAPH_NODE_GAP = 30
+GRAPH_MARGIN = 50
+GRAPH_SWEEPS = 8
+GRAPH_SWEEP_LIMIT = 2000    # nodes; larger graphs keep spec order within each layer
+
+def dataflow_graph(spec):
+    """Canvas nodes (tables, then functions, in spec order) and edges.
+
+    A function gets an "input" edge from every table it reads and an "output"
+    edge to every table it writes. Edges refer to nodes by index.
+    """
+    nodes, table_ids = [], {}
+    for table in spec.tables.values():
+        details = [f"capacity: {table.capacity_value}"] if table.is_entity else []
+        for col in table.columns.values():
+            if col.is_array:
+                kind = f"array[{col.length}]"
+            elif col.is_bitgrid:
+                kind = f"bitgrid[{col.shape[0]}, {col.shape[1]}]"
+            else:
+                kind = col.type
+            details.append(f"{col.name}: {kind}")
+        table_ids[table.name] = len(nodes)
+        nodes.append({"kind": "table", "name": table.name, "details": details})
+    edges = []
+    for func in spec.functions.values():
+        index = len(nodes)
+        nodes.append({"kind": "function", "name": func.name, "details": [
+            "in: " + (", ".join(table.name for table in func.inputs) or "none"),
+            "out: " + (", ".join(table.name for table in func.outputs) or "none"),
+        ]})
+        edges.extend({"from": table_ids[table.name], "to": index, "kind": "input"} for table in func.inputs)
+        edges.extend({"from": index, "to": table_ids[table.name], "kind": "output"} for table in func.outputs)
+    return nodes, edges
+
+def feedback_edges(count, edges):
+    """Indices of the edges to reverse so the graph becomes acyclic.
+
+    Nodes are numbered by breadth-first distance from the nodes without
+    incoming edges (Init functions, tables nothing writes), and every edge
+    that does not lead further away is reversed. For a Loop function that
+    writes a table it reads, that is the write, which feeds the next tick.
+    A cycle with no way in is entered at its first node in node order.
+    """
+    out = [[] for _ in range(count)]
+    has_input = [False] * count
+    for edge in edges:
+        out[edge["from"]].append(edge["to"])
+        has_input[edge["to"]] = True
+    distance = [None] * count
+    sources = [v for v in range(count) if not has_input[v]]
+    for roots in [sources] + [[v] for v in range(count)]:
+        roots = [v for v in roots if distance[v] is None]
+        for v in roots:
+            distance[v] = 0
+        frontier = roots
+        for u in frontier:      # frontier grows while it is walked
+            for v in out[u]:
+                if distance[v] is None:
+                    distance[v] = distance[u] + 1
+                    frontier.append(v)
+    return {i for i, edge in enumerate(edges) if distance[edge["to"]] <= distance[edge["from"]]}
+
+def count_crossings(pairs, width):
+    """Crossings among edges between two adjacent layers, given as (upper, lower) positions."""
+    tree = [0] * (width + 1)    # Fenwick tree over lower positions seen so far
+    crossings = 0
+    for seen, (_, lower) in enumerate(sorted(pairs)):
+        i, at_or_before = lower + 1, 0
+        while i > 0:
+            at_or_before += tree[i]
+            i -= i & -i
+        crossings += seen - at_or_before
+        i = lower + 1
+        while i <= width:
+            tree[i] += 1
+            i += i & -i
+    return crossings
+
+def layout_graph(spec):
+    """Layered left-to-right layout of the dataflow graph for the canvas view.
+
+    Feedback edges are reversed to make the graph acyclic, nodes are put on
+    the layer after their deepest predecessor, and layers are reordered by
+    alternating barycenter sweeps, keeping the order with the fewest crossings
+    between adjacent layers. Long edges get no dummy nodes: a neighbour
+    several layers away counts at its relative position in its own layer,
+    which keeps every sweep linear in the size of the graph. Graphs with more
+    than GRAPH_SWEEP_LIMIT nodes skip the sweeps, whose crossing counts
+    dominate the layout time, and keep nodes in spec order.
+    """
+    nodes, edges = dataflow_graph(spec)
+    count = len(nodes)
+    flipped = feedback_edges(count, edges)
+    preds = [[] for _ in range(count)]
+    succs = [[] for _ in range(count)]
+    for i, edge in enumerate(edges):
+        u, v = (edge["to"], edge["from"]) if i in flipped else (edge["from"], edge["to"])
+        succs[u].append(v)
+        preds[v].append(u)
+
+    # Longest-path layering in topological order
+    layer_of = [0] * count
+    waiting = [len(p) for p in preds]
+    ready = [v for v in range(count) if not waiting[v]]
+    for u in ready:     # ready grows while it is walked
+        for v in succs[u]:
+            layer_of[v] = max(layer_of[v], layer_of[u] + 1)
+            waiting[v] -= 1
+            if not waiting[v]:
+                ready.append(v)
+    layers = [[] for _ in range(max(layer_of, default=-1) + 1)]
+    for v in range(count):
+        layers[layer_of[v]].append(v)
+
+    position = [0] * count
+    rank = [0.0] * count    # position scaled to [0, 1), comparable across layers
+
+    def place(layer):
+        for i, v in enumerate(layer):
+            position[v] = i
+            rank[v] = i / len(layer)
+
+    def crossings():
+        total = 0
+        for depth, upper in enumerate(layers[:-1]):
+            pairs = [(position[u], position[v]) for u in upper for v in succs[u] if layer_of[v] == depth + 1]
+            total += count_crossings(pairs, len(layers[depth + 1]))
+        return total
+
+    for layer in layers:
+        place(layer)
+    best, best_layers = crossings(), [list(layer) for layer in layers]
+    for sweep in range(GRAPH_SWEEPS if count <= GRAPH_SWEEP_LIMIT else 0):
+        if best == 0:
+            break
+        adjacent = preds if sweep % 2 == 0 else succs
+        for layer in (layers[1:] if sweep % 2 == 0 else layers[-2::-1]):
+            keys = {v: sum(rank[u] for u in adjacent[v]) / len(adjacent[v]) if adjacent[v] else rank[v]
+                    for v in layer}
+            layer.sort(key=keys.__getitem__)    # stable, so ties keep their order
+            place(layer)
+        current = crossings()
+        if current < best:
+            best, best_layers = current, [list(layer) for layer in layers]
+
+    heights = [GRAPH_HEADER_HEIGHT + GRAPH_LINE_HEIGHT * len(node["details"]) for node in nodes]
+    spans = [sum(heights[v] for v in layer) + GRAPH_NODE_GAP * (len(layer) - 1) for layer in best_layers]
+    tallest = max(spans, default=0)
+    for depth, layer in enumerate(best_layers):
+        # Center each layer on the tallest one
+        y = GRAPH_MARGIN + (tallest - spans[depth]) // 2
+        for order, v in enumerate(layer):
+            nodes[v].update(layer=depth, order=order, x=GRAPH_MARGIN + depth * (GRAPH_NODE_WIDTH + GRAPH_LAYER_GAP),
+                            y=y, w=GRAPH_NODE_WIDTH, h=heights[v])
+            y += heights[v] + GRAPH_NODE_GAP
+    width = len(best_layers) * (GRAPH_NODE_WIDTH + GRAPH_LAYER_GAP) - GRAPH_LAYER_GAP if best_layers else 0
+    return {"project_name": spec.project_name, "width": width + 2 * GRAPH_MARGIN,
+            "height": tallest + 2 * GRAPH_MARGIN, "crossings": best, "nodes": nodes, "edges": edges}
+
+def iter_graph_json(data):
+    """Yield the lines of the canvas graph artifact (layout_graph() as JSON), one node or edge per line."""
+    graph = layout_graph(as_spec(data))
+    yield "{"
+    for key in ("project_name", "width", "height", "crossings"):
+        yield f"{json.dumps(key)}: {json.dumps(graph[key])},"
+    for key, closing in (("nodes", "],"), ("edges", "]")):
+        items = graph[key]
+        yield f'"{key}": ['
+        for i, item in enumerate(items):
+            yield json.dumps(item) + ("," if i + 1 < len(items) else "")
+        yield closing
+    yield "}"
+
+def generate_graph_json(data):
+    """Return the canvas graph artifact as a string; see iter_graph_json()."""
+    return "\n".join(iter_graph_json(data))
+
+def c_index_storage(table, head, tail):
+    """The macros and storage struct of a table's spatial index, between head and tail."""
+    index, macro = table.index, table.index.macro
+    yield f"#define {macro}_CELL_SIZE ({index.cell_size})"
+    yield f"#define {macro}_COLS {index.cols}"
+    yield f"#define {macro}_ROWS {index.rows}"
+    yield f"#define {macro}_CELLS ({macro}_COLS * {macro}_ROWS)"
+    yield f"#define {macro}_CAPACITY ({index.capacity})"
+    yield head
+    yield f"    int count[{macro}_CELLS];      // rows per cell"
+    yield f"    int head[{macro}_CELLS];       // first row of each cell, -1 when empty"
+    yield f"    int free[{macro}_CELLS];       // empty cells, unordered"
+    yield f"    int free_slot[{macro}_CELLS];  // position of each cell in free, -1 when occupied"
+    yield f"    int next[{macro}_CAPACITY], prev[{macro}_CAPACITY];"
+    yield f"    int cell[{macro}_CAPACITY];    // cell of each row, -1 when outside the grid"
+    yield "    int free_count, indexed;"
+    yield "    bool ready;"
+    yield tail
+
+# ptf_fields type names of the column types, as understood by native_sim.py
+C_FIELD_TYPES = {"int": "int32", "float": "float32", "double": "float64", "bool": "bool"}
+
+def c_library_interface(spec):
+    """The exported entry points and field layout of the library target."""
+    yield "// --- Library Interface ---"
+    yield "// Callers own the GameStates: zero them before the first ptf_setup(). Key"
+    yield "// masks are tick-major, inputs[t * count + i] for instance i at tick t."
+    yield "PTF_EXPORT size_t ptf_state_size(void) { return sizeof(GameState); }\n"
+    yield "PTF_EXPORT void ptf_setup(GameState *s) {"
+    yield "    ptf_state = s;"
+    yield "    Setup();"
+    yield "}\n"
+    yield "PTF_EXPORT void ptf_setup_n(GameState *states, int count) {"
+    yield "    for (int i = 0; i < count; i++) ptf_setup(&states[i]);"
+    yield "}\n"
+    yield "// Runs `ticks` Loop() ticks on each of `count` consecutive states, one"
+    yield "// instance at a time so its tables stay in cache. inputs may be NULL."
+    yield "PTF_EXPORT void ptf_step_n(GameState *states, int count, int ticks, const unsigned int *inputs) {"
+    yield "    for (int i = 0; i < count; i++) {"
+    yield "        ptf_state = &states[i];"
+    yield "        for (int t = 0; t < ticks; t++) {"
+    yield "            ptf_input.keys = inputs ? inputs[(size_t)t * count + i] : 0u;"
+    yield "            Loop();"
+    yield "        }"
+    yield "    }"
+    yield "}\n"
+    yield "PTF_EXPORT void ptf_seed(unsigned int seed) { srand(seed); }\n"
+    yield "// Where each _curr column lives inside a GameState: an array of `type` with"
+    yield "// `ndim` dimensions (0 for a scalar) starting at `offset`."
+    yield "typedef struct { const char *table, *column, *type; size_t offset; int ndim; size_t shape[2]; } PtfField;"
+    yield "PTF_EXPORT const PtfField ptf_fields[] = {"
+    for table in spec.tables.values():
+        base = f"offsetof(GameState, {table.name}_curr"
+        if table.is_entity:
+            yield f'    {{"{table.name}", "count", "int32", {base}.count), 0, {{0, 0}}}},'
+        for col in table.columns.values():
+            if table.is_entity:
+                shape = f"1, {{{table.capacity_macro}, 0}}"
+            elif col.is_array:
+                shape = f"1, {{{col.size}, 0}}"
+            elif col.is_bitgrid:
+                macro = bitgrid_macro(table, col)
+                shape = f"2, {{{macro}_HEIGHT, PTF_BITGRID_WORDS({macro}_WIDTH)}}"
+            else:
+                shape = "0, {0, 0}"
+            ctype = "uint64" if col.is_bitgrid else C_FIELD_TYPES[col.type]
+            yield f'    {{"{table.name}", "{col.name}", "{ctype}", {base}.{col.name}), {shape}}},'
+    yield "};"
+    yield "PTF_EXPORT const int ptf_field_count = sizeof ptf_fields / sizeof ptf_fields[0];\n"
+    yield "PTF_EXPORT void *ptf_field(GameState *s, int field) {"
+    yield "    return (char *)s + ptf_fields[field].offset;"
+    yield "}"
+
+def iter_c_code(data, buffers="copy", threads=0, profile=False, memoize=False, snapshots=False, library=False):
+    """Yield the lines of the C source for a Spec, a parsed spec dict or raw YAML text.
+
+    buffers="copy" keeps one _curr and one _next struct per table and copies
+    _next into _curr on every swap. buffers="pointer" gives tables written in
+    Loop two storage slots and flips _curr/_next pointers instead; every other
+    table gets a single slot and is never swapped. In pointer mode Logic
+    functions take const pointers to their inputs and fill pointers to their
+    outputs, which hold stale data on entry and must be written in full.
+
+    threads > 1 runs each procedure as the stages from analyze_procedure() on a
+    pthread pool of that many threads (the caller included), with a barrier
+    between stages. Single-function stages run inline.
+
+    profile=True times every wrapper, procedure and Swap_Buffers() with
+    clock_gettime, counts bytes copied by swaps and writes the counters as JSON
+    on exit (to $PTF_PROFILE_OUT, default ptf_profile.json). Without it no
+    profiling code is emitted at all.
+
+    memoize=True gives every table a version that changes only when a swap
+    (or Setup) actually changes its _curr contents. Wrappers of
+    memoized_functions() return early when no input version moved since their
+    last run, and swaps skip tables that were not written or came out equal.
+
+    snapshots=True adds Ptf_Serialize()/Ptf_Deserialize() over the _curr
+    tables (PTF_SNAPSHOT_SIZE bytes) and records every tick into the rewind
+    history of C_HISTORY, with Ptf_Rewind(tick) to restore one.
+
+    library=True builds a shared library instead of a program: every instance
+    is an explicit GameState (tables, input and spatial indexes) owned by the
+    caller, and the exported ptf_* functions set up and step arrays of them.
+    ptf_fields describes where each _curr column lives inside a GameState, so
+    bindings such as native_sim.py can view a batch of states in place. It
+    needs copy buffers and no threads, profiling, memoization or snapshots;
+    copying a GameState already gives a snapshot.
+    """
+    spec = as_spec(data)
+    if buffers not in C_BUFFER_MODES:
+        raise ValueError(f"unknown buffer mode {buffers!r} (expected one of {C_BUFFER_MODES})")
+    if library:
+        unsupported = [name for name, on in (("pointer buffers", buffers == "pointer"), ("threads", threads > 1),
+                                             ("profile", profile), ("memoize", memoize), ("snapshots", snapshots)) if on]
+        if unsupported:
+            raise ValueError(f"the library target does not support {', '.join(unsupported)}")
+    pointer = buffers == "pointer"
+    st = "ptf_state->" if library else "state."   # how generated code reaches the tables
+    tables = spec.tables.values()
+    swapped = loop_written_tables(spec) if pointer else set(spec.tables)
+    memoized = memoized_functions(spec) if memoize else set()
+    changing = written_tables(spec) if memoize else set()
+    yield f"// Generated Code for Project: {spec.project_name}"
+    # pthread barriers and clock_gettime (profiling and the PTF_BENCH main) are
+    # POSIX extensions, hidden by strict -std=c11 unless requested before any include
+    yield "#define _POSIX_C_SOURCE 200809L"
+    yield "#include <stdbool.h>"
+    yield "#include <stdio.h>"
+    yield "#include <stdlib.h>"
+    yield "#include <string.h>"
+    yield "#include <math.h>"
+    if threads > 1:
+        yield "#include <pthread.h>"
+        yield "#include <stdatomic.h>"
+    if profile:
+        yield "#include <signal.h>"
+        yield "#include <time.h>"
+    bitgrids = [(table, col) for table in tables for col in table.columns.values() if col.is_bitgrid]
+    if snapshots or bitgrids:
+        yield "#include <stdint.h>"
+    if library:
+        yield "#include <stddef.h>"
+        yield "#if defined(_WIN32)"
+        yield "#define PTF_EXPORT __declspec(dllexport)"
+        yield "#else"
+        yield "#define PTF_EXPORT __attribute__((visibility(\"default\")))"
+        yield "#endif"
+    yield ""
+
+    if spec.config:
+        yield "// --- Configuration Constants ---"
+        for key, value in spec.config.items():
             # Handle float values by adding .0f if not present
             if isinstance(value, float):
-                code.append(f"#define {key.upper()} {value}f")
+                yield f"#define {key.upper()} {value}f"
             else:
-                code.append(f"#define {key.upper()} {value}")
-        code.append("")
-
-    code.append("// --- Table Structures ---")
-    for table_name, table_data in data.get('tables', {}).items():
-        struct_name = f"{table_name.replace('_', '').capitalize()}Table"
-        code.append(f"typedef struct {{")
-        for col_name, col_type in table_data['columns'].items():
-            if col_type == 'array':
-                 code.append(f"    int {col_name}[100];")
+                yield f"#define {key.upper()} {value}"
+        yield ""
+
+    if bitgrids:
+        yield C_BITGRID
+    for table, col in bitgrids:
+        macro, name = bitgrid_macro(table, col), f"{table.prefix}_{col.name[0].upper()}{col.name[1:]}"
+        width, height = (f"{macro}_WIDTH", f"{macro}_HEIGHT")
+        yield f"#define {width} ({col.dims[0]})"
+        yield f"#define {height} ({col.dims[1]})"
+        yield f"#define {macro}_WORDS ({height} * PTF_BITGRID_WORDS({width}))"
+        yield f"static inline bool {name}Get(const uint64_t *g, int x, int y) {{ return Ptf_BitGet(g, {width}, {height}, x, y); }}"
+        yield f"static inline void {name}Set(uint64_t *g, int x, int y, bool on) {{ Ptf_BitSet(g, {width}, {height}, x, y, on); }}"
+        yield f"static inline bool {name}RowFull(const uint64_t *g, int y) {{ return Ptf_BitRowFull(g, {width}, y); }}"
+        yield f"static inline void {name}ClearRow(uint64_t *g, int y) {{ Ptf_BitClearRow(g, {width}, y); }}"
+        yield f"static inline int {name}ClearFullRows(uint64_t *g) {{ return Ptf_BitClearFullRows(g, {width}, {height}); }}"
+        yield (f"static inline bool {name}Overlaps(const uint64_t *g, const uint64_t *mask, int rows, int x, int y)"
+               f" {{ return Ptf_BitOverlaps(g, {width}, {height}, mask, rows, x, y); }}")
+        yield (f"static inline void {name}Stamp(uint64_t *g, const uint64_t *mask, int rows, int x, int y)"
+               f" {{ Ptf_BitStamp(g, {width}, {height}, mask, rows, x, y); }}")
+        yield f"static inline int {name}Count(const uint64_t *g) {{ return Ptf_BitCount(g, {width}, {height}); }}"
+    if bitgrids:
+        yield ""
+
+    yield "// --- Table Structures ---"
+    for table in tables:
+        if table.is_entity:
+            # Structure-of-arrays: one contiguous column per field plus the
+            # number of live rows.
+            yield f"#define {table.capacity_macro} ({table.capacity})"
+            yield f"typedef struct {{"
+            yield f"    int count;"
+            for col in table.columns.values():
+                yield f"    {col.type} {col.name}[{table.capacity_macro}];"
+            yield f"}} {table.struct_name};\n"
+            continue
+        yield f"typedef struct {{"
+        for col in table.columns.values():
+            if col.is_array:
+                 yield f"    {col.type} {col.name}[{col.size}];"
+            elif col.is_bitgrid:
+                 yield f"    uint64_t {col.name}[{bitgrid_macro(table, col)}_WORDS];"
             else:
-                 code.append(f"    {col_type} {col_name};")
-        code.append(f"}} {struct_name};\n")
-
-    code.append("// --- Global State (Double Buffering) ---")
-    code.append("struct GameState {")
-    for table_name in data.get('tables', {}):
-        struct_name = f"{table_name.replace('_', '').capitalize()}Table"
-        code.append(f"    {struct_name} {table_name}_curr;")
-        code.append(f"    {struct_name} {table_name}_next;")
-    code.append("} state;\n")
-
-    code.append("// --- Pure Logic Prototypes ---")
-    for func_name, func_data in data.get('functions', {}).items():
-        outputs = func_data.get('outputs', [])
-        inputs = func_data.get('inputs', [])
-
-        if len(outputs) == 1:
-            ret_type = f"{outputs[0].replace('_', '').capitalize()}Table"
+                 yield f"    {col.type} {col.name};"
+        yield f"}} {table.struct_name};\n"
+
+    entity_tables = [table for table in tables if table.is_entity]
+    if entity_tables:
+        yield "// --- Entity Table Helpers ---"
+        for table in entity_tables:
+            struct_name, prefix = table.struct_name, table.prefix
+            columns = list(table.columns)
+            yield f"#define {table.name.upper()}_FOR_EACH(table, i) for (int i = 0; i < (table)->count; i++)"
+            yield f"static inline int {prefix}_Push({struct_name} *t) {{"
+            yield f"    return t->count < {table.capacity_macro} ? t->count++ : -1;"
+            yield "}"
+            yield f"static inline void {prefix}_Remove({struct_name} *t, int i) {{"
+            yield "    int last = --t->count;"
+            for col_name in columns:
+                yield f"    t->{col_name}[i] = t->{col_name}[last];"
+            yield "}"
+            yield f"static inline void {prefix}_Copy({struct_name} *dst, const {struct_name} *src) {{"
+            yield "    dst->count = src->count;"
+            for col_name in columns:
+                yield f"    memcpy(dst->{col_name}, src->{col_name}, sizeof(src->{col_name}[0]) * src->count);"
+            yield "}"
+            if memoize:
+                yield f"static inline bool {prefix}_Equal(const {struct_name} *a, const {struct_name} *b) {{"
+                yield "    return a->count == b->count"
+                for i, col_name in enumerate(columns):
+                    end = ";" if i == len(columns) - 1 else ""
+                    yield f"        && memcmp(a->{col_name}, b->{col_name}, sizeof(a->{col_name}[0]) * a->count) == 0{end}"
+                yield "}"
+            yield ""
+
+    if library:
+        yield "// --- Instance State ---"
+        yield "// Everything one game instance owns lives in its GameState, so a caller can"
+        yield "// run many of them side by side and copy or branch them byte for byte."
+        yield "typedef struct { unsigned int keys; } PtfInput;"
+        for table in tables:
+            if table.index:
+                yield from c_index_storage(table, "typedef struct {", f"}} {table.prefix}Index;")
+        yield "typedef struct GameState {"
+        for table in tables:
+            yield f"    {table.struct_name} {table.name}_curr;"
+            yield f"    {table.struct_name} {table.name}_next;"
+        for table in tables:
+            if table.index:
+                yield f"    {table.prefix}Index {table.name}_index;"
+        yield "    PtfInput input;"
+        yield "} GameState;\n"
+        yield "// The instance the current call works on; per thread, so threads can step"
+        yield "// separate batches at the same time."
+        yield "static _Thread_local GameState *ptf_state;"
+        yield "#define ptf_input (ptf_state->input)"
+        yield "#define PTF_KEY_DOWN(bit) ((ptf_input.keys >> (bit)) & 1u)\n"
+    else:
+        yield "// --- Global State (Double Buffering) ---"
+        yield "struct GameState {"
+        for table in tables:
+            if pointer:
+                slots = 2 if table.name in swapped else 1
+                yield f"    {table.struct_name} {table.name}_slots[{slots}];"
+                yield f"    {table.struct_name} *{table.name}_curr;"
+                yield f"    {table.struct_name} *{table.name}_next;"
+            else:
+                yield f"    {table.struct_name} {table.name}_curr;"
+                yield f"    {table.struct_name} {table.name}_next;"
+        if pointer:
+            yield "} state = {"
+            for table in tables:
+                next_slot = 1 if table.name in swapped else 0
+                yield f"    .{table.name}_curr = &state.{table.name}_slots[0],"
+                yield f"    .{table.name}_next = &state.{table.name}_slots[{next_slot}],"
+            yield "};\n"
         else:
-            ret_type = "void"
+            yield "} state;\n"
 
-        params = []
-        for inp in inputs:
-             params.append(f"{inp.replace('_', '').capitalize()}Table {inp}_in")
-        
-        if len(outputs) > 1:
-            for out in outputs:
-                params.append(f"{out.replace('_', '').capitalize()}Table* {out}_out")
+        yield "// --- Input ---"
+        yield "// One bit per key; filled by the platform layer (or the benchmark's input script)."
+        yield "typedef struct { unsigned int keys; } PtfInput;"
+        yield "PtfInput ptf_input;"
+        yield "#define PTF_KEY_DOWN(bit) ((ptf_input.keys >> (bit)) & 1u)\n"
+
+    indexed_tables = [table for table in tables if table.index]
+    if indexed_tables:
+        yield "// --- Spatial Indexes ---"
+        yield "// A uniform grid per indexed table that always describes its _curr rows."
+        yield "// Swaps relink only the rows whose cell changed."
+    for table in indexed_tables:
+        index, prefix, macro = table.index, table.prefix, table.index.macro
+        if library:
+            # The storage is part of each GameState, so copying a state copies its index
+            idx = f"ptf_state->{table.name}_index"
+        else:
+            idx = f"{table.name}_index"
+            yield from c_index_storage(table, "static struct {", f"}} {idx};\n")
+        yield f"int {prefix}_CellOf(double x, double y) {{"
+        yield "    if (!(x >= 0 && y >= 0)) return -1;"
+        yield f"    int col = (int)(x / {macro}_CELL_SIZE), row = (int)(y / {macro}_CELL_SIZE);"
+        yield f"    return col < {macro}_COLS && row < {macro}_ROWS ? row * {macro}_COLS + col : -1;"
+        yield "}"
+        yield f"double {prefix}_CellX(int cell) {{ return (cell % {macro}_COLS) * (double){macro}_CELL_SIZE; }}"
+        yield f"double {prefix}_CellY(int cell) {{ return (cell / {macro}_COLS) * (double){macro}_CELL_SIZE; }}"
+        yield f"int {prefix}_CellCount(int cell) {{ return cell >= 0 ? {idx}.count[cell] : 0; }}"
+        yield f"bool {prefix}_Occupied(double x, double y) {{ return {prefix}_CellCount({prefix}_CellOf(x, y)) > 0; }}"
+        yield f"// Rows in a cell: for (int i = {prefix}_FirstInCell(cell); i >= 0; i = {prefix}_NextInCell(i))"
+        yield f"int {prefix}_FirstInCell(int cell) {{ return cell >= 0 ? {idx}.head[cell] : -1; }}"
+        yield f"int {prefix}_NextInCell(int row) {{ return {idx}.next[row]; }}"
+        yield "// Rows in the cells at most `radius` cells away from (x, y). Stores up to max"
+        yield "// of them in rows and returns how many there are."
+        yield f"int {prefix}_Near(double x, double y, int radius, int *rows, int max) {{"
+        yield f"    int col = (int)floor(x / {macro}_CELL_SIZE), row = (int)floor(y / {macro}_CELL_SIZE), n = 0;"
+        yield f"    for (int r = row - radius > 0 ? row - radius : 0; r <= row + radius && r < {macro}_ROWS; r++) {{"
+        yield f"        for (int c = col - radius > 0 ? col - radius : 0; c <= col + radius && c < {macro}_COLS; c++) {{"
+        yield f"            for (int i = {idx}.head[r * {macro}_COLS + c]; i >= 0; i = {idx}.next[i]) {{"
+        yield "                if (n < max) rows[n] = i;"
+        yield "                n++;"
+        yield "            }"
+        yield "        }"
+        yield "    }"
+        yield "    return n;"
+        yield "}"
+        yield "// A uniformly chosen empty cell, or -1 when every cell is occupied."
+        yield f"int {prefix}_RandomFreeCell(void) {{"
+        yield f"    return {idx}.free_count ? {idx}.free[rand() % {idx}.free_count] : -1;"
+        yield "}"
+        yield f"static void {prefix}_IndexMove(int i, int cell) {{"
+        yield f"    int old = {idx}.cell[i];"
+        yield "    if (old == cell) return;"
+        yield "    if (old >= 0) {"
+        yield f"        if ({idx}.prev[i] >= 0) {idx}.next[{idx}.prev[i]] = {idx}.next[i]; else {idx}.head[old] = {idx}.next[i];"
+        yield f"        if ({idx}.next[i] >= 0) {idx}.prev[{idx}.next[i]] = {idx}.prev[i];"
+        yield f"        if (--{idx}.count[old] == 0) {{ {idx}.free_slot[old] = {idx}.free_count; {idx}.free[{idx}.free_count++] = old; }}"
+        yield "    }"
+        yield "    if (cell >= 0) {"
+        yield f"        {idx}.prev[i] = -1;"
+        yield f"        {idx}.next[i] = {idx}.head[cell];"
+        yield f"        if ({idx}.head[cell] >= 0) {idx}.prev[{idx}.head[cell]] = i;"
+        yield f"        {idx}.head[cell] = i;"
+        yield f"        if ({idx}.count[cell]++ == 0) {{"
+        yield f"            int slot = {idx}.free_slot[cell], last = {idx}.free[--{idx}.free_count];"
+        yield f"            {idx}.free[slot] = last;"
+        yield f"            {idx}.free_slot[last] = slot;"
+        yield f"            {idx}.free_slot[cell] = -1;"
+        yield "        }"
+        yield "    }"
+        yield f"    {idx}.cell[i] = cell;"
+        yield "}"
+        yield f"static void {prefix}_IndexUpdate(const {table.struct_name} *t) {{"
+        yield f"    if (!{idx}.ready) {{"
+        yield f"        for (int c = 0; c < {macro}_CELLS; c++) {{ {idx}.count[c] = 0; {idx}.head[c] = -1; {idx}.free[c] = c; {idx}.free_slot[c] = c; }}"
+        yield f"        for (int i = 0; i < {macro}_CAPACITY; i++) {idx}.cell[i] = -1;"
+        yield f"        {idx}.free_count = {macro}_CELLS;"
+        yield f"        {idx}.indexed = 0;"
+        yield f"        {idx}.ready = true;"
+        yield "    }"
+        yield f"    int n = t->{index.count} < 0 ? 0 : t->{index.count} > {macro}_CAPACITY ? {macro}_CAPACITY : t->{index.count};"
+        yield f"    for (int i = 0; i < n; i++) {prefix}_IndexMove(i, {prefix}_CellOf(t->{index.x.name}[i], t->{index.y.name}[i]));"
+        yield f"    for (int i = n; i < {idx}.indexed; i++) {prefix}_IndexMove(i, -1);"
+        yield f"    {idx}.indexed = n;"
+        yield "}\n"
 
+    if memoize:
+        yield "// --- Table Versions ---"
+        yield "// A version is the clock value of the last change to a table's _curr;"
+        yield "// a memoized wrapper remembers the clock of its last run."
+        yield "static unsigned long long ptf_clock = 1;"
+        for table in tables:
+            yield f"static unsigned long long ptf_version_{table.name} = 1;"
+        for table in tables:
+            if table.name in changing:
+                yield f"static bool ptf_written_{table.name};"
+        for func_name in spec.functions:
+            if func_name in memoized:
+                yield f"static unsigned long long ptf_ran_{func_name};"
+        yield ""
+
+    yield "// --- Pure Logic Prototypes ---"
+    signatures = []
+    for func in spec.functions.values():
+        if pointer:
+            ret_type = "void"
+            params = [f"const {table.struct_name}* {table.name}_in" for table in func.inputs]
+            params += [f"{table.struct_name}* {table.name}_out" for table in func.outputs]
+        else:
+            ret_type = func.outputs[0].struct_name if len(func.outputs) == 1 else "void"
+            params = [f"{table.struct_name} {table.name}_in" for table in func.inputs]
+            if len(func.outputs) > 1:
+                params += [f"{table.struct_name}* {table.name}_out" for table in func.outputs]
         param_str = ", ".join(params)
-        code.append(f"{ret_type} Logic_{func_name}({param_str});")
-    code.append("")
+        yield f"{ret_type} Logic_{func.name}({param_str});"
+        signatures.append((func, ret_type, param_str))
+    yield ""
+
+    # Placeholder bodies so a spec can be built and benchmarked before its
+    # logic exists: each output is a copy of the same-named input, else zeroed.
+    yield "#ifdef PTF_STUB_LOGIC"
+    for func, ret_type, param_str in signatures:
+        yield f"{ret_type} Logic_{func.name}({param_str}) {{"
+        for table in func.inputs:
+            yield f"    (void){table.name}_in;"
+        if ret_type != "void":
+            out = func.outputs[0].name
+            if func.outputs[0] in func.inputs:
+                yield f"    return {out}_in;"
+            else:
+                yield f"    {ret_type} {out}_out;"
+                yield f"    memset(&{out}_out, 0, sizeof {out}_out);"
+                yield f"    return {out}_out;"
+        else:
+            for table in func.outputs:
+                if table in func.inputs:
+                    yield f"    *{table.name}_out = {'*' if pointer else ''}{table.name}_in;"
+                else:
+                    yield f"    memset({table.name}_out, 0, sizeof *{table.name}_out);"
+        yield "}"
+    yield "#endif\n"
 
-    code.append("// --- Generated Wrappers ---")
-    for func_name, func_data in data.get('functions', {}).items():
-        inputs = func_data.get('inputs', [])
-        outputs = func_data.get('outputs', [])
+    functions = list(spec.functions)
+    procedures = list(spec.procedures)
+    if profile:
+        yield "// --- Profiling Counters ---"
+        yield "typedef struct { const char *name; unsigned long long calls, total_ns, max_ns, bytes; } PtfCounter;"
+        names = ", ".join(f'{{"{name}"}}' for name in functions) or "{0}"
+        yield f"static PtfCounter ptf_wrapper_counters[] = {{ {names} }};"
+        names = ", ".join(f'{{"{name}"}}' for name in procedures) or "{0}"
+        yield f"static PtfCounter ptf_procedure_counters[] = {{ {names} }};"
+        yield 'static PtfCounter ptf_swap_counter = { "Swap_Buffers" };\n'
+        yield "static unsigned long long Ptf_ProfileNow(void) {"
+        yield "    struct timespec ts;"
+        yield "    clock_gettime(CLOCK_MONOTONIC, &ts);"
+        yield "    return (unsigned long long)ts.tv_sec * 1000000000ull + (unsigned long long)ts.tv_nsec;"
+        yield "}\n"
+        yield "static void Ptf_ProfileRecord(PtfCounter *counter, unsigned long long start) {"
+        yield "    unsigned long long elapsed = Ptf_ProfileNow() - start;"
+        yield "    counter->calls++;"
+        yield "    counter->total_ns += elapsed;"
+        yield "    if (elapsed > counter->max_ns) counter->max_ns = elapsed;"
+        yield "}\n"
+        yield "static void Ptf_ProfileWriteGroup(FILE *out, const char *group, const PtfCounter *counters, int count) {"
+        yield '    fprintf(out, "  \\"%s\\": {", group);'
+        yield "    for (int i = 0; i < count; i++) {"
+        yield '        fprintf(out, "%s\\n    \\"%s\\": {\\"calls\\": %llu, \\"total_ns\\": %llu, \\"max_ns\\": %llu, \\"bytes\\": %llu}",'
+        yield '                i ? "," : "", counters[i].name, counters[i].calls, counters[i].total_ns, counters[i].max_ns, counters[i].bytes);'
+        yield "    }"
+        yield '    fprintf(out, "\\n  }");'
+        yield "}\n"
+        yield "static void Ptf_ProfileDump(void) {"
+        yield '    const char *path = getenv("PTF_PROFILE_OUT");'
+        yield '    FILE *out = fopen(path ? path : "ptf_profile.json", "w");'
+        yield "    if (!out) return;"
+        yield '    fprintf(out, "{\\n");'
+        yield f'    Ptf_ProfileWriteGroup(out, "wrappers", ptf_wrapper_counters, {len(functions)});'
+        yield '    fprintf(out, ",\\n");'
+        yield f'    Ptf_ProfileWriteGroup(out, "procedures", ptf_procedure_counters, {len(procedures)});'
+        yield '    fprintf(out, ",\\n");'
+        yield '    Ptf_ProfileWriteGroup(out, "swap", &ptf_swap_counter, 1);'
+        yield '    fprintf(out, "\\n}\\n");'
+        yield "    fclose(out);"
+        yield "}\n"
 
-        code.append(f"void Wrapper_{func_name}() {{")
-        args = [f"state.{inp}_curr" for inp in inputs]
-        
-        if len(outputs) == 1:
+    yield "// --- Generated Wrappers ---"
+    for func_index, func in enumerate(spec.functions.values()):
+        outputs = [table.name for table in func.outputs]
+
+        yield f"void Wrapper_{func.name}() {{"
+        if func.name in memoized:
+            unchanged = "".join(f" && ptf_version_{table.name} <= ptf_ran_{func.name}" for table in func.inputs)
+            yield f"    if (ptf_ran_{func.name}{unchanged}) return;"
+            yield f"    ptf_ran_{func.name} = ptf_clock;"
+        if profile:
+            yield "    unsigned long long ptf_start = Ptf_ProfileNow();"
+        args = [f"{st}{table.name}_curr" for table in func.inputs]
+
+        if pointer:
+            # Init functions fill the current slot directly, so nothing needs
+            # copying afterwards.
+            out_buffer = "curr" if func.is_init else "next"
+            args += [f"{st}{out}_{out_buffer}" for out in outputs]
+            yield f"    Logic_{func.name}({', '.join(args)});"
+        elif len(outputs) == 1:
             out_table = outputs[0]
             args_str = ", ".join(args)
-            code.append(f"    state.{out_table}_next = Logic_{func_name}({args_str});")
-            if "Init" in func_name:
-                 code.append(f"    state.{out_table}_curr = state.{out_table}_next;")
+            yield f"    {st}{out_table}_next = Logic_{func.name}({args_str});"
+            if func.is_init:
+                 yield f"    {st}{out_table}_curr = {st}{out_table}_next;"
         elif len(outputs) > 1:
             for out in outputs:
                 # Note: this assumes the implementation handles pointers for multiple outputs
-                args.append(f"&state.{out}_next")
+                args.append(f"&{st}{out}_next")
             args_str = ", ".join(args)
-            code.append(f"    Logic_{func_name}({args_str});")
-            if "Init" in func_name:
+            yield f"    Logic_{func.name}({args_str});"
+            if func.is_init:
                 for out in outputs:
-                    code.append(f"    state.{out}_curr = state.{out}_next;")
+                    yield f"    {st}{out}_curr = {st}{out}_next;"
         else:
             args_str = ", ".join(args)
-            code.append(f"    Logic_{func_name}({args_str});")
-
-        code.append("}\n")
-
-    code.append("// --- Buffer Swap ---")
-    code.append("void Swap_Buffers() {")
-    for table_name in data.get('tables', {}):
-        code.append(f"    state.{table_name}_curr = state.{table_name}_next;")
-    code.append("}\n")
-
-    code.append("// --- High Level Procedures ---")
-    for proc_name, func_list in data.get('procedures', {}).items():
-        code.append(f"void {proc_name}() {{")
-        for func in func_list:
-            code.append(f"    Wrapper_{func}();")
-        if proc_name == "Loop":
-             code.append("    Swap_Buffers();")
-        code.append("}\n")
-
-    code.append("int main() {")
-    code.append("    Setup();")
-    code.append("    while (true) {")
-    code.append("        Loop();")
-    code.append("    }")
-    code.append("    return 0;")
-    code.append("}")
-
-    return "\n".join(code)
+            yield f"    Logic_{func.name}({args_str});"
+
+        if memoize and not func.is_init:
+            for out in outputs:
+                yield f"    ptf_written_{out} = true;"
+        if profile:
+            yield f"    Ptf_ProfileRecord(&ptf_wrapper_counters[{func_index}], ptf_start);"
+        yield "}\n"
+
+    yield "// --- Buffer Swap ---"
+    yield "void Swap_Buffers() {"
+    if profile:
+        yield "    unsigned long long ptf_start = Ptf_ProfileNow();"
+    for table in tables:
+        name = table.name
+        if memoize and name not in changing:
+            continue   # only Setup writes it, and Setup fills _curr
+        if name not in swapped:
+            if memoize:
+                # Single slot: the write already went to _curr
+                yield f"    if (ptf_written_{name}) {{ ptf_written_{name} = false; ptf_version_{name} = ++ptf_clock; }}"
+            continue
+        swap = []
+        if pointer:
+            swap.append(f"{{ {table.struct_name} *prev = {st}{name}_curr; {st}{name}_curr = {st}{name}_next; {st}{name}_next = prev; }}")
+            equal = (f"{table.prefix}_Equal({st}{name}_next, {st}{name}_curr)" if table.is_entity else
+                     f"memcmp({st}{name}_next, {st}{name}_curr, sizeof *{st}{name}_curr) == 0")
+        elif table.is_entity:
+            swap.append(f"{table.prefix}_Copy(&{st}{name}_curr, &{st}{name}_next);")
+            if profile:
+                # Copy moves the count plus the live rows of each column
+                row_bytes = " + ".join(f"sizeof({st}{name}_next.{col}[0])" for col in table.columns)
+                swap.append(f"ptf_swap_counter.bytes += sizeof(int) + (unsigned long long){st}{name}_next.count * ({row_bytes});")
+            equal = f"{table.prefix}_Equal(&{st}{name}_next, &{st}{name}_curr)"
+        else:
+            swap.append(f"{st}{name}_curr = {st}{name}_next;")
+            if profile:
+                swap.append(f"ptf_swap_counter.bytes += sizeof({st}{name}_next);")
+            equal = f"memcmp(&{st}{name}_next, &{st}{name}_curr, sizeof {st}{name}_curr) == 0"
+        if table.index:
+            swap.append(f"{table.prefix}_IndexUpdate({'' if pointer else '&'}{st}{name}_curr);")
+        if not memoize:
+            yield from (f"    {line}" for line in swap)
+            continue
+        yield f"    if (ptf_written_{name}) {{"
+        yield f"        ptf_written_{name} = false;"
+        yield f"        if (!{equal}) {{"
+        yield from (f"            {line}" for line in swap)
+        yield f"            ptf_version_{name} = ++ptf_clock;"
+        yield "        }"
+        yield "    }"
+    if profile:
+        yield "    Ptf_ProfileRecord(&ptf_swap_counter, ptf_start);"
+    yield "}\n"
+
+    if threads > 1:
+        yield "// --- Worker Pool (one barrier per stage) ---"
+        yield f"#define PTF_THREADS {threads}"
+        yield "typedef void (*PtfTask)(void);"
+        yield "static pthread_t ptf_workers[PTF_THREADS - 1];"
+        yield "static pthread_barrier_t ptf_stage_start;"
+        yield "static pthread_barrier_t ptf_stage_done;"
+        yield "static PtfTask const *ptf_stage_tasks;"
+        yield "static int ptf_stage_count;"
+        yield "static atomic_int ptf_stage_next;\n"
+        yield "static void Ptf_DrainStage(void) {"
+        yield "    int i;"
+        yield "    while ((i = atomic_fetch_add(&ptf_stage_next, 1)) < ptf_stage_count) {"
+        yield "        ptf_stage_tasks[i]();"
+        yield "    }"
+        yield "}\n"
+        yield "static void *Ptf_Worker(void *arg) {"
+        yield "    (void)arg;"
+        yield "    for (;;) {"
+        yield "        pthread_barrier_wait(&ptf_stage_start);"
+        yield "        Ptf_DrainStage();"
+        yield "        pthread_barrier_wait(&ptf_stage_done);"
+        yield "    }"
+        yield "    return NULL;"
+        yield "}\n"
+        yield "void Ptf_StartWorkers(void) {"
+        yield "    pthread_barrier_init(&ptf_stage_start, NULL, PTF_THREADS);"
+        yield "    pthread_barrier_init(&ptf_stage_done, NULL, PTF_THREADS);"
+        yield "    for (int i = 0; i < PTF_THREADS - 1; i++) {"
+        yield "        pthread_create(&ptf_workers[i], NULL, Ptf_Worker, NULL);"
+        yield "    }"
+        yield "}\n"
+        yield "void Ptf_RunStage(PtfTask const *tasks, int count) {"
+        yield "    ptf_stage_tasks = tasks;"
+        yield "    ptf_stage_count = count;"
+        yield "    atomic_store(&ptf_stage_next, 0);"
+        yield "    pthread_barrier_wait(&ptf_stage_start);"
+        yield "    Ptf_DrainStage();"
+        yield "    pthread_barrier_wait(&ptf_stage_done);"
+        yield "}\n"
+
+    if snapshots:
+        yield "// --- Snapshots ---"
+        yield "// The columns of every _curr table back to back in spec order, without"
+        yield "// struct padding. Entity columns keep their full capacity with the rows"
+        yield "// past count zeroed, so equal states always give equal bytes."
+        sizes = []
+        for table in tables:
+            if table.is_entity:
+                sizes.append("sizeof(int)")
+                sizes += [f"sizeof({col.type}) * {table.capacity_macro}" for col in table.columns.values()]
+            else:
+                sizes += [f"sizeof({col.type}) * ({col.size})" if col.is_array
+                          else f"sizeof(uint64_t) * {bitgrid_macro(table, col)}_WORDS" if col.is_bitgrid
+                          else f"sizeof({col.type})" for col in table.columns.values()]
+        yield f"#define PTF_SNAPSHOT_SIZE ({' + '.join(sizes) or '0'})"
+        yield "void Ptf_Serialize(unsigned char *out) {"
+        for table in tables:
+            source = f"{st}{table.name}_curr" if pointer else f"&{st}{table.name}_curr"
+            yield f"    {{ const {table.struct_name} *t = {source};"
+            if table.is_entity:
+                yield "      memcpy(out, &t->count, sizeof(int)); out += sizeof(int);"
+                for col in table.columns.values():
+                    yield (f"      memcpy(out, t->{col.name}, sizeof({col.type}) * t->count);"
+                           f" memset(out + sizeof({col.type}) * t->count, 0, sizeof({col.type}) * ({table.capacity_macro} - t->count));"
+                           f" out += sizeof({col.type}) * {table.capacity_macro};")
+            else:
+                for col in table.columns.values():
+                    field = f"t->{col.name}" if col.is_array or col.is_bitgrid else f"&t->{col.name}"
+                    yield f"      memcpy(out, {field}, sizeof t->{col.name}); out += sizeof t->{col.name};"
+            yield "    }"
+        yield "}\n"
+        yield "void Ptf_Deserialize(const unsigned char *in) {"
+        for table in tables:
+            target = f"{st}{table.name}_curr" if pointer else f"&{st}{table.name}_curr"
+            yield f"    {{ {table.struct_name} *t = {target};"
+            fields = (["count"] if table.is_entity else []) + list(table.columns)
+            for col_name in fields:
+                yield f"      memcpy(&t->{col_name}, in, sizeof t->{col_name}); in += sizeof t->{col_name};"
+            yield "    }"
+        for table in tables:
+            if table.index:
+                yield f"    {table.prefix}_IndexUpdate({'' if pointer else '&'}{st}{table.name}_curr);"
+        if memoize:
+            # Every table may have changed, so every memoized wrapper reruns
+            for table in tables:
+                yield f"    ptf_version_{table.name} = ++ptf_clock;"
+        yield "}\n"
+        yield C_HISTORY
+
+    yield "// --- High Level Procedures ---"
+    for proc_index, proc in enumerate(spec.procedures.values()):
+        yield f"void {proc.name}() {{"
+        if profile:
+            yield "    unsigned long long ptf_start = Ptf_ProfileNow();"
+        if threads > 1:
+            for index, stage in enumerate(analyze_procedure(proc)["stages"]):
+                if len(stage) == 1:
+                    yield f"    Wrapper_{stage[0]}();"
+                    continue
+                tasks = ", ".join(f"Wrapper_{func}" for func in stage)
+                yield f"    static PtfTask const stage{index}[] = {{ {tasks} }};"
+                yield f"    Ptf_RunStage(stage{index}, {len(stage)});"
+        else:
+            for func in proc.functions:
+                yield f"    Wrapper_{func.name}();"
+        if proc.name == "Loop":
+            yield "    Swap_Buffers();"
+            if snapshots:
+                yield "    ptf_tick++;"
+                yield "    Ptf_HistoryRecord();"
+        elif memoize:
+            # Init functions wrote _curr directly; publish the new contents
+            init_written = {table.name for func in proc.functions if func.is_init for table in func.outputs}
+            for table in tables:
+                if table.name in init_written:
+                    yield f"    ptf_version_{table.name} = ++ptf_clock;"
+        if proc.name != "Loop":
+            # Swaps keep the indexes current in Loop; elsewhere writes land in _curr directly
+            proc_written = {table.name for func in proc.functions for table in func.outputs}
+            for table in tables:
+                if table.index and table.name in proc_written:
+                    yield f"    {table.prefix}_IndexUpdate({'' if pointer else '&'}{st}{table.name}_curr);"
+        if snapshots and proc.name == "Setup":
+            yield "    ptf_tick = 0;"
+            yield "    Ptf_HistoryClear();"
+            yield "    Ptf_HistoryRecord();"
+        if profile:
+            yield f"    Ptf_ProfileRecord(&ptf_procedure_counters[{proc_index}], ptf_start);"
+        yield "}\n"
+
+    if library:
+        yield from c_library_interface(spec)
+        return
+
+    yield "#ifdef PTF_BENCH"
+    yield "// --- Benchmark Entry Point ---"
+    yield "// usage: <binary> [ticks] [seed]; prints one JSON line."
+    yield "#include <time.h>\n"
+    yield "static unsigned long long Ptf_NowNs(void) {"
+    yield "    struct timespec ts;"
+    yield "    clock_gettime(CLOCK_MONOTONIC, &ts);"
+    yield "    return (unsigned long long)ts.tv_sec * 1000000000ull + (unsigned long long)ts.tv_nsec;"
+    yield "}\n"
+    yield "static int Ptf_CompareNs(const void *a, const void *b) {"
+    yield "    unsigned long long x = *(const unsigned long long *)a, y = *(const unsigned long long *)b;"
+    yield "    return (x > y) - (x < y);"
+    yield "}\n"
+    yield "// Deterministic input script: xorshift32 over the key bitmask."
+    yield "static unsigned int ptf_rng;"
+    yield "static unsigned int Ptf_NextInput(void) {"
+    yield "    ptf_rng ^= ptf_rng << 13;"
+    yield "    ptf_rng ^= ptf_rng >> 17;"
+    yield "    ptf_rng ^= ptf_rng << 5;"
+    yield "    return ptf_rng;"
+    yield "}\n"
+    yield "static void Ptf_Hash(unsigned long long *h, const void *data, size_t size) {"
+    yield "    const unsigned char *bytes = data;"
+    yield "    for (size_t i = 0; i < size; i++) {"
+    yield "        *h = (*h ^ bytes[i]) * 1099511628211ull;"
+    yield "    }"
+    yield "}\n"
+    yield "static unsigned long long Ptf_Checksum(void) {"
+    yield "    unsigned long long h = 14695981039346656037ull;"
+    for table_name in spec.tables:
+        if pointer:
+            yield f"    Ptf_Hash(&h, state.{table_name}_curr, sizeof *state.{table_name}_curr);"
+        else:
+            yield f"    Ptf_Hash(&h, &state.{table_name}_curr, sizeof state.{table_name}_curr);"
+    yield "    return h;"
+    yield "}\n"
+    yield "int main(int argc, char **argv) {"
+    yield "    long ticks = argc > 1 ? atol(argv[1]) : 100000;"
+    yield "    unsigned int seed = argc > 2 ? (unsigned int)strtoul(argv[2], NULL, 10) : 1u;"
+    yield "    if (ticks < 1) ticks = 1;"
+    yield "    unsigned long long *samples = malloc(sizeof *samples * (size_t)ticks);"
+    yield "    if (!samples) return 1;"
+    yield "    ptf_rng = seed ? seed : 1u;"
+    yield "    srand(seed);"
+    if profile:
+        yield "    atexit(Ptf_ProfileDump);"
+    if threads > 1:
+        yield "    Ptf_StartWorkers();"
+    yield "    Setup();"
+    yield "    unsigned long long total = 0;"
+    yield "    for (long t = 0; t < ticks; t++) {"
+    yield "        ptf_input.keys = Ptf_NextInput();"
+    yield "        unsigned long long start = Ptf_NowNs();"
+    yield "        Loop();"
+    yield "        samples[t] = Ptf_NowNs() - start;"
+    yield "        total += samples[t];"
+    yield "    }"
+    yield "    qsort(samples, (size_t)ticks, sizeof *samples, Ptf_CompareNs);"
+    c_project = json.dumps(spec.project_name).replace('\\', '\\\\').replace('"', '\\"')
+    yield f'    printf("{{\\"project\\": {c_project}, \\"ticks\\": %ld, \\"seed\\": %u, "'
+    yield '           "\\"mean_ns\\": %.1f, \\"p50_ns\\": %llu, \\"p99_ns\\": %llu, \\"checksum\\": \\"%016llx\\"}\\n",'
+    yield "           ticks, seed, (double)total / ticks, samples[ticks / 2], samples[(ticks * 99) / 100], Ptf_Checksum());"
+    yield "    free(samples);"
+    yield "    return 0;"
+    yield "}"
+    yield "#else"
+    if profile:
+        yield "static volatile sig_atomic_t ptf_running = 1;"
+        yield "static void Ptf_ProfileStop(int sig) { (void)sig; ptf_running = 0; }\n"
+    yield "int main() {"
+    if profile:
+        # Ctrl-C ends the loop normally so the atexit dump still runs
+        yield "    atexit(Ptf_ProfileDump);"
+        yield "    signal(SIGINT, Ptf_ProfileStop);"
+        yield "    signal(SIGTERM, Ptf_ProfileStop);"
+    if threads > 1:
+        yield "    Ptf_StartWorkers();"
+    yield "    Setup();"
+    yield "    while (ptf_running) {" if profile else "    while (true) {"
+    yield "        Loop();"
+    yield "    }"
+    yield "    return 0;"
+    yield "}"
+    yield "#endif"
+
+def generate_c_code(data, buffers="copy", threads=0, profile=False, memoize=False, snapshots=False, library=False):
+    """Generate C source as one string; see iter_c_code() for the options."""
+    return "\n".join(iter_c_code(data, buffers, threads, profile, memoize, snapshots, library))
+
+def write_c_code(out, data, buffers="copy", threads=0, profile=False, memoize=False, snapshots=False, library=False):
+    """Stream C source to the file-like object out; see iter_c_code() for the options."""
+    write_lines(out, iter_c_code(data, buffers, threads, profile, memoize, snapshots, library))
 
 def get_game_logic(project_name):
     # Returns (html_logic, draw_logic, game_specific_css, game_specific_ui)
     
     if project_name.lower() == 'pong':
         html_logic = """
-    function Logic_InitPaddles() {
-        const p1 = { x: 40, y: (SCREEN_HEIGHT / 2) - (PADDLE_HEIGHT / 2), width: PADDLE_WIDTH, height: PADDLE_HEIGHT };
-        const p2 = { x: SCREEN_WIDTH - 40 - PADDLE_WIDTH, y: (SCREEN_HEIGHT / 2) - (PADDLE_HEIGHT / 2), width: PADDLE_WIDTH, height: PADDLE_HEIGHT };
-        return { paddle1: p1, paddle2: p2 };
+    // Each Logic function fills the trailing output argument(s) when the
+    // wrapper supplies them (in-place buffers) and otherwise builds fresh
+    // objects. Every field of an output is written on every call.
+    function Logic_InitPaddles(p1, p2) {
+        const fresh = p1 === undefined;
+        if (fresh) { p1 = {}; p2 = {}; }
+        p1.x = 40; p1.y = (SCREEN_HEIGHT / 2) - (PADDLE_HEIGHT / 2); p1.width = PADDLE_WIDTH; p1.height = PADDLE_HEIGHT;
+        p2.x = SCREEN_WIDTH - 40 - PADDLE_WIDTH; p2.y = (SCREEN_HEIGHT / 2) - (PADDLE_HEIGHT / 2); p2.width = PADDLE_WIDTH; p2.height = PADDLE_HEIGHT;
+        return fresh ? { paddle1: p1, paddle2: p2 } : undefined;
     }
-    function Logic_InitBall() {
-        return { x: SCREEN_WIDTH / 2, y: SCREEN_HEIGHT / 2, radius: BALL_RADIUS, speedX: BALL_START_SPEED_X, speedY: BALL_START_SPEED_Y };
+    function Logic_InitBall(b_out = {}) {
+        b_out.x = SCREEN_WIDTH / 2; b_out.y = SCREEN_HEIGHT / 2; b_out.radius = BALL_RADIUS;
+        b_out.speedX = BALL_START_SPEED_X; b_out.speedY = BALL_START_SPEED_Y;
+        return b_out;
     }
-    function Logic_InitScore() { return { p1: 0, p2: 0 }; }
-    function Logic_MovePaddle1(p) {
-        let p_out = { ...p };
+    function Logic_InitScore(s_out = {}) { s_out.p1 = 0; s_out.p2 = 0; return s_out; }
+    function Logic_MovePaddle1(p, p_out = {}) {
+        p_out.x = p.x; p_out.y = p.y; p_out.width = p.width; p_out.height = p.height;
         if (keyIsDown(87) || keyIsDown(UP_ARROW)) p_out.y -= PADDLE_SPEED;
         if (keyIsDown(83) || keyIsDown(DOWN_ARROW)) p_out.y += PADDLE_SPEED;
         p_out.y = Math.max(0, Math.min(SCREEN_HEIGHT - p_out.height, p_out.y));
         return p_out;
     }
-    function Logic_MovePaddle2(p, b) {
-        let p_out = { ...p };
+    function Logic_MovePaddle2(p, b, p_out = {}) {
+        p_out.x = p.x; p_out.y = p.y; p_out.width = p.width; p_out.height = p.height;
         const paddleCenter = p_out.y + p_out.height / 2;
         const deadzone = 10;
         if (b.y > paddleCenter + deadzone) p_out.y += PADDLE_SPEED * 0.85;
@@ -147,8 +1607,8 @@ def get_game_logic(project_name):
         p_out.y = Math.max(0, Math.min(SCREEN_HEIGHT - p_out.height, p_out.y));
         return p_out;
     }
-    function Logic_MoveBall(b, p1, p2) {
-        let b_out = { ...b };
+    function Logic_MoveBall(b, p1, p2, b_out = {}) {
+        b_out.x = b.x; b_out.y = b.y; b_out.radius = b.radius; b_out.speedX = b.speedX; b_out.speedY = b.speedY;
         b_out.x += b_out.speedX;
         b_out.y += b_out.speedY;
         if (b_out.y - b_out.radius <= 0 || b_out.y + b_out.radius >= SCREEN_HEIGHT) {
@@ -165,11 +1625,11 @@ def get_game_logic(project_name):
             let hitY = (b_out.y >= p2.y) && (b_out.y <= p2.y + p2.height);
             if (hitX && hitY) { b_out.speedX *= -1.05; b_out.x = p2.x - b_out.radius; }
         }
-        if (b_out.x < 0 || b_out.x > SCREEN_WIDTH) return Logic_InitBall(); 
+        if (b_out.x < 0 || b_out.x > SCREEN_WIDTH) return Logic_InitBall(b_out);
         return b_out;
     }
-    function Logic_CheckScore(b, s) {
-        let s_out = { ...s };
+    function Logic_CheckScore(b, s, s_out = {}) {
+        s_out.p1 = s.p1; s_out.p2 = s.p2;
         if (b.x < 0) s_out.p2 += 1;
         if (b.x > SCREEN_WIDTH) s_out.p1 += 1;
         return s_out;
@@ -204,84 +1664,103 @@ def get_game_logic(project_name):
 
     elif project_name.lower() == 'snake':
         html_logic = """
-    function Logic_InitSnakeHead() {
-        return { x: Math.floor(SCREEN_WIDTH / (2 * GRID_SIZE)) * GRID_SIZE, y: Math.floor(SCREEN_HEIGHT / (2 * GRID_SIZE)) * GRID_SIZE, directionX: 1, directionY: 0, size: GRID_SIZE };
+    // Each Logic function fills the trailing output argument(s) when the
+    // wrapper supplies them (in-place buffers) and otherwise builds fresh
+    // objects. Every field of an output is written on every call; body
+    // arrays are only meaningful up to `length`.
+    function CopySnakeHead(dst, src) { dst.x = src.x; dst.y = src.y; dst.directionX = src.directionX; dst.directionY = src.directionY; dst.size = src.size; return dst; }
+    function CopySnakeBody(dst, src) {
+        for (let i = 0; i < src.length; i++) { dst.pos_x[i] = src.pos_x[i]; dst.pos_y[i] = src.pos_y[i]; }
+        dst.length = src.length;
+        return dst;
+    }
+    function CopySnacks(dst, src) { dst.x = src.x; dst.y = src.y; dst.radius = src.radius; dst.active = src.active; return dst; }
+    function CopyTimer(dst, src) { dst.elapsed = src.elapsed; dst.gameState = src.gameState; return dst; }
+
+    function Logic_InitSnakeHead(h_out = {}) {
+        h_out.x = Math.floor(SCREEN_WIDTH / (2 * GRID_SIZE)) * GRID_SIZE;
+        h_out.y = Math.floor(SCREEN_HEIGHT / (2 * GRID_SIZE)) * GRID_SIZE;
+        h_out.directionX = 1; h_out.directionY = 0; h_out.size = GRID_SIZE;
+        return h_out;
     }
-    function Logic_InitSnakeBody() {
+    function Logic_InitSnakeBody(b_out = { pos_x: [], pos_y: [] }) {
         const headX = Math.floor(SCREEN_WIDTH / (2 * GRID_SIZE)) * GRID_SIZE;
         const headY = Math.floor(SCREEN_HEIGHT / (2 * GRID_SIZE)) * GRID_SIZE;
-        return { pos_x: [headX - GRID_SIZE, headX - 2 * GRID_SIZE, headX - 3 * GRID_SIZE], pos_y: [headY, headY, headY], length: 3 };
+        for (let i = 0; i < 3; i++) { b_out.pos_x[i] = headX - (i + 1) * GRID_SIZE; b_out.pos_y[i] = headY; }
+        b_out.length = 3;
+        return b_out;
     }
-    function Logic_InitSnacks() {
-        return { x: Math.floor(Math.random() * (SCREEN_WIDTH / GRID_SIZE)) * GRID_SIZE, y: Math.floor(Math.random() * (SCREEN_HEIGHT / GRID_SIZE)) * GRID_SIZE, radius: GRID_SIZE / 2, active: 1 };
+    function Logic_InitSnacks(s_out = {}) {
+        s_out.x = Math.floor(Math.random() * (SCREEN_WIDTH / GRID_SIZE)) * GRID_SIZE;
+        s_out.y = Math.floor(Math.random() * (SCREEN_HEIGHT / GRID_SIZE)) * GRID_SIZE;
+        s_out.radius = GRID_SIZE / 2; s_out.active = 1;
+        return s_out;
     }
-    function Logic_InitScore() { return { points: 0, highScore: 0 }; }
-    function Logic_InitTimer() { return { elapsed: 0, gameState: 0 }; }
-    function Logic_UpdateTimer(t) {
-        let t_out = { ...t };
+    function Logic_InitScore(sc_out = {}) { sc_out.points = 0; sc_out.highScore = 0; return sc_out; }
+    function Logic_InitTimer(t_out = {}) { t_out.elapsed = 0; t_out.gameState = 0; return t_out; }
+    function Logic_UpdateTimer(t, t_out = {}) {
+        CopyTimer(t_out, t);
         if (t_out.gameState === 0) t_out.elapsed += 1;
         return t_out;
     }
-    function Logic_ProcessInput(h) {
-        let h_out = { ...h };
+    function Logic_ProcessInput(h, h_out = {}) {
+        CopySnakeHead(h_out, h);
         if (keyIsDown(LEFT_ARROW) && h.directionX !== 1) { h_out.directionX = -1; h_out.directionY = 0; }
         else if (keyIsDown(RIGHT_ARROW) && h.directionX !== -1) { h_out.directionX = 1; h_out.directionY = 0; }
         else if (keyIsDown(UP_ARROW) && h.directionY !== 1) { h_out.directionX = 0; h_out.directionY = -1; }
         else if (keyIsDown(DOWN_ARROW) && h.directionY !== -1) { h_out.directionX = 0; h_out.directionY = 1; }
         return h_out;
     }
-    function Logic_MoveSnakeHead(h, t) {
-        if (t.gameState !== 0) return h;
-        if (frameCount % 6 !== 0) return h;
-        let h_out = { ...h };
+    function Logic_MoveSnakeHead(h, t, h_out = {}) {
+        CopySnakeHead(h_out, h);
+        if (t.gameState !== 0) return h_out;
+        if (frameCount % 6 !== 0) return h_out;
         h_out.x += h.directionX * GRID_SIZE;
         h_out.y += h.directionY * GRID_SIZE;
         return h_out;
     }
-    function Logic_MoveSnakeBody(h, b, t) {
-        if (t.gameState !== 0) return b;
-        if (frameCount % 6 !== 0) return b;
-        let b_out = { ...b, pos_x: [...b.pos_x], pos_y: [...b.pos_y] };
+    function Logic_MoveSnakeBody(h, b, t, b_out = { pos_x: [], pos_y: [] }) {
+        CopySnakeBody(b_out, b);
+        if (t.gameState !== 0) return b_out;
+        if (frameCount % 6 !== 0) return b_out;
         for (let i = b_out.length - 1; i > 0; i--) { b_out.pos_x[i] = b_out.pos_x[i-1]; b_out.pos_y[i] = b_out.pos_y[i-1]; }
         b_out.pos_x[0] = h.x; b_out.pos_y[0] = h.y;
         return b_out;
     }
-    function Logic_CheckSnackCollision(h, b, s) {
-        let b_out = { ...b, pos_x: [...b.pos_x], pos_y: [...b.pos_y] };
-        let s_out = { ...s };
+    function Logic_CheckSnackCollision(h, b, s, b_out, s_out) {
+        const fresh = b_out === undefined;
+        if (fresh) { b_out = { pos_x: [], pos_y: [] }; s_out = {}; }
+        CopySnakeBody(b_out, b);
+        CopySnacks(s_out, s);
         if (h.x === s.x && h.y === s.y) {
+            b_out.pos_x[b.length] = b.pos_x[b.length-1];
+            b_out.pos_y[b.length] = b.pos_y[b.length-1];
             b_out.length += 1;
-            b_out.pos_x.push(b.pos_x[b.length-1]);
-            b_out.pos_y.push(b.pos_y[b.length-1]);
             s_out.active = 0;
         }
-        return { snake_body: b_out, snacks: s_out };
+        return fresh ? { snake_body: b_out, snacks: s_out } : undefined;
     }
-    function Logic_CheckWallCollision(h, t) {
-        let t_out = { ...t };
+    function Logic_CheckWallCollision(h, t, t_out = {}) {
+        CopyTimer(t_out, t);
         if (h.x < 0 || h.x >= SCREEN_WIDTH || h.y < 0 || h.y >= SCREEN_HEIGHT) { t_out.gameState = 2; }
         return t_out;
     }
-    function Logic_CheckSelfCollision(h, b, t) {
-        let t_out = { ...t };
-        for (let i = 0; i < b.length; i++) { if (h.x === b.pos_x[i] && h.y === b.pos_y[i]) t_out.gameState = 2; }
+    function Logic_CheckSelfCollision(h, b, t, t_out = {}) {
+        CopyTimer(t_out, t);
+        if (Snakebody_Occupied(h.x, h.y)) t_out.gameState = 2;  // the index always describes b
         return t_out;
     }
-    function Logic_UpdateScore(sc, sn) {
-        let sc_out = { ...sc };
+    function Logic_UpdateScore(sc, sn, sc_out = {}) {
+        sc_out.points = sc.points; sc_out.highScore = sc.highScore;
         if (sn.active === 0) { sc_out.points += 10; if (sc_out.points > sc_out.highScore) sc_out.highScore = sc_out.points; }
         return sc_out;
     }
-    function Logic_SpawnSnack(s, b) {
-        if (s.active === 1) return s;
-        let s_out = { ...s, active: 1 };
-        let valid = false;
-        while (!valid) {
-            s_out.x = Math.floor(Math.random() * (SCREEN_WIDTH / GRID_SIZE)) * GRID_SIZE;
-            s_out.y = Math.floor(Math.random() * (SCREEN_HEIGHT / GRID_SIZE)) * GRID_SIZE;
-            valid = true;
-            for (let i = 0; i < b.length; i++) { if (s_out.x === b.pos_x[i] && s_out.y === b.pos_y[i]) { valid = false; break; } }
-        }
+    function Logic_SpawnSnack(s, b, s_out = {}) {
+        CopySnacks(s_out, s);
+        if (s.active === 1) return s_out;
+        s_out.active = 1;
+        const cell = Snakebody_RandomFreeCell();
+        if (cell >= 0) { s_out.x = Snakebody_CellX(cell); s_out.y = Snakebody_CellY(cell); }
         return s_out;
     }
 """
@@ -320,15 +1799,44 @@ def get_game_logic(project_name):
         # Default / Generic
         return "// Generic Logic Placeholder", "    text('Generic Visualization for ' + project_name, 20, 40);", "", "<p>Generic Project View</p>"
 
-def generate_html_code(data):
-    project_name = data.get('project_name', 'Unnamed Project')
-    config = data.get('config', {})
+HTML_BUFFER_MODES = ("copy", "inplace")
+
+def iter_html_code(data, buffers="copy", profile=False, memoize=False, snapshots=False):
+    """Yield the lines of a p5.js HTML page for a Spec, a parsed spec dict or raw YAML text.
+
+    buffers="copy" rebuilds every table object on each swap. buffers="inplace"
+    allocates the table instances once (two for tables written in Loop, one
+    otherwise) and flips references on swap. Wrappers then pass the _next
+    instance to Logic functions as trailing output arguments to fill; a Logic
+    function that returns a fresh object instead still works, its result is
+    copied into the target field by field.
+
+    profile=True times wrappers, procedures and SwapBuffers() with
+    performance.now() and publishes the counters as window.__ptfProfile.
+
+    memoize=True adds the same table versions and early-returning wrappers as
+    generate_c_code(memoize=True).
+
+    snapshots=True adds Ptf_Serialize()/Ptf_Deserialize() between the _curr
+    tables and a Uint8Array of PTF_SNAPSHOT_SIZE bytes, and the same rewind
+    history as generate_c_code(snapshots=True).
+    """
+    spec = as_spec(data)
+    if buffers not in HTML_BUFFER_MODES:
+        raise ValueError(f"unknown buffer mode {buffers!r} (expected one of {HTML_BUFFER_MODES})")
+    inplace = buffers == "inplace"
+    tables = spec.tables.values()
+    swapped = loop_written_tables(spec) if inplace else set(spec.tables)
+    memoized = memoized_functions(spec) if memoize else set()
+    changing = written_tables(spec) if memoize else set()
+    project_name = spec.project_name
+    config = spec.config
     width = config.get('screen_width', 800)
     height = config.get('screen_height', 600)
     
     html_logic, draw_logic, game_css, game_ui = get_game_logic(project_name)
 
-    html = [f"""<!DOCTYPE html>
+    yield f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -353,67 +1861,415 @@ def generate_html_code(data):
         {game_ui}
     </div>
     <script>
-"""]
+"""
 
-    html.append("    // --- Configuration ---")
-    html.append(f"    const SCREEN_WIDTH = {width};")
-    html.append(f"    const SCREEN_HEIGHT = {height};")
+    yield "    // --- Configuration ---"
+    yield f"    const SCREEN_WIDTH = {width};"
+    yield f"    const SCREEN_HEIGHT = {height};"
     for key, value in config.items():
         if key.upper() not in ['SCREEN_WIDTH', 'SCREEN_HEIGHT']:
-            html.append(f"    const {key.upper()} = {value};")
-    html.append("")
-
-    html.append("    // --- Global State ---")
-    state_init = "{\n"
-    for table_name in data.get('tables', {}):
-        state_init += f"        {table_name}_curr: {{}},\n"
-        state_init += f"        {table_name}_next: {{}},\n"
-    state_init += "    }"
-    html.append(f"    let state = {state_init};\n")
-
-    html.append("    // --- Pure Logic Functions ---")
-    html.append(html_logic)
-
-    html.append("    // --- Generated Wrappers ---")
-    for func_name, func_data in data.get('functions', {}).items():
-        inputs = func_data.get('inputs', [])
-        outputs = func_data.get('outputs', [])
-        
-        html.append(f"    function Wrapper_{func_name}() {{")
+            yield f"    const {key.upper()} = {value};"
+    entity_tables = [table for table in tables if table.is_entity]
+    for table in entity_tables:
+        yield f"    const {table.capacity_macro} = {table.capacity};"
+    yield ""
+
+    bitgrids = [(table, col) for table in tables for col in table.columns.values() if col.is_bitgrid]
+    if bitgrids:
+        yield JS_BITGRID
+    for table, col in bitgrids:
+        macro, name = bitgrid_macro(table, col), f"{table.prefix}_{col.name[0].upper()}{col.name[1:]}"
+        width, height = (f"{macro}_WIDTH", f"{macro}_HEIGHT")
+        yield f"    const {width} = {col.dims[0]}, {height} = {col.dims[1]};"
+        yield f"    const {macro}_WORDS = {height} * Ptf_BitWords({width});"
+        yield f"    function {name}Make() {{ return new Uint32Array({macro}_WORDS); }}"
+        yield f"    function {name}Get(g, x, y) {{ return Ptf_BitGet(g, {width}, {height}, x, y); }}"
+        yield f"    function {name}Set(g, x, y, on) {{ Ptf_BitSet(g, {width}, {height}, x, y, on); }}"
+        yield f"    function {name}RowFull(g, y) {{ return Ptf_BitRowFull(g, {width}, y); }}"
+        yield f"    function {name}ClearRow(g, y) {{ Ptf_BitClearRow(g, {width}, y); }}"
+        yield f"    function {name}ClearFullRows(g) {{ return Ptf_BitClearFullRows(g, {width}, {height}); }}"
+        yield f"    function {name}Overlaps(g, mask, x, y) {{ return Ptf_BitOverlaps(g, {width}, {height}, mask, x, y); }}"
+        yield f"    function {name}Stamp(g, mask, x, y) {{ Ptf_BitStamp(g, {width}, {height}, mask, x, y); }}"
+        yield f"    function {name}Count(g) {{ return Ptf_BitCount(g); }}"
+    if bitgrids:
+        yield ""
+
+    if memoize:
+        yield "    // --- Table Versions ---"
+        yield "    // A version is the clock value of the last change to a table's _curr;"
+        yield "    // a memoized wrapper remembers the clock of its last run."
+        yield "    function Ptf_ColumnEqual(a, b, n) { for (let i = 0; i < n; i++) if (a[i] !== b[i]) return false; return true; }"
+        yield "    function Ptf_TableEqual(a, b) {"
+        yield "        for (const key in a) {"
+        yield "            const x = a[key], y = b[key];"
+        yield "            if (x === y) continue;"
+        yield "            if (!x || !y || x.length === undefined || x.length !== y.length || !Ptf_ColumnEqual(x, y, x.length)) return false;"
+        yield "        }"
+        yield "        return true;"
+        yield "    }"
+        yield "    let ptfClock = 1;"
+        versions = ", ".join(f"{name}: 1" for name in spec.tables)
+        yield f"    const ptfVersion = {{ {versions} }};"
+        written = ", ".join(f"{name}: false" for name in spec.tables if name in changing)
+        yield f"    const ptfWritten = {{ {written} }};"
+        ran = ", ".join(f"{name}: 0" for name in spec.functions if name in memoized)
+        yield f"    const ptfRan = {{ {ran} }};"
+        yield ""
+
+    if entity_tables:
+        yield "    // --- Entity Tables (structure of arrays) ---"
+        for table in entity_tables:
+            prefix, capacity = table.prefix, table.capacity_macro
+            columns = list(table.columns)
+            fields = ", ".join(f"{col.name}: new {JS_TYPED_ARRAYS.get(col.type, 'Float64Array')}({capacity})"
+                               for col in table.columns.values())
+            yield f"    function Make_{prefix}() {{ return {{ count: 0, {fields} }}; }}"
+            yield f"    function {prefix}_Push(t) {{ return t.count < {capacity} ? t.count++ : -1; }}"
+            moves = " ".join(f"t.{col_name}[i] = t.{col_name}[last];" for col_name in columns)
+            yield f"    function {prefix}_Remove(t, i) {{ const last = --t.count; {moves} }}"
+            yield f"    function {prefix}_ForEach(t, fn) {{ for (let i = 0; i < t.count; i++) fn(i); }}"
+            copies = " ".join(f"dst.{col_name}.set(src.{col_name}.subarray(0, src.count));" for col_name in columns)
+            yield f"    function {prefix}_Copy(dst, src) {{ dst.count = src.count; {copies} }}"
+            if memoize:
+                yield (f"    function {prefix}_Equal(a, b) {{ return a.count === b.count && "
+                       + " && ".join(f"Ptf_ColumnEqual(a.{col}, b.{col}, a.count)" for col in columns) + "; }")
+        yield ""
+
+    if inplace:
+        yield "    // --- Table Instances (allocated once) ---"
+        for table in tables:
+            if table.is_entity:
+                continue
+            fields, copies = [], []
+            for col in table.columns.values():
+                if col.is_array:
+                    fields.append(f"{col.name}: new {JS_TYPED_ARRAYS[col.type]}({col.size})")
+                    copies.append(f"dst.{col.name}.set(src.{col.name});")
+                elif col.is_bitgrid:
+                    fields.append(f"{col.name}: new Uint32Array({bitgrid_macro(table, col)}_WORDS)")
+                    copies.append(f"dst.{col.name}.set(src.{col.name});")
+                else:
+                    fields.append(f"{col.name}: 0")
+                    copies.append(f"dst.{col.name} = src.{col.name};")
+            yield f"    function Make_{table.prefix}() {{ return {{ {', '.join(fields)} }}; }}"
+            yield f"    function {table.prefix}_Copy(dst, src) {{ {' '.join(copies)} }}"
+        yield ""
+
+    yield "    // --- Global State ---"
+    yield "    let state = {"
+    for table in tables:
+        if table.is_entity or inplace:
+            yield f"        {table.name}_curr: Make_{table.prefix}(),"
+            yield f"        {table.name}_next: Make_{table.prefix}(),"
+            continue
+        yield f"        {table.name}_curr: {{}},"
+        yield f"        {table.name}_next: {{}},"
+    yield "    };"
+    for table_name in spec.tables:
+        if table_name not in swapped:
+            # Never written in Loop: a single instance serves as both buffers.
+            yield f"    state.{table_name}_next = state.{table_name}_curr;"
+    yield ""
+
+    indexed_tables = [table for table in tables if table.index]
+    if indexed_tables:
+        yield "    // --- Spatial Indexes ---"
+        yield "    // A uniform grid per indexed table that always describes its _curr rows."
+        yield "    // Swaps relink only the rows whose cell changed."
+    for table in indexed_tables:
+        index, prefix, idx = table.index, table.prefix, f"{table.name}_index"
+        capacity = index.capacity
+        yield f"    const {idx} = {{"
+        yield f"        cellSize: {index.cell_size}, cols: {index.cols}, rows: {index.rows},"
+        yield f"        count: new Int32Array({index.cells}),                        // rows per cell"
+        yield f"        head: new Int32Array({index.cells}).fill(-1),                // first row of each cell"
+        yield f"        free: Int32Array.from({{ length: {index.cells} }}, (_, c) => c),  // empty cells, unordered"
+        yield f"        freeSlot: Int32Array.from({{ length: {index.cells} }}, (_, c) => c),"
+        yield f"        next: new Int32Array({capacity}), prev: new Int32Array({capacity}),"
+        yield f"        cell: new Int32Array({capacity}).fill(-1),                   // cell of each row"
+        yield f"        freeCount: {index.cells}, indexed: 0,"
+        yield "    };"
+        yield f"    function {prefix}_CellOf(x, y) {{"
+        yield "        if (!(x >= 0 && y >= 0)) return -1;"
+        yield f"        const col = Math.floor(x / {idx}.cellSize), row = Math.floor(y / {idx}.cellSize);"
+        yield f"        return col < {idx}.cols && row < {idx}.rows ? row * {idx}.cols + col : -1;"
+        yield "    }"
+        yield f"    function {prefix}_CellX(cell) {{ return (cell % {idx}.cols) * {idx}.cellSize; }}"
+        yield f"    function {prefix}_CellY(cell) {{ return Math.floor(cell / {idx}.cols) * {idx}.cellSize; }}"
+        yield f"    function {prefix}_CellCount(cell) {{ return cell >= 0 ? {idx}.count[cell] : 0; }}"
+        yield f"    function {prefix}_Occupied(x, y) {{ return {prefix}_CellCount({prefix}_CellOf(x, y)) > 0; }}"
+        yield f"    function {prefix}_ForEachInCell(cell, fn) {{ if (cell >= 0) for (let i = {idx}.head[cell]; i >= 0; i = {idx}.next[i]) fn(i); }}"
+        yield "    // Calls fn(row) for the rows in the cells at most `radius` cells away from (x, y)."
+        yield f"    function {prefix}_ForEachNear(x, y, radius, fn) {{"
+        yield f"        const col = Math.floor(x / {idx}.cellSize), row = Math.floor(y / {idx}.cellSize);"
+        yield f"        for (let r = Math.max(row - radius, 0); r <= row + radius && r < {idx}.rows; r++) {{"
+        yield f"            for (let c = Math.max(col - radius, 0); c <= col + radius && c < {idx}.cols; c++) {prefix}_ForEachInCell(r * {idx}.cols + c, fn);"
+        yield "        }"
+        yield "    }"
+        yield "    // A uniformly chosen empty cell, or -1 when every cell is occupied."
+        yield f"    function {prefix}_RandomFreeCell() {{"
+        yield f"        return {idx}.freeCount ? {idx}.free[Math.floor(Math.random() * {idx}.freeCount)] : -1;"
+        yield "    }"
+        yield f"    function {prefix}_IndexMove(i, cell) {{"
+        yield f"        const ix = {idx}, old = ix.cell[i];"
+        yield "        if (old === cell) return;"
+        yield "        if (old >= 0) {"
+        yield "            if (ix.prev[i] >= 0) ix.next[ix.prev[i]] = ix.next[i]; else ix.head[old] = ix.next[i];"
+        yield "            if (ix.next[i] >= 0) ix.prev[ix.next[i]] = ix.prev[i];"
+        yield "            if (--ix.count[old] === 0) { ix.freeSlot[old] = ix.freeCount; ix.free[ix.freeCount++] = old; }"
+        yield "        }"
+        yield "        if (cell >= 0) {"
+        yield "            ix.prev[i] = -1;"
+        yield "            ix.next[i] = ix.head[cell];"
+        yield "            if (ix.head[cell] >= 0) ix.prev[ix.head[cell]] = i;"
+        yield "            ix.head[cell] = i;"
+        yield "            if (ix.count[cell]++ === 0) {"
+        yield "                const slot = ix.freeSlot[cell], last = ix.free[--ix.freeCount];"
+        yield "                ix.free[slot] = last;"
+        yield "                ix.freeSlot[last] = slot;"
+        yield "                ix.freeSlot[cell] = -1;"
+        yield "            }"
+        yield "        }"
+        yield "        ix.cell[i] = cell;"
+        yield "    }"
+        yield f"    function {prefix}_IndexUpdate(t) {{"
+        yield f"        const n = Math.max(0, Math.min(t.{index.count} | 0, {capacity}));"
+        yield f"        for (let i = 0; i < n; i++) {prefix}_IndexMove(i, {prefix}_CellOf(t.{index.x.name}[i], t.{index.y.name}[i]));"
+        yield f"        for (let i = n; i < {idx}.indexed; i++) {prefix}_IndexMove(i, -1);"
+        yield f"        {idx}.indexed = n;"
+        yield "    }"
+    if indexed_tables:
+        yield ""
+
+    if profile:
+        yield "    // --- Profiling Counters (read window.__ptfProfile from the console) ---"
+        yield "    function Ptf_Counter() { return { calls: 0, totalMs: 0, maxMs: 0, bytes: 0 }; }"
+        wrappers = ", ".join(f"{name}: Ptf_Counter()" for name in spec.functions)
+        procedures = ", ".join(f"{name}: Ptf_Counter()" for name in spec.procedures)
+        yield f"    const ptfProfile = window.__ptfProfile = {{ wrappers: {{ {wrappers} }}, procedures: {{ {procedures} }}, swap: Ptf_Counter() }};"
+        yield "    function Ptf_ProfileRecord(counter, start) {"
+        yield "        const elapsed = performance.now() - start;"
+        yield "        counter.calls++;"
+        yield "        counter.totalMs += elapsed;"
+        yield "        if (elapsed > counter.maxMs) counter.maxMs = elapsed;"
+        yield "    }"
+        if not inplace:
+            yield "    // Rough size of a plain table object: 8 bytes per number, typed arrays by length."
+            yield "    function Ptf_ObjectBytes(obj) {"
+            yield "        let bytes = 0;"
+            yield "        for (const key in obj) {"
+            yield "            const value = obj[key];"
+            yield "            if (ArrayBuffer.isView(value)) bytes += value.byteLength;"
+            yield "            else if (Array.isArray(value)) bytes += value.length * 8;"
+            yield "            else bytes += 8;"
+            yield "        }"
+            yield "        return bytes;"
+            yield "    }"
+        yield ""
+
+    yield "    // --- Pure Logic Functions ---"
+    yield html_logic
+
+    yield "    // --- Generated Wrappers ---"
+    for func in spec.functions.values():
+        func_name = func.name
+        inputs = [table.name for table in func.inputs]
+        outputs = [table.name for table in func.outputs]
+
+        yield f"    function Wrapper_{func_name}() {{"
+        if func_name in memoized:
+            unchanged = "".join(f" && ptfVersion.{inp} <= ptfRan.{func_name}" for inp in inputs)
+            yield f"        if (ptfRan.{func_name}{unchanged}) return;"
+            yield f"        ptfRan.{func_name} = ptfClock;"
+        if profile:
+            yield "        const ptfStart = performance.now();"
         args = [f"state.{inp}_curr" for inp in inputs]
         args_str = ", ".join(args)
-        
-        if len(outputs) == 1:
+
+        if inplace and outputs:
+            # Init functions fill the current instance directly.
+            out_buffer = "curr" if func.is_init else "next"
+            targets = [f"state.{out}_{out_buffer}" for out in outputs]
+            yield f"        const result = Logic_{func_name}({', '.join(args + targets)});"
+            if len(outputs) == 1:
+                yield f"        if (result !== undefined && result !== {targets[0]}) {func.outputs[0].prefix}_Copy({targets[0]}, result);"
+            else:
+                yield "        if (result !== undefined) {"
+                for table, target in zip(func.outputs, targets):
+                    yield f"            if (result.{table.name} !== {target}) {table.prefix}_Copy({target}, result.{table.name});"
+                yield "        }"
+        elif len(outputs) == 1:
             out_table = outputs[0]
-            html.append(f"        state.{out_table}_next = Logic_{func_name}({args_str});")
-            if "Init" in func_name:
-                html.append(f"        state.{out_table}_curr = state.{out_table}_next;")
+            yield f"        state.{out_table}_next = Logic_{func_name}({args_str});"
+            if func.is_init:
+                yield f"        state.{out_table}_curr = state.{out_table}_next;"
         elif len(outputs) > 1:
-            html.append(f"        const results = Logic_{func_name}({args_str});")
+            yield f"        const results = Logic_{func_name}({args_str});"
             for out in outputs:
-                html.append(f"        state.{out}_next = results.{out};")
-                if "Init" in func_name:
-                    html.append(f"        state.{out}_curr = state.{out}_next;")
+                yield f"        state.{out}_next = results.{out};"
+                if func.is_init:
+                    yield f"        state.{out}_curr = state.{out}_next;"
         else:
-            html.append(f"        Logic_{func_name}({args_str});")
-        html.append("    }\n")
-
-    html.append("    // --- Procedures ---")
-    html.append("    function SwapBuffers() {")
-    for table_name in data.get('tables', {}):
-        # Deep copy for arrays if needed
-        html.append(f"        state.{table_name}_curr = {{ ...state.{table_name}_next, pos_x: state.{table_name}_next.pos_x ? [...state.{table_name}_next.pos_x]:undefined, pos_y: state.{table_name}_next.pos_y ? [...state.{table_name}_next.pos_y]:undefined }};")
-    html.append("    }\n")
-
-    for proc_name, func_list in data.get('procedures', {}).items():
-        html.append(f"    function {proc_name}() {{")
-        for func in func_list:
-            html.append(f"        Wrapper_{func}();")
-        if proc_name == "Loop":
-            html.append("        SwapBuffers();")
-        html.append("    }\n")
-
-    html.append(f"""    // --- p5.js Lifecycle ---
+            yield f"        Logic_{func_name}({args_str});"
+        if memoize and not func.is_init:
+            for out in outputs:
+                yield f"        ptfWritten.{out} = true;"
+        if profile:
+            yield f"        Ptf_ProfileRecord(ptfProfile.wrappers.{func_name}, ptfStart);"
+        yield "    }\n"
+
+    yield "    // --- Procedures ---"
+    yield "    function SwapBuffers() {"
+    if profile:
+        yield "        const ptfStart = performance.now();"
+    for table in tables:
+        table_name = table.name
+        if memoize and table_name not in changing:
+            continue   # only Setup writes it, and Setup fills _curr
+        if inplace and table_name not in swapped:
+            if memoize:
+                # Single instance: the write already went to _curr
+                yield f"        if (ptfWritten.{table_name}) {{ ptfWritten.{table_name} = false; ptfVersion.{table_name} = ++ptfClock; }}"
+            continue
+        prefix = table.prefix
+        swap = []
+        if inplace:
+            swap.append(f"{{ const prev = state.{table_name}_curr; state.{table_name}_curr = state.{table_name}_next; state.{table_name}_next = prev; }}")
+        elif table.is_entity:
+            swap.append(f"{prefix}_Copy(state.{table_name}_curr, state.{table_name}_next);")
+            if profile:
+                row_bytes = " + ".join(f"state.{table_name}_next.{col}.BYTES_PER_ELEMENT"
+                                       for col in table.columns)
+                swap.append(f"ptfProfile.swap.bytes += state.{table_name}_next.count * ({row_bytes});")
+        else:
+            if profile:
+                swap.append(f"ptfProfile.swap.bytes += Ptf_ObjectBytes(state.{table_name}_next);")
+            # Deep copy for arrays if needed
+            swap.append(f"state.{table_name}_curr = {{ ...state.{table_name}_next, pos_x: state.{table_name}_next.pos_x ? [...state.{table_name}_next.pos_x]:undefined, pos_y: state.{table_name}_next.pos_y ? [...state.{table_name}_next.pos_y]:undefined }};")
+        if table.index:
+            swap.append(f"{prefix}_IndexUpdate(state.{table_name}_curr);")
+        if not memoize:
+            yield from (f"        {line}" for line in swap)
+            continue
+        equal = (f"{prefix}_Equal" if table.is_entity else "Ptf_TableEqual") + f"(state.{table_name}_next, state.{table_name}_curr)"
+        yield f"        if (ptfWritten.{table_name}) {{"
+        yield f"            ptfWritten.{table_name} = false;"
+        yield f"            if (!{equal}) {{"
+        yield from (f"                {line}" for line in swap)
+        yield f"                ptfVersion.{table_name} = ++ptfClock;"
+        yield "            }"
+        yield "        }"
+    if profile:
+        yield "        Ptf_ProfileRecord(ptfProfile.swap, ptfStart);"
+    yield "    }\n"
+
+    if snapshots:
+        yield "    // --- Snapshots ---"
+        yield "    // The columns of every _curr table back to back in spec order, through a"
+        yield "    // little-endian DataView. Entity columns keep their full capacity with the"
+        yield "    // rows past count zeroed, so equal states always give equal bytes."
+        serialize, deserialize = [], []
+        offset = 0
+        for table in tables:
+            name = table.name
+            serialize.append(f"        t = state.{name}_curr;")
+            if table.is_entity:
+                deserialize.append(f"        t = state.{name}_curr;")
+                serialize.append(f"        view.setInt32({offset}, t.count, true);")
+                deserialize.append(f"        t.count = view.getInt32({offset}, true);")
+                offset += 4
+                for col in table.columns.values():
+                    size = JS_ELEMENT_BYTES[JS_TYPED_ARRAYS.get(col.type, 'Float64Array')]
+                    end = offset + size * table.capacity_value
+                    serialize.append(f"        bytes.set(new Uint8Array(t.{col.name}.buffer, t.{col.name}.byteOffset, t.count * {size}), {offset});"
+                                     f" bytes.fill(0, {offset} + t.count * {size}, {end});")
+                    deserialize.append(f"        new Uint8Array(t.{col.name}.buffer, t.{col.name}.byteOffset, {end - offset}).set(bytes.subarray({offset}, {end}));")
+                    offset = end
+                continue
+            deserialize.append(f"        t = state.{name}_curr;" if inplace else f"        t = state.{name}_curr = {{}};")
+            for col in table.columns.values():
+                if col.is_array:
+                    # Length first: Logic functions in copy mode may keep shorter plain arrays
+                    serialize.append(f"        {{ const a = t.{col.name}, n = Math.min(a.length, {col.length}); view.setInt32({offset}, n, true);"
+                                     f" for (let i = 0; i < {col.length}; i++) view.setInt32({offset + 4} + 4 * i, i < n ? a[i] : 0, true); }}")
+                    if inplace:
+                        deserialize.append(f"        for (let i = 0; i < {col.length}; i++) t.{col.name}[i] = view.getInt32({offset + 4} + 4 * i, true);")
+                    else:
+                        deserialize.append(f"        t.{col.name} = new Array(view.getInt32({offset}, true));")
+                        deserialize.append(f"        for (let i = 0; i < t.{col.name}.length; i++) t.{col.name}[i] = view.getInt32({offset + 4} + 4 * i, true);")
+                    offset += 4 + 4 * col.length
+                elif col.is_bitgrid:
+                    words = col.shape[1] * -(-col.shape[0] // 32)
+                    serialize.append(f"        for (let i = 0; i < {words}; i++) view.setUint32({offset} + 4 * i, t.{col.name}[i], true);")
+                    if not inplace:
+                        deserialize.append(f"        t.{col.name} = new Uint32Array({words});")
+                    deserialize.append(f"        for (let i = 0; i < {words}; i++) t.{col.name}[i] = view.getUint32({offset} + 4 * i, true);")
+                    offset += 4 * words
+                elif col.type == "bool":
+                    serialize.append(f"        view.setUint8({offset}, t.{col.name} ? 1 : 0);")
+                    deserialize.append(f"        t.{col.name} = view.getUint8({offset}) !== 0;")
+                    offset += 1
+                elif col.type == "int":
+                    serialize.append(f"        view.setInt32({offset}, t.{col.name}, true);")
+                    deserialize.append(f"        t.{col.name} = view.getInt32({offset}, true);")
+                    offset += 4
+                else:
+                    # JS numbers are doubles; storing float columns as float32 would round them
+                    serialize.append(f"        view.setFloat64({offset}, t.{col.name}, true);")
+                    deserialize.append(f"        t.{col.name} = view.getFloat64({offset}, true);")
+                    offset += 8
+        yield f"    const PTF_SNAPSHOT_SIZE = {offset};"
+        yield "    function Ptf_Serialize(bytes = new Uint8Array(PTF_SNAPSHOT_SIZE)) {"
+        yield "        const view = new DataView(bytes.buffer, bytes.byteOffset, PTF_SNAPSHOT_SIZE);"
+        yield "        let t;"
+        yield from serialize
+        yield "        return bytes;"
+        yield "    }"
+        yield "    function Ptf_Deserialize(bytes) {"
+        yield "        const view = new DataView(bytes.buffer, bytes.byteOffset, PTF_SNAPSHOT_SIZE);"
+        yield "        let t;"
+        yield from deserialize
+        for table in indexed_tables:
+            yield f"        {table.prefix}_IndexUpdate(state.{table.name}_curr);"
+        if memoize:
+            # Every table may have changed, so every memoized wrapper reruns
+            for table in tables:
+                yield f"        ptfVersion.{table.name} = ++ptfClock;"
+        yield "    }\n"
+        yield JS_HISTORY
+
+    for proc in spec.procedures.values():
+        yield f"    function {proc.name}() {{"
+        if profile:
+            yield "        const ptfStart = performance.now();"
+        for func in proc.functions:
+            yield f"        Wrapper_{func.name}();"
+        if proc.name == "Loop":
+            yield "        SwapBuffers();"
+            if snapshots:
+                yield "        ptfTick++;"
+                yield "        Ptf_HistoryRecord();"
+        elif memoize:
+            # Init functions wrote _curr directly; publish the new contents
+            init_written = {table.name for func in proc.functions if func.is_init for table in func.outputs}
+            for table in tables:
+                if table.name in init_written:
+                    yield f"        ptfVersion.{table.name} = ++ptfClock;"
+        if proc.name != "Loop":
+            # Swaps keep the indexes current in Loop; elsewhere writes land in _curr directly
+            proc_written = {table.name for func in proc.functions for table in func.outputs}
+            for table in indexed_tables:
+                if table.name in proc_written:
+                    yield f"        {table.prefix}_IndexUpdate(state.{table.name}_curr);"
+        if snapshots and proc.name == "Setup":
+            yield "        ptfTick = 0;"
+            yield "        Ptf_HistoryClear();"
+            yield "        Ptf_HistoryRecord();"
+        if profile:
+            yield f"        Ptf_ProfileRecord(ptfProfile.procedures.{proc.name}, ptfStart);"
+        yield "    }\n"
+
+    yield f"""    // --- p5.js Lifecycle ---
     function setup() {{
         createCanvas(SCREEN_WIDTH, SCREEN_HEIGHT);
         const project_name = '{project_name}';
@@ -433,51 +2289,351 @@ def generate_html_code(data):
     </script>
 </body>
 </html>
-""")
+"""
 
-    return "\n".join(html)
+def generate_html_code(data, buffers="copy", profile=False, memoize=False, snapshots=False):
+    """Generate the p5.js page as one string; see iter_html_code() for the options."""
+    return "\n".join(iter_html_code(data, buffers, profile, memoize, snapshots))
+
+def write_html_code(out, data, buffers="copy", profile=False, memoize=False, snapshots=False):
+    """Stream the p5.js page to the file-like object out; see iter_html_code() for the options."""
+    write_lines(out, iter_html_code(data, buffers, profile, memoize, snapshots))
+
+def write_lines(out, lines, batch=512):
+    """Write lines to out separated by newlines, exactly as "\n".join(lines) would.
+
+    Lines are written a batch at a time, so memory stays bounded by the batch
+    rather than by the size of the whole output.
+    """
+    pending = []
+    separator = ""
+    for line in lines:
+        pending.append(line)
+        if len(pending) >= batch:
+            out.write(separator + "\n".join(pending))
+            pending.clear()
+            separator = "\n"
+    if pending or not separator:
+        out.write(separator + "\n".join(pending))
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def generator_fingerprint():
+    digest = hashlib.sha256(GENERATOR_VERSION.encode())
+    for path in GENERATOR_SOURCES:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return f"{GENERATOR_VERSION}+{digest.hexdigest()[:16]}"
+
+def write_atomic(path, content):
+    """Write content to path so readers only ever see the old or the new file.
+
+    content is a string or an iterable of lines, which is streamed to disk
+    with write_lines() without building the whole file in memory.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            if isinstance(content, str):
+                f.write(content)
+            else:
+                write_lines(f, content)
+            f.flush()
+            os.fsync(f.fileno())
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_manifest(target_dir):
+    path = os.path.join(target_dir, MANIFEST_NAME)
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"outputs": {}}
+    if not isinstance(manifest.get("outputs"), dict):
+        return {"outputs": {}}
+    return manifest
+
+def save_manifest(target_dir, manifest):
+    write_atomic(os.path.join(target_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+
+def output_key(build_key, options, target):
+    """Manifest entry for one output: the spec and generator, plus only that target's options.
+
+    Keying on every target's options would make a C-only flag rebuild the
+    HTML and graph outputs as well.
+    """
+    return {**build_key, "options": options[target]}
+
+def is_up_to_date(manifest, output_path, build_key):
+    entry = manifest["outputs"].get(os.path.basename(output_path))
+    return entry == build_key and os.path.exists(output_path)
+
+GENERATORS = {
+    "c": generate_c_code,
+    "html": generate_html_code,
+    "graph": generate_graph_json,
+}
+
+# Same targets, yielding lines so build_project() can stream them to disk.
+LINE_GENERATORS = {
+    "c": iter_c_code,
+    "html": iter_html_code,
+    "graph": iter_graph_json,
+}
+
+class SpecCache:
+    """Keeps parsed specs and generated sources warm for the server loop.
+
+    Project files are re-read only when their mtime or size changes, and
+    everything is keyed by content hash so inline YAML that matches a file
+    (or an earlier request) is never parsed twice.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.stats = {}     # path -> (mtime_ns, size, spec_hash)
+        self.specs = {}     # spec_hash -> compiled Spec
+        self.outputs = {}   # (spec_hash, target) -> generated source
+
+    def hash_for_project(self, project):
+        path = f"{project}.yaml"
+        st = os.stat(path)
+        cached = self.stats.get(path)
+        # The spec may have been evicted since, in which case the file is read again.
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size and cached[2] in self.specs:
+            return cached[2]
+        with open(path, 'rb') as f:
+            spec_bytes = f.read()
+        spec_hash = hash_bytes(spec_bytes)
+        self.stats[path] = (st.st_mtime_ns, st.st_size, spec_hash)
+        self._remember(spec_hash, spec_bytes)
+        return spec_hash
+
+    def hash_for_text(self, text):
+        spec_bytes = text.encode() if isinstance(text, str) else text
+        spec_hash = hash_bytes(spec_bytes)
+        self._remember(spec_hash, spec_bytes)
+        return spec_hash
+
+    def _remember(self, spec_hash, spec_bytes):
+        if spec_hash in self.specs:
+            return
+        if len(self.specs) >= self.max_entries:
+            # Dicts keep insertion order, so this drops the oldest spec.
+            oldest = next(iter(self.specs))
+            del self.specs[oldest]
+            for key in [k for k in self.outputs if k[0] == oldest]:
+                del self.outputs[key]
+        self.specs[spec_hash] = load_spec_bytes(spec_bytes, spec_hash)
+
+    def generate(self, spec_hash, target, options=None):
+        options = options or {}
+        key = (spec_hash, target, json.dumps(options, sort_keys=True))
+        if key not in self.outputs:
+            self.outputs[key] = GENERATORS[target](self.specs[spec_hash], **options)
+        return self.outputs[key]
+
+def handle_request(cache, request):
+    target = request.get("target", "html")
+    if target not in GENERATORS:
+        raise ValueError(f"unknown target {target!r} (expected one of {sorted(GENERATORS)})")
+    if "yaml" in request:
+        spec_hash = cache.hash_for_text(request["yaml"])
+    elif "project" in request:
+        project = request["project"]
+        if not project or os.path.basename(project) != project:
+            raise ValueError(f"invalid project name {project!r}")
+        spec_hash = cache.hash_for_project(project)
+    else:
+        raise ValueError("request needs either 'project' or 'yaml'")
+    options = request.get("options") or {}
+    if not isinstance(options, dict):
+        raise ValueError("'options' must be an object of generator keyword arguments")
+    return cache.generate(spec_hash, target, options)
+
+def serve(stream_in, stream_out):
+    """Answer JSON-lines build requests until stream_in is closed.
+
+    Each request is an object with either "project" (name of a YAML file in the
+    working directory) or "yaml" (inline spec text), plus "target" ("c",
+    "html" or "graph"), optional generator keyword arguments in "options" (for example
+    {"buffers": "pointer"} for C) and an optional "id" that is echoed back. Each response is one line:
+    {"id": ..., "ok": true, "code": "..."} or {"id": ..., "ok": false, "error": "..."}.
+    """
+    cache = SpecCache()
+    import yaml  # noqa: F401 -- pay the import once at startup, not on the first request
+    for line in stream_in:
+        if not line.strip():
+            continue
+        request = {}
+        try:
+            request = json.loads(line)
+            response = {"ok": True, "code": handle_request(cache, request)}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        stream_out.write(json.dumps(response) + "\n")
+        stream_out.flush()
+
+OUTPUT_TARGETS = [
+    # (target, label, output suffix)
+    ("c", "C", "_code.c"),
+    ("html", "HTML", "_code.html"),
+    ("graph", "graph", "_graph.json"),
+]
+
+def build_project(project_name, yaml_path, spec_bytes, build_key, stale, target_dir, options):
+    """Load one spec (from the compiled-spec cache when possible) and regenerate its stale outputs.
+
+    This may run in a worker process, so it reports back instead of printing or
+    touching the manifest: it returns the log lines, the manifest entries for
+    outputs it wrote and per-phase timings in milliseconds.
+    """
+    result = {"project": project_name, "log": [f"Processing project: {project_name}..."],
+              "outputs": {}, "timings": {}}
+    start = time.perf_counter()
+    try:
+        spec = load_spec_bytes(spec_bytes, build_key["spec_hash"])
+    except SpecError as e:
+        result["log"].append(f"  Invalid spec {yaml_path}: {e}")
+        return result
+    except Exception as e:
+        result["log"].append(f"  Error reading {yaml_path}: {e}")
+        return result
+    finally:
+        result["timings"]["parse"] = (time.perf_counter() - start) * 1000
+
+    for target, label, suffix in OUTPUT_TARGETS:
+        if target not in stale:
+            continue
+        output_path = os.path.join(target_dir, f"{project_name}{suffix}")
+        start = time.perf_counter()
+        try:
+            write_atomic(output_path, LINE_GENERATORS[target](spec, **options[target]))
+            result["outputs"][os.path.basename(output_path)] = output_key(build_key, options, target)
+            result["log"].append(f"  Generated {output_path}")
+        except Exception as e:
+            result["log"].append(f"  Error generating {label} for {project_name}: {e}")
+        result["timings"][target] = (time.perf_counter() - start) * 1000
+    return result
+
+def _build_project_task(task):
+    return build_project(*task)
+
+def print_timing_summary(results):
+    columns = ["parse"] + [target for target, _, _ in OUTPUT_TARGETS]
+    rows = sorted(results, key=lambda r: sum(r["timings"].values()), reverse=True)
+    width = max(len("project"), *(len(r["project"]) for r in rows))
+    print("Timing (ms):")
+    print("  " + "project".ljust(width) + "".join(f"{name:>9}" for name in columns + ["total"]))
+    for r in rows:
+        cells = [f"{r['timings'][name]:9.1f}" if name in r["timings"] else f"{'-':>9}" for name in columns]
+        print("  " + r["project"].ljust(width) + "".join(cells) + f"{sum(r['timings'].values()):9.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate C and p5.js code from project YAML specs.")
+    parser.add_argument("projects", nargs="*", help="project names to build (default: every *.yaml)")
+    parser.add_argument("--force", action="store_true", help="ignore the build manifest and regenerate everything")
+    parser.add_argument("--serve", action="store_true", help="answer JSON-lines build requests on stdin instead of writing files")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N", help="build projects in N worker processes (default: 1)")
+    parser.add_argument("--c-buffers", choices=C_BUFFER_MODES, default="copy",
+                        help="C double buffering: copy structs on swap, or flip pointers (default: copy)")
+    parser.add_argument("--html-buffers", choices=HTML_BUFFER_MODES, default="copy",
+                        help="p5.js double buffering: rebuild objects on swap, or preallocate and flip (default: copy)")
+    parser.add_argument("--c-threads", type=int, default=0, metavar="N",
+                        help="run independent Loop/Setup functions concurrently on N pthreads (default: off)")
+    parser.add_argument("--profile", action="store_true",
+                        help="instrument wrappers, procedures and buffer swaps with timing counters (default: off)")
+    parser.add_argument("--memoize", action="store_true",
+                        help="skip pure functions whose input tables did not change since their last run (default: off)")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="generate state serialization and a rewind history of recent ticks (default: off)")
+    parser.add_argument("--c-library", action="store_true",
+                        help="build the C output as a shared library over caller-owned states (see native_sim.py)")
+    parser.add_argument("--analyze", action="store_true", help="print the dataflow report (hazards and stages) as JSON and exit")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(sys.stdin, sys.stdout)
+        return
 
-def main():
     target_dir = 'generated'
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
 
-    yaml_files = glob.glob("*.yaml")
+    if args.projects:
+        yaml_files = [f"{name}.yaml" for name in args.projects]
+    else:
+        yaml_files = sorted(glob.glob("*.yaml"))
     if not yaml_files:
         print("No YAML files found in the current directory.")
         return
 
+    if args.analyze:
+        report = {}
+        for yaml_path in yaml_files:
+            with open(yaml_path, 'rb') as f:
+                report[os.path.splitext(os.path.basename(yaml_path))[0]] = analyze_dataflow(load_spec_bytes(f.read()))
+        print(json.dumps(report, indent=2))
+        return
+
+    manifest = load_manifest(target_dir)
+    fingerprint = generator_fingerprint()
+    options = {
+        "c": {"buffers": args.c_buffers, "threads": args.c_threads, "profile": args.profile, "memoize": args.memoize,
+              "snapshots": args.snapshots, "library": args.c_library},
+        "html": {"buffers": args.html_buffers, "profile": args.profile, "memoize": args.memoize,
+                 "snapshots": args.snapshots},
+        "graph": {},
+    }
+    tasks = []
+
     for yaml_path in yaml_files:
         project_name = os.path.splitext(os.path.basename(yaml_path))[0]
-        print(f"Processing project: {project_name}...")
 
         try:
-            with open(yaml_path, 'r') as f:
-                data = yaml.safe_load(f)
+            with open(yaml_path, 'rb') as f:
+                spec_bytes = f.read()
         except Exception as e:
             print(f"  Error reading {yaml_path}: {e}")
             continue
 
-        # Generate C
-        try:
-            generated_c = generate_c_code(data)
-            c_output = os.path.join(target_dir, f"{project_name}_code.c")
-            with open(c_output, 'w') as f:
-                f.write(generated_c)
-            print(f"  Generated {c_output}")
-        except Exception as e:
-            print(f"  Error generating C for {project_name}: {e}")
+        build_key = {"spec": yaml_path, "spec_hash": hash_bytes(spec_bytes), "generator": fingerprint}
+        stale = [target for target, _, suffix in OUTPUT_TARGETS
+                 if args.force or not is_up_to_date(manifest, os.path.join(target_dir, f"{project_name}{suffix}"),
+                                                    output_key(build_key, options, target))]
+        if not stale:
+            print(f"Up to date: {project_name}")
+            continue
+        tasks.append((project_name, yaml_path, spec_bytes, build_key, stale, target_dir, options))
 
-        # Generate HTML
-        try:
-            generated_html = generate_html_code(data)
-            html_output = os.path.join(target_dir, f"{project_name}_code.html")
-            with open(html_output, 'w') as f:
-                f.write(generated_html)
-            print(f"  Generated {html_output}")
-        except Exception as e:
-            print(f"  Error generating HTML for {project_name}: {e}")
+    if args.jobs > 1 and len(tasks) > 1:
+        # map() yields in submission order, so output stays deterministic no
+        # matter which worker finishes first.
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_build_project_task, tasks))
+    else:
+        results = map(_build_project_task, tasks)
+
+    finished = []
+    for result in results:
+        print("\n".join(result["log"]))
+        manifest["outputs"].update(result["outputs"])
+        finished.append(result)
 
+    if any(result["outputs"] for result in finished):
+        save_manifest(target_dir, manifest)
+    if finished:
+        print_timing_summary(finished)
     print("Done.")
 
 if __name__ == "__main__":
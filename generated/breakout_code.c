@@ -1,8 +1,11 @@
 // Generated Code for Project: Breakout
+#define _POSIX_C_SOURCE 200809L
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <math.h>
+#include <stdint.h>
 
 // --- Configuration Constants ---
 #define SCREEN_WIDTH 800.0f
@@ -18,6 +21,106 @@
 #define BRICK_HEIGHT 20.0f
 #define INITIAL_LIVES 3
 
+// --- Bit Grids ---
+// Row y of a bitgrid column is words [y * words, (y + 1) * words), with cell x
+// at bit x % 64 of word x / 64. Bits past the width are always zero. Masks
+// hold one uint64 per row, bit i covering column x + i.
+#define PTF_BITGRID_WORDS(width) (((width) + 63) / 64)
+#if defined(__GNUC__)
+#define PTF_POPCOUNT64(v) __builtin_popcountll(v)
+#else
+static inline int PTF_POPCOUNT64(uint64_t v) { int n = 0; for (; v; v &= v - 1) n++; return n; }
+#endif
+static inline uint64_t Ptf_BitWordMask(int width, int w) {
+    int bits = width - 64 * w;
+    return bits <= 0 ? 0 : bits >= 64 ? ~0ull : (1ull << bits) - 1;
+}
+static inline bool Ptf_BitGet(const uint64_t *g, int width, int height, int x, int y) {
+    if (x < 0 || x >= width || y < 0 || y >= height) return false;
+    return (g[y * PTF_BITGRID_WORDS(width) + x / 64] >> (x % 64)) & 1u;
+}
+static inline void Ptf_BitSet(uint64_t *g, int width, int height, int x, int y, bool on) {
+    if (x < 0 || x >= width || y < 0 || y >= height) return;
+    uint64_t *word = &g[y * PTF_BITGRID_WORDS(width) + x / 64], bit = 1ull << (x % 64);
+    *word = on ? *word | bit : *word & ~bit;
+}
+static inline bool Ptf_BitRowFull(const uint64_t *g, int width, int y) {
+    const uint64_t *row = g + y * PTF_BITGRID_WORDS(width);
+    for (int w = 0; w < PTF_BITGRID_WORDS(width); w++) if (row[w] != Ptf_BitWordMask(width, w)) return false;
+    return true;
+}
+// Removes row y; the rows above it move down one and the top row is emptied.
+static inline void Ptf_BitClearRow(uint64_t *g, int width, int y) {
+    int words = PTF_BITGRID_WORDS(width);
+    memmove(g + words, g, sizeof(uint64_t) * words * y);
+    memset(g, 0, sizeof(uint64_t) * words);
+}
+// Removes every full row in one pass, moving the rest down; returns how many went.
+static inline int Ptf_BitClearFullRows(uint64_t *g, int width, int height) {
+    int words = PTF_BITGRID_WORDS(width), dst = height - 1;
+    for (int src = height - 1; src >= 0; src--) {
+        if (Ptf_BitRowFull(g, width, src)) continue;
+        if (dst != src) memcpy(g + dst * words, g + src * words, sizeof(uint64_t) * words);
+        dst--;
+    }
+    memset(g, 0, sizeof(uint64_t) * words * (dst + 1));
+    return dst + 1;
+}
+// True when mask row m placed at column x leaves the row or covers a set cell.
+static inline bool Ptf_BitRowHits(const uint64_t *row, int width, uint64_t m, int x) {
+    if (x < 0) {
+        if (x <= -64 || (m & ((1ull << -x) - 1))) return true;
+        m >>= -x;
+        x = 0;
+    }
+    if (x >= width) return true;
+    int w = x / 64, s = x % 64;
+    uint64_t lo = m << s, hi = s ? m >> (64 - s) : 0;
+    if (lo & ~Ptf_BitWordMask(width, w)) return true;
+    if (hi && (hi & ~Ptf_BitWordMask(width, w + 1))) return true;
+    return (row[w] & lo) || (hi && (row[w + 1] & hi));
+}
+// True when any set bit of the mask, placed with its first row at (x, y), falls
+// outside the grid or on a set cell.
+static inline bool Ptf_BitOverlaps(const uint64_t *g, int width, int height, const uint64_t *mask, int rows, int x, int y) {
+    for (int r = 0; r < rows; r++) {
+        if (!mask[r]) continue;
+        if (y + r < 0 || y + r >= height) return true;
+        if (Ptf_BitRowHits(g + (y + r) * PTF_BITGRID_WORDS(width), width, mask[r], x)) return true;
+    }
+    return false;
+}
+// Sets the cells under the mask at (x, y); bits outside the grid are dropped.
+static inline void Ptf_BitStamp(uint64_t *g, int width, int height, const uint64_t *mask, int rows, int x, int y) {
+    for (int r = 0; r < rows; r++) {
+        uint64_t m = mask[r];
+        int col = x;
+        if (!m || y + r < 0 || y + r >= height || col <= -64 || col >= width) continue;
+        if (col < 0) { m >>= -col; col = 0; }
+        uint64_t *row = g + (y + r) * PTF_BITGRID_WORDS(width);
+        int w = col / 64, s = col % 64;
+        row[w] |= (m << s) & Ptf_BitWordMask(width, w);
+        if (s && w + 1 < PTF_BITGRID_WORDS(width)) row[w + 1] |= (m >> (64 - s)) & Ptf_BitWordMask(width, w + 1);
+    }
+}
+static inline int Ptf_BitCount(const uint64_t *g, int width, int height) {
+    int n = 0;
+    for (int i = 0; i < PTF_BITGRID_WORDS(width) * height; i++) n += PTF_POPCOUNT64(g[i]);
+    return n;
+}
+
+#define BRICKS_ALIVE_WIDTH (BRICK_COLS)
+#define BRICKS_ALIVE_HEIGHT (BRICK_ROWS)
+#define BRICKS_ALIVE_WORDS (BRICKS_ALIVE_HEIGHT * PTF_BITGRID_WORDS(BRICKS_ALIVE_WIDTH))
+static inline bool Bricks_AliveGet(const uint64_t *g, int x, int y) { return Ptf_BitGet(g, BRICKS_ALIVE_WIDTH, BRICKS_ALIVE_HEIGHT, x, y); }
+static inline void Bricks_AliveSet(uint64_t *g, int x, int y, bool on) { Ptf_BitSet(g, BRICKS_ALIVE_WIDTH, BRICKS_ALIVE_HEIGHT, x, y, on); }
+static inline bool Bricks_AliveRowFull(const uint64_t *g, int y) { return Ptf_BitRowFull(g, BRICKS_ALIVE_WIDTH, y); }
+static inline void Bricks_AliveClearRow(uint64_t *g, int y) { Ptf_BitClearRow(g, BRICKS_ALIVE_WIDTH, y); }
+static inline int Bricks_AliveClearFullRows(uint64_t *g) { return Ptf_BitClearFullRows(g, BRICKS_ALIVE_WIDTH, BRICKS_ALIVE_HEIGHT); }
+static inline bool Bricks_AliveOverlaps(const uint64_t *g, const uint64_t *mask, int rows, int x, int y) { return Ptf_BitOverlaps(g, BRICKS_ALIVE_WIDTH, BRICKS_ALIVE_HEIGHT, mask, rows, x, y); }
+static inline void Bricks_AliveStamp(uint64_t *g, const uint64_t *mask, int rows, int x, int y) { Ptf_BitStamp(g, BRICKS_ALIVE_WIDTH, BRICKS_ALIVE_HEIGHT, mask, rows, x, y); }
+static inline int Bricks_AliveCount(const uint64_t *g) { return Ptf_BitCount(g, BRICKS_ALIVE_WIDTH, BRICKS_ALIVE_HEIGHT); }
+
 // --- Table Structures ---
 typedef struct {
     float x;
@@ -37,7 +140,8 @@ typedef struct {
 } BallTable;
 
 typedef struct {
-    int grid[100];
+    int grid[BRICK_ROWS * BRICK_COLS];
+    uint64_t alive[BRICKS_ALIVE_WORDS];
     int rows;
     int cols;
     float brick_width;
@@ -71,6 +175,12 @@ struct GameState {
     GamestateTable game_state_next;
 } state;
 
+// --- Input ---
+// One bit per key; filled by the platform layer (or the benchmark's input script).
+typedef struct { unsigned int keys; } PtfInput;
+PtfInput ptf_input;
+#define PTF_KEY_DOWN(bit) ((ptf_input.keys >> (bit)) & 1u)
+
 // --- Pure Logic Prototypes ---
 PaddleTable Logic_InitPaddle();
 BallTable Logic_InitBall();
@@ -88,6 +198,85 @@ void Logic_CheckBallLost(BallTable ball_in, ScoreTable score_in, GamestateTable
 ScoreTable Logic_UpdateScore(ScoreTable score_in, BricksTable bricks_in);
 GamestateTable Logic_CheckWinCondition(BricksTable bricks_in, GamestateTable game_state_in);
 
+#ifdef PTF_STUB_LOGIC
+PaddleTable Logic_InitPaddle() {
+    PaddleTable paddle_out;
+    memset(&paddle_out, 0, sizeof paddle_out);
+    return paddle_out;
+}
+BallTable Logic_InitBall() {
+    BallTable ball_out;
+    memset(&ball_out, 0, sizeof ball_out);
+    return ball_out;
+}
+BricksTable Logic_InitBricks() {
+    BricksTable bricks_out;
+    memset(&bricks_out, 0, sizeof bricks_out);
+    return bricks_out;
+}
+ScoreTable Logic_InitScore() {
+    ScoreTable score_out;
+    memset(&score_out, 0, sizeof score_out);
+    return score_out;
+}
+GamestateTable Logic_InitGameState() {
+    GamestateTable game_state_out;
+    memset(&game_state_out, 0, sizeof game_state_out);
+    return game_state_out;
+}
+GamestateTable Logic_UpdateGameState(GamestateTable game_state_in) {
+    (void)game_state_in;
+    return game_state_in;
+}
+void Logic_ProcessInput(PaddleTable paddle_in, BallTable ball_in, PaddleTable* paddle_out, BallTable* ball_out) {
+    (void)paddle_in;
+    (void)ball_in;
+    *paddle_out = paddle_in;
+    *ball_out = ball_in;
+}
+PaddleTable Logic_MovePaddle(PaddleTable paddle_in) {
+    (void)paddle_in;
+    return paddle_in;
+}
+BallTable Logic_MoveBall(BallTable ball_in) {
+    (void)ball_in;
+    return ball_in;
+}
+BallTable Logic_CheckPaddleCollision(BallTable ball_in, PaddleTable paddle_in) {
+    (void)ball_in;
+    (void)paddle_in;
+    return ball_in;
+}
+BallTable Logic_CheckWallCollision(BallTable ball_in) {
+    (void)ball_in;
+    return ball_in;
+}
+void Logic_CheckBrickCollision(BallTable ball_in, BricksTable bricks_in, BallTable* ball_out, BricksTable* bricks_out) {
+    (void)ball_in;
+    (void)bricks_in;
+    *ball_out = ball_in;
+    *bricks_out = bricks_in;
+}
+void Logic_CheckBallLost(BallTable ball_in, ScoreTable score_in, GamestateTable game_state_in, BallTable* ball_out, ScoreTable* score_out, GamestateTable* game_state_out) {
+    (void)ball_in;
+    (void)score_in;
+    (void)game_state_in;
+    *ball_out = ball_in;
+    *score_out = score_in;
+    *game_state_out = game_state_in;
+}
+ScoreTable Logic_UpdateScore(ScoreTable score_in, BricksTable bricks_in) {
+    (void)score_in;
+    (void)bricks_in;
+    return score_in;
+}
+GamestateTable Logic_CheckWinCondition(BricksTable bricks_in, GamestateTable game_state_in) {
+    (void)bricks_in;
+    (void)game_state_in;
+    return game_state_in;
+}
+#endif
+
 // --- Generated Wrappers ---
 void Wrapper_InitPaddle() {
     state.paddle_next = Logic_InitPaddle();
@@ -186,10 +375,78 @@ void Loop() {
     Swap_Buffers();
 }
 
+#ifdef PTF_BENCH
+// --- Benchmark Entry Point ---
+// usage: <binary> [ticks] [seed]; prints one JSON line.
+#include <time.h>
+
+static unsigned long long Ptf_NowNs(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (unsigned long long)ts.tv_sec * 1000000000ull + (unsigned long long)ts.tv_nsec;
+}
+
+static int Ptf_CompareNs(const void *a, const void *b) {
+    unsigned long long x = *(const unsigned long long *)a, y = *(const unsigned long long *)b;
+    return (x > y) - (x < y);
+}
+
+// Deterministic input script: xorshift32 over the key bitmask.
+static unsigned int ptf_rng;
+static unsigned int Ptf_NextInput(void) {
+    ptf_rng ^= ptf_rng << 13;
+    ptf_rng ^= ptf_rng >> 17;
+    ptf_rng ^= ptf_rng << 5;
+    return ptf_rng;
+}
+
+static void Ptf_Hash(unsigned long long *h, const void *data, size_t size) {
+    const unsigned char *bytes = data;
+    for (size_t i = 0; i < size; i++) {
+        *h = (*h ^ bytes[i]) * 1099511628211ull;
+    }
+}
+
+static unsigned long long Ptf_Checksum(void) {
+    unsigned long long h = 14695981039346656037ull;
+    Ptf_Hash(&h, &state.paddle_curr, sizeof state.paddle_curr);
+    Ptf_Hash(&h, &state.ball_curr, sizeof state.ball_curr);
+    Ptf_Hash(&h, &state.bricks_curr, sizeof state.bricks_curr);
+    Ptf_Hash(&h, &state.score_curr, sizeof state.score_curr);
+    Ptf_Hash(&h, &state.game_state_curr, sizeof state.game_state_curr);
+    return h;
+}
+
+int main(int argc, char **argv) {
+    long ticks = argc > 1 ? atol(argv[1]) : 100000;
+    unsigned int seed = argc > 2 ? (unsigned int)strtoul(argv[2], NULL, 10) : 1u;
+    if (ticks < 1) ticks = 1;
+    unsigned long long *samples = malloc(sizeof *samples * (size_t)ticks);
+    if (!samples) return 1;
+    ptf_rng = seed ? seed : 1u;
+    srand(seed);
+    Setup();
+    unsigned long long total = 0;
+    for (long t = 0; t < ticks; t++) {
+        ptf_input.keys = Ptf_NextInput();
+        unsigned long long start = Ptf_NowNs();
+        Loop();
+        samples[t] = Ptf_NowNs() - start;
+        total += samples[t];
+    }
+    qsort(samples, (size_t)ticks, sizeof *samples, Ptf_CompareNs);
+    printf("{\"project\": \"Breakout\", \"ticks\": %ld, \"seed\": %u, "
+           "\"mean_ns\": %.1f, \"p50_ns\": %llu, \"p99_ns\": %llu, \"checksum\": \"%016llx\"}\n",
+           ticks, seed, (double)total / ticks, samples[ticks / 2], samples[(ticks * 99) / 100], Ptf_Checksum());
+    free(samples);
+    return 0;
+}
+#else
 int main() {
     Setup();
     while (true) {
         Loop();
     }
     return 0;
-}
\ No newline at end of file
+}
+#endif
\ No newline at end of file
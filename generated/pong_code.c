@@ -1,7 +1,9 @@
 // Generated Code for Project: Pong
+#define _POSIX_C_SOURCE 200809L
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <math.h>
 
 // --- Configuration Constants ---
@@ -54,6 +56,12 @@ struct GameState {
     ScoreTable score_next;
 } state;
 
+// --- Input ---
+// One bit per key; filled by the platform layer (or the benchmark's input script).
+typedef struct { unsigned int keys; } PtfInput;
+PtfInput ptf_input;
+#define PTF_KEY_DOWN(bit) ((ptf_input.keys >> (bit)) & 1u)
+
 // --- Pure Logic Prototypes ---
 void Logic_InitPaddles(Paddle1Table* paddle1_out, Paddle2Table* paddle2_out);
 BallTable Logic_InitBall();
@@ -65,6 +73,49 @@ ScoreTable Logic_CheckScore(BallTable ball_in, ScoreTable score_in);
 void Logic_GameLost(ScoreTable score_in);
 void Logic_GameWon(ScoreTable score_in);
 
+#ifdef PTF_STUB_LOGIC
+void Logic_InitPaddles(Paddle1Table* paddle1_out, Paddle2Table* paddle2_out) {
+    memset(paddle1_out, 0, sizeof *paddle1_out);
+    memset(paddle2_out, 0, sizeof *paddle2_out);
+}
+BallTable Logic_InitBall() {
+    BallTable ball_out;
+    memset(&ball_out, 0, sizeof ball_out);
+    return ball_out;
+}
+ScoreTable Logic_InitScore() {
+    ScoreTable score_out;
+    memset(&score_out, 0, sizeof score_out);
+    return score_out;
+}
+Paddle1Table Logic_MovePaddle1(Paddle1Table paddle1_in) {
+    (void)paddle1_in;
+    return paddle1_in;
+}
+Paddle2Table Logic_MovePaddle2(Paddle2Table paddle2_in, BallTable ball_in) {
+    (void)paddle2_in;
+    (void)ball_in;
+    return paddle2_in;
+}
+BallTable Logic_MoveBall(BallTable ball_in, Paddle1Table paddle1_in, Paddle2Table paddle2_in) {
+    (void)ball_in;
+    (void)paddle1_in;
+    (void)paddle2_in;
+    return ball_in;
+}
+ScoreTable Logic_CheckScore(BallTable ball_in, ScoreTable score_in) {
+    (void)ball_in;
+    (void)score_in;
+    return score_in;
+}
+void Logic_GameLost(ScoreTable score_in) {
+    (void)score_in;
+}
+void Logic_GameWon(ScoreTable score_in) {
+    (void)score_in;
+}
+#endif
+
 // --- Generated Wrappers ---
 void Wrapper_InitPaddles() {
     Logic_InitPaddles(&state.paddle1_next, &state.paddle2_next);
@@ -131,10 +182,77 @@ void Loop() {
     Swap_Buffers();
 }
 
+#ifdef PTF_BENCH
+// --- Benchmark Entry Point ---
+// usage: <binary> [ticks] [seed]; prints one JSON line.
+#include <time.h>
+
+static unsigned long long Ptf_NowNs(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (unsigned long long)ts.tv_sec * 1000000000ull + (unsigned long long)ts.tv_nsec;
+}
+
+static int Ptf_CompareNs(const void *a, const void *b) {
+    unsigned long long x = *(const unsigned long long *)a, y = *(const unsigned long long *)b;
+    return (x > y) - (x < y);
+}
+
+// Deterministic input script: xorshift32 over the key bitmask.
+static unsigned int ptf_rng;
+static unsigned int Ptf_NextInput(void) {
+    ptf_rng ^= ptf_rng << 13;
+    ptf_rng ^= ptf_rng >> 17;
+    ptf_rng ^= ptf_rng << 5;
+    return ptf_rng;
+}
+
+static void Ptf_Hash(unsigned long long *h, const void *data, size_t size) {
+    const unsigned char *bytes = data;
+    for (size_t i = 0; i < size; i++) {
+        *h = (*h ^ bytes[i]) * 1099511628211ull;
+    }
+}
+
+static unsigned long long Ptf_Checksum(void) {
+    unsigned long long h = 14695981039346656037ull;
+    Ptf_Hash(&h, &state.paddle1_curr, sizeof state.paddle1_curr);
+    Ptf_Hash(&h, &state.paddle2_curr, sizeof state.paddle2_curr);
+    Ptf_Hash(&h, &state.ball_curr, sizeof state.ball_curr);
+    Ptf_Hash(&h, &state.score_curr, sizeof state.score_curr);
+    return h;
+}
+
+int main(int argc, char **argv) {
+    long ticks = argc > 1 ? atol(argv[1]) : 100000;
+    unsigned int seed = argc > 2 ? (unsigned int)strtoul(argv[2], NULL, 10) : 1u;
+    if (ticks < 1) ticks = 1;
+    unsigned long long *samples = malloc(sizeof *samples * (size_t)ticks);
+    if (!samples) return 1;
+    ptf_rng = seed ? seed : 1u;
+    srand(seed);
+    Setup();
+    unsigned long long total = 0;
+    for (long t = 0; t < ticks; t++) {
+        ptf_input.keys = Ptf_NextInput();
+        unsigned long long start = Ptf_NowNs();
+        Loop();
+        samples[t] = Ptf_NowNs() - start;
+        total += samples[t];
+    }
+    qsort(samples, (size_t)ticks, sizeof *samples, Ptf_CompareNs);
+    printf("{\"project\": \"Pong\", \"ticks\": %ld, \"seed\": %u, "
+           "\"mean_ns\": %.1f, \"p50_ns\": %llu, \"p99_ns\": %llu, \"checksum\": \"%016llx\"}\n",
+           ticks, seed, (double)total / ticks, samples[ticks / 2], samples[(ticks * 99) / 100], Ptf_Checksum());
+    free(samples);
+    return 0;
+}
+#else
 int main() {
     Setup();
     while (true) {
         Loop();
     }
     return 0;
-}
\ No newline at end of file
+}
+#endif
\ No newline at end of file
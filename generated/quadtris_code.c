@@ -1,8 +1,11 @@
 // Generated Code for Project: Quadtris
+#define _POSIX_C_SOURCE 200809L
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <math.h>
+#include <stdint.h>
 
 // --- Configuration Constants ---
 #define SCREEN_WIDTH 400.0f
@@ -16,6 +19,106 @@
 #define LINES_PER_LEVEL 10
 #define PREVIEW_COUNT 3
 
+// --- Bit Grids ---
+// Row y of a bitgrid column is words [y * words, (y + 1) * words), with cell x
+// at bit x % 64 of word x / 64. Bits past the width are always zero. Masks
+// hold one uint64 per row, bit i covering column x + i.
+#define PTF_BITGRID_WORDS(width) (((width) + 63) / 64)
+#if defined(__GNUC__)
+#define PTF_POPCOUNT64(v) __builtin_popcountll(v)
+#else
+static inline int PTF_POPCOUNT64(uint64_t v) { int n = 0; for (; v; v &= v - 1) n++; return n; }
+#endif
+static inline uint64_t Ptf_BitWordMask(int width, int w) {
+    int bits = width - 64 * w;
+    return bits <= 0 ? 0 : bits >= 64 ? ~0ull : (1ull << bits) - 1;
+}
+static inline bool Ptf_BitGet(const uint64_t *g, int width, int height, int x, int y) {
+    if (x < 0 || x >= width || y < 0 || y >= height) return false;
+    return (g[y * PTF_BITGRID_WORDS(width) + x / 64] >> (x % 64)) & 1u;
+}
+static inline void Ptf_BitSet(uint64_t *g, int width, int height, int x, int y, bool on) {
+    if (x < 0 || x >= width || y < 0 || y >= height) return;
+    uint64_t *word = &g[y * PTF_BITGRID_WORDS(width) + x / 64], bit = 1ull << (x % 64);
+    *word = on ? *word | bit : *word & ~bit;
+}
+static inline bool Ptf_BitRowFull(const uint64_t *g, int width, int y) {
+    const uint64_t *row = g + y * PTF_BITGRID_WORDS(width);
+    for (int w = 0; w < PTF_BITGRID_WORDS(width); w++) if (row[w] != Ptf_BitWordMask(width, w)) return false;
+    return true;
+}
+// Removes row y; the rows above it move down one and the top row is emptied.
+static inline void Ptf_BitClearRow(uint64_t *g, int width, int y) {
+    int words = PTF_BITGRID_WORDS(width);
+    memmove(g + words, g, sizeof(uint64_t) * words * y);
+    memset(g, 0, sizeof(uint64_t) * words);
+}
+// Removes every full row in one pass, moving the rest down; returns how many went.
+static inline int Ptf_BitClearFullRows(uint64_t *g, int width, int height) {
+    int words = PTF_BITGRID_WORDS(width), dst = height - 1;
+    for (int src = height - 1; src >= 0; src--) {
+        if (Ptf_BitRowFull(g, width, src)) continue;
+        if (dst != src) memcpy(g + dst * words, g + src * words, sizeof(uint64_t) * words);
+        dst--;
+    }
+    memset(g, 0, sizeof(uint64_t) * words * (dst + 1));
+    return dst + 1;
+}
+// True when mask row m placed at column x leaves the row or covers a set cell.
+static inline bool Ptf_BitRowHits(const uint64_t *row, int width, uint64_t m, int x) {
+    if (x < 0) {
+        if (x <= -64 || (m & ((1ull << -x) - 1))) return true;
+        m >>= -x;
+        x = 0;
+    }
+    if (x >= width) return true;
+    int w = x / 64, s = x % 64;
+    uint64_t lo = m << s, hi = s ? m >> (64 - s) : 0;
+    if (lo & ~Ptf_BitWordMask(width, w)) return true;
+    if (hi && (hi & ~Ptf_BitWordMask(width, w + 1))) return true;
+    return (row[w] & lo) || (hi && (row[w + 1] & hi));
+}
+// True when any set bit of the mask, placed with its first row at (x, y), falls
+// outside the grid or on a set cell.
+static inline bool Ptf_BitOverlaps(const uint64_t *g, int width, int height, const uint64_t *mask, int rows, int x, int y) {
+    for (int r = 0; r < rows; r++) {
+        if (!mask[r]) continue;
+        if (y + r < 0 || y + r >= height) return true;
+        if (Ptf_BitRowHits(g + (y + r) * PTF_BITGRID_WORDS(width), width, mask[r], x)) return true;
+    }
+    return false;
+}
+// Sets the cells under the mask at (x, y); bits outside the grid are dropped.
+static inline void Ptf_BitStamp(uint64_t *g, int width, int height, const uint64_t *mask, int rows, int x, int y) {
+    for (int r = 0; r < rows; r++) {
+        uint64_t m = mask[r];
+        int col = x;
+        if (!m || y + r < 0 || y + r >= height || col <= -64 || col >= width) continue;
+        if (col < 0) { m >>= -col; col = 0; }
+        uint64_t *row = g + (y + r) * PTF_BITGRID_WORDS(width);
+        int w = col / 64, s = col % 64;
+        row[w] |= (m << s) & Ptf_BitWordMask(width, w);
+        if (s && w + 1 < PTF_BITGRID_WORDS(width)) row[w + 1] |= (m >> (64 - s)) & Ptf_BitWordMask(width, w + 1);
+    }
+}
+static inline int Ptf_BitCount(const uint64_t *g, int width, int height) {
+    int n = 0;
+    for (int i = 0; i < PTF_BITGRID_WORDS(width) * height; i++) n += PTF_POPCOUNT64(g[i]);
+    return n;
+}
+
+#define GRID_OCCUPIED_WIDTH (GRID_WIDTH)
+#define GRID_OCCUPIED_HEIGHT (GRID_HEIGHT)
+#define GRID_OCCUPIED_WORDS (GRID_OCCUPIED_HEIGHT * PTF_BITGRID_WORDS(GRID_OCCUPIED_WIDTH))
+static inline bool Grid_OccupiedGet(const uint64_t *g, int x, int y) { return Ptf_BitGet(g, GRID_OCCUPIED_WIDTH, GRID_OCCUPIED_HEIGHT, x, y); }
+static inline void Grid_OccupiedSet(uint64_t *g, int x, int y, bool on) { Ptf_BitSet(g, GRID_OCCUPIED_WIDTH, GRID_OCCUPIED_HEIGHT, x, y, on); }
+static inline bool Grid_OccupiedRowFull(const uint64_t *g, int y) { return Ptf_BitRowFull(g, GRID_OCCUPIED_WIDTH, y); }
+static inline void Grid_OccupiedClearRow(uint64_t *g, int y) { Ptf_BitClearRow(g, GRID_OCCUPIED_WIDTH, y); }
+static inline int Grid_OccupiedClearFullRows(uint64_t *g) { return Ptf_BitClearFullRows(g, GRID_OCCUPIED_WIDTH, GRID_OCCUPIED_HEIGHT); }
+static inline bool Grid_OccupiedOverlaps(const uint64_t *g, const uint64_t *mask, int rows, int x, int y) { return Ptf_BitOverlaps(g, GRID_OCCUPIED_WIDTH, GRID_OCCUPIED_HEIGHT, mask, rows, x, y); }
+static inline void Grid_OccupiedStamp(uint64_t *g, const uint64_t *mask, int rows, int x, int y) { Ptf_BitStamp(g, GRID_OCCUPIED_WIDTH, GRID_OCCUPIED_HEIGHT, mask, rows, x, y); }
+static inline int Grid_OccupiedCount(const uint64_t *g) { return Ptf_BitCount(g, GRID_OCCUPIED_WIDTH, GRID_OCCUPIED_HEIGHT); }
+
 // --- Table Structures ---
 typedef struct {
     int type;
@@ -28,13 +131,14 @@ typedef struct {
 } ActivepieceTable;
 
 typedef struct {
-    int cells[100];
+    int cells[GRID_WIDTH * GRID_HEIGHT];
+    uint64_t occupied[GRID_OCCUPIED_WORDS];
     int width;
     int height;
 } GridTable;
 
 typedef struct {
-    int queue[100];
+    int queue[PREVIEW_COUNT];
     int count;
 } NextpiecesTable;
 
@@ -68,6 +172,12 @@ struct GameState {
     GamestateTable game_state_next;
 } state;
 
+// --- Input ---
+// One bit per key; filled by the platform layer (or the benchmark's input script).
+typedef struct { unsigned int keys; } PtfInput;
+PtfInput ptf_input;
+#define PTF_KEY_DOWN(bit) ((ptf_input.keys >> (bit)) & 1u)
+
 // --- Pure Logic Prototypes ---
 ActivepieceTable Logic_InitActivePiece();
 GridTable Logic_InitGrid();
@@ -86,6 +196,97 @@ void Logic_SpawnNewPiece(ActivepieceTable active_piece_in, NextpiecesTable next_
 void Logic_UpdateScore(ScoreTable score_in, GamestateTable game_state_in, ScoreTable* score_out, GamestateTable* game_state_out);
 GamestateTable Logic_CheckGameOver(GridTable grid_in, ActivepieceTable active_piece_in, GamestateTable game_state_in);
 
+#ifdef PTF_STUB_LOGIC
+ActivepieceTable Logic_InitActivePiece() {
+    ActivepieceTable active_piece_out;
+    memset(&active_piece_out, 0, sizeof active_piece_out);
+    return active_piece_out;
+}
+GridTable Logic_InitGrid() {
+    GridTable grid_out;
+    memset(&grid_out, 0, sizeof grid_out);
+    return grid_out;
+}
+NextpiecesTable Logic_InitNextPieces() {
+    NextpiecesTable next_pieces_out;
+    memset(&next_pieces_out, 0, sizeof next_pieces_out);
+    return next_pieces_out;
+}
+ScoreTable Logic_InitScore() {
+    ScoreTable score_out;
+    memset(&score_out, 0, sizeof score_out);
+    return score_out;
+}
+GamestateTable Logic_InitGameState() {
+    GamestateTable game_state_out;
+    memset(&game_state_out, 0, sizeof game_state_out);
+    return game_state_out;
+}
+GamestateTable Logic_UpdateGameState(GamestateTable game_state_in) {
+    (void)game_state_in;
+    return game_state_in;
+}
+void Logic_ProcessInput(ActivepieceTable active_piece_in, GamestateTable game_state_in, ActivepieceTable* active_piece_out, GamestateTable* game_state_out) {
+    (void)active_piece_in;
+    (void)game_state_in;
+    *active_piece_out = active_piece_in;
+    *game_state_out = game_state_in;
+}
+GamestateTable Logic_UpdateDropTimer(GamestateTable game_state_in) {
+    (void)game_state_in;
+    return game_state_in;
+}
+void Logic_MoveActivePiece(ActivepieceTable active_piece_in, GamestateTable game_state_in, ActivepieceTable* active_piece_out, GamestateTable* game_state_out) {
+    (void)active_piece_in;
+    (void)game_state_in;
+    *active_piece_out = active_piece_in;
+    *game_state_out = game_state_in;
+}
+ActivepieceTable Logic_RotateActivePiece(ActivepieceTable active_piece_in) {
+    (void)active_piece_in;
+    return active_piece_in;
+}
+ActivepieceTable Logic_CheckCollision(ActivepieceTable active_piece_in, GridTable grid_in) {
+    (void)active_piece_in;
+    (void)grid_in;
+    return active_piece_in;
+}
+void Logic_LockPiece(ActivepieceTable active_piece_in, GridTable grid_in, GamestateTable game_state_in, GridTable* grid_out, GamestateTable* game_state_out, ActivepieceTable* active_piece_out) {
+    (void)active_piece_in;
+    (void)grid_in;
+    (void)game_state_in;
+    *grid_out = grid_in;
+    *game_state_out = game_state_in;
+    *active_piece_out = active_piece_in;
+}
+void Logic_ClearLines(GridTable grid_in, ScoreTable score_in, GridTable* grid_out, ScoreTable* score_out) {
+    (void)grid_in;
+    (void)score_in;
+    *grid_out = grid_in;
+    *score_out = score_in;
+}
+void Logic_SpawnNewPiece(ActivepieceTable active_piece_in, NextpiecesTable next_pieces_in, GamestateTable game_state_in, ActivepieceTable* active_piece_out, NextpiecesTable* next_pieces_out, GamestateTable* game_state_out) {
+    (void)active_piece_in;
+    (void)next_pieces_in;
+    (void)game_state_in;
+    *active_piece_out = active_piece_in;
+    *next_pieces_out = next_pieces_in;
+    *game_state_out = game_state_in;
+}
+void Logic_UpdateScore(ScoreTable score_in, GamestateTable game_state_in, ScoreTable* score_out, GamestateTable* game_state_out) {
+    (void)score_in;
+    (void)game_state_in;
+    *score_out = score_in;
+    *game_state_out = game_state_in;
+}
+GamestateTable Logic_CheckGameOver(GridTable grid_in, ActivepieceTable active_piece_in, GamestateTable game_state_in) {
+    (void)grid_in;
+    (void)active_piece_in;
+    (void)game_state_in;
+    return game_state_in;
+}
+#endif
+
 // --- Generated Wrappers ---
 void Wrapper_InitActivePiece() {
     state.active_piece_next = Logic_InitActivePiece();
@@ -189,10 +390,78 @@ void Loop() {
     Swap_Buffers();
 }
 
+#ifdef PTF_BENCH
+// --- Benchmark Entry Point ---
+// usage: <binary> [ticks] [seed]; prints one JSON line.
+#include <time.h>
+
+static unsigned long long Ptf_NowNs(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (unsigned long long)ts.tv_sec * 1000000000ull + (unsigned long long)ts.tv_nsec;
+}
+
+static int Ptf_CompareNs(const void *a, const void *b) {
+    unsigned long long x = *(const unsigned long long *)a, y = *(const unsigned long long *)b;
+    return (x > y) - (x < y);
+}
+
+// Deterministic input script: xorshift32 over the key bitmask.
+static unsigned int ptf_rng;
+static unsigned int Ptf_NextInput(void) {
+    ptf_rng ^= ptf_rng << 13;
+    ptf_rng ^= ptf_rng >> 17;
+    ptf_rng ^= ptf_rng << 5;
+    return ptf_rng;
+}
+
+static void Ptf_Hash(unsigned long long *h, const void *data, size_t size) {
+    const unsigned char *bytes = data;
+    for (size_t i = 0; i < size; i++) {
+        *h = (*h ^ bytes[i]) * 1099511628211ull;
+    }
+}
+
+static unsigned long long Ptf_Checksum(void) {
+    unsigned long long h = 14695981039346656037ull;
+    Ptf_Hash(&h, &state.active_piece_curr, sizeof state.active_piece_curr);
+    Ptf_Hash(&h, &state.grid_curr, sizeof state.grid_curr);
+    Ptf_Hash(&h, &state.next_pieces_curr, sizeof state.next_pieces_curr);
+    Ptf_Hash(&h, &state.score_curr, sizeof state.score_curr);
+    Ptf_Hash(&h, &state.game_state_curr, sizeof state.game_state_curr);
+    return h;
+}
+
+int main(int argc, char **argv) {
+    long ticks = argc > 1 ? atol(argv[1]) : 100000;
+    unsigned int seed = argc > 2 ? (unsigned int)strtoul(argv[2], NULL, 10) : 1u;
+    if (ticks < 1) ticks = 1;
+    unsigned long long *samples = malloc(sizeof *samples * (size_t)ticks);
+    if (!samples) return 1;
+    ptf_rng = seed ? seed : 1u;
+    srand(seed);
+    Setup();
+    unsigned long long total = 0;
+    for (long t = 0; t < ticks; t++) {
+        ptf_input.keys = Ptf_NextInput();
+        unsigned long long start = Ptf_NowNs();
+        Loop();
+        samples[t] = Ptf_NowNs() - start;
+        total += samples[t];
+    }
+    qsort(samples, (size_t)ticks, sizeof *samples, Ptf_CompareNs);
+    printf("{\"project\": \"Quadtris\", \"ticks\": %ld, \"seed\": %u, "
+           "\"mean_ns\": %.1f, \"p50_ns\": %llu, \"p99_ns\": %llu, \"checksum\": \"%016llx\"}\n",
+           ticks, seed, (double)total / ticks, samples[ticks / 2], samples[(ticks * 99) / 100], Ptf_Checksum());
+    free(samples);
+    return 0;
+}
+#else
 int main() {
     Setup();
     while (true) {
         Loop();
     }
     return 0;
-}
\ No newline at end of file
+}
+#endif
\ No newline at end of file
@@ -1,7 +1,9 @@
 // Generated Code for Project: Snake
+#define _POSIX_C_SOURCE 200809L
 #include <stdbool.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <math.h>
 
 // --- Configuration Constants ---
@@ -12,6 +14,7 @@
 #define SNACK_RADIUS 10.0f
 #define INITIAL_BODY_LENGTH 3
 #define GRID_SIZE 20.0f
+#define BOARD_CELLS 1200
 
 // --- Table Structures ---
 typedef struct {
@@ -23,8 +26,8 @@ typedef struct {
 } SnakeheadTable;
 
 typedef struct {
-    int pos_x[100];
-    int pos_y[100];
+    int pos_x[BOARD_CELLS];
+    int pos_y[BOARD_CELLS];
     int length;
 } SnakebodyTable;
 
@@ -59,6 +62,97 @@ struct GameState {
     TimerTable timer_next;
 } state;
 
+// --- Input ---
+// One bit per key; filled by the platform layer (or the benchmark's input script).
+typedef struct { unsigned int keys; } PtfInput;
+PtfInput ptf_input;
+#define PTF_KEY_DOWN(bit) ((ptf_input.keys >> (bit)) & 1u)
+
+// --- Spatial Indexes ---
+// A uniform grid per indexed table that always describes its _curr rows.
+// Swaps relink only the rows whose cell changed.
+#define SNAKE_BODY_INDEX_CELL_SIZE (GRID_SIZE)
+#define SNAKE_BODY_INDEX_COLS 40
+#define SNAKE_BODY_INDEX_ROWS 30
+#define SNAKE_BODY_INDEX_CELLS (SNAKE_BODY_INDEX_COLS * SNAKE_BODY_INDEX_ROWS)
+#define SNAKE_BODY_INDEX_CAPACITY (BOARD_CELLS)
+static struct {
+    int count[SNAKE_BODY_INDEX_CELLS];      // rows per cell
+    int head[SNAKE_BODY_INDEX_CELLS];       // first row of each cell, -1 when empty
+    int free[SNAKE_BODY_INDEX_CELLS];       // empty cells, unordered
+    int free_slot[SNAKE_BODY_INDEX_CELLS];  // position of each cell in free, -1 when occupied
+    int next[SNAKE_BODY_INDEX_CAPACITY], prev[SNAKE_BODY_INDEX_CAPACITY];
+    int cell[SNAKE_BODY_INDEX_CAPACITY];    // cell of each row, -1 when outside the grid
+    int free_count, indexed;
+    bool ready;
+} snake_body_index;
+
+int Snakebody_CellOf(double x, double y) {
+    if (!(x >= 0 && y >= 0)) return -1;
+    int col = (int)(x / SNAKE_BODY_INDEX_CELL_SIZE), row = (int)(y / SNAKE_BODY_INDEX_CELL_SIZE);
+    return col < SNAKE_BODY_INDEX_COLS && row < SNAKE_BODY_INDEX_ROWS ? row * SNAKE_BODY_INDEX_COLS + col : -1;
+}
+double Snakebody_CellX(int cell) { return (cell % SNAKE_BODY_INDEX_COLS) * (double)SNAKE_BODY_INDEX_CELL_SIZE; }
+double Snakebody_CellY(int cell) { return (cell / SNAKE_BODY_INDEX_COLS) * (double)SNAKE_BODY_INDEX_CELL_SIZE; }
+int Snakebody_CellCount(int cell) { return cell >= 0 ? snake_body_index.count[cell] : 0; }
+bool Snakebody_Occupied(double x, double y) { return Snakebody_CellCount(Snakebody_CellOf(x, y)) > 0; }
+// Rows in a cell: for (int i = Snakebody_FirstInCell(cell); i >= 0; i = Snakebody_NextInCell(i))
+int Snakebody_FirstInCell(int cell) { return cell >= 0 ? snake_body_index.head[cell] : -1; }
+int Snakebody_NextInCell(int row) { return snake_body_index.next[row]; }
+// Rows in the cells at most `radius` cells away from (x, y). Stores up to max
+// of them in rows and returns how many there are.
+int Snakebody_Near(double x, double y, int radius, int *rows, int max) {
+    int col = (int)floor(x / SNAKE_BODY_INDEX_CELL_SIZE), row = (int)floor(y / SNAKE_BODY_INDEX_CELL_SIZE), n = 0;
+    for (int r = row - radius > 0 ? row - radius : 0; r <= row + radius && r < SNAKE_BODY_INDEX_ROWS; r++) {
+        for (int c = col - radius > 0 ? col - radius : 0; c <= col + radius && c < SNAKE_BODY_INDEX_COLS; c++) {
+            for (int i = snake_body_index.head[r * SNAKE_BODY_INDEX_COLS + c]; i >= 0; i = snake_body_index.next[i]) {
+                if (n < max) rows[n] = i;
+                n++;
+            }
+        }
+    }
+    return n;
+}
+// A uniformly chosen empty cell, or -1 when every cell is occupied.
+int Snakebody_RandomFreeCell(void) {
+    return snake_body_index.free_count ? snake_body_index.free[rand() % snake_body_index.free_count] : -1;
+}
+static void Snakebody_IndexMove(int i, int cell) {
+    int old = snake_body_index.cell[i];
+    if (old == cell) return;
+    if (old >= 0) {
+        if (snake_body_index.prev[i] >= 0) snake_body_index.next[snake_body_index.prev[i]] = snake_body_index.next[i]; else snake_body_index.head[old] = snake_body_index.next[i];
+        if (snake_body_index.next[i] >= 0) snake_body_index.prev[snake_body_index.next[i]] = snake_body_index.prev[i];
+        if (--snake_body_index.count[old] == 0) { snake_body_index.free_slot[old] = snake_body_index.free_count; snake_body_index.free[snake_body_index.free_count++] = old; }
+    }
+    if (cell >= 0) {
+        snake_body_index.prev[i] = -1;
+        snake_body_index.next[i] = snake_body_index.head[cell];
+        if (snake_body_index.head[cell] >= 0) snake_body_index.prev[snake_body_index.head[cell]] = i;
+        snake_body_index.head[cell] = i;
+        if (snake_body_index.count[cell]++ == 0) {
+            int slot = snake_body_index.free_slot[cell], last = snake_body_index.free[--snake_body_index.free_count];
+            snake_body_index.free[slot] = last;
+            snake_body_index.free_slot[last] = slot;
+            snake_body_index.free_slot[cell] = -1;
+        }
+    }
+    snake_body_index.cell[i] = cell;
+}
+static void Snakebody_IndexUpdate(const SnakebodyTable *t) {
+    if (!snake_body_index.ready) {
+        for (int c = 0; c < SNAKE_BODY_INDEX_CELLS; c++) { snake_body_index.count[c] = 0; snake_body_index.head[c] = -1; snake_body_index.free[c] = c; snake_body_index.free_slot[c] = c; }
+        for (int i = 0; i < SNAKE_BODY_INDEX_CAPACITY; i++) snake_body_index.cell[i] = -1;
+        snake_body_index.free_count = SNAKE_BODY_INDEX_CELLS;
+        snake_body_index.indexed = 0;
+        snake_body_index.ready = true;
+    }
+    int n = t->length < 0 ? 0 : t->length > SNAKE_BODY_INDEX_CAPACITY ? SNAKE_BODY_INDEX_CAPACITY : t->length;
+    for (int i = 0; i < n; i++) Snakebody_IndexMove(i, Snakebody_CellOf(t->pos_x[i], t->pos_y[i]));
+    for (int i = n; i < snake_body_index.indexed; i++) Snakebody_IndexMove(i, -1);
+    snake_body_index.indexed = n;
+}
+
 // --- Pure Logic Prototypes ---
 SnakeheadTable Logic_InitSnakeHead();
 SnakebodyTable Logic_InitSnakeBody();
@@ -75,6 +169,81 @@ TimerTable Logic_CheckSelfCollision(SnakeheadTable snake_head_in, SnakebodyTable
 ScoreTable Logic_UpdateScore(ScoreTable score_in, SnacksTable snacks_in);
 SnacksTable Logic_SpawnSnack(SnacksTable snacks_in, SnakebodyTable snake_body_in);
 
+#ifdef PTF_STUB_LOGIC
+SnakeheadTable Logic_InitSnakeHead() {
+    SnakeheadTable snake_head_out;
+    memset(&snake_head_out, 0, sizeof snake_head_out);
+    return snake_head_out;
+}
+SnakebodyTable Logic_InitSnakeBody() {
+    SnakebodyTable snake_body_out;
+    memset(&snake_body_out, 0, sizeof snake_body_out);
+    return snake_body_out;
+}
+SnacksTable Logic_InitSnacks() {
+    SnacksTable snacks_out;
+    memset(&snacks_out, 0, sizeof snacks_out);
+    return snacks_out;
+}
+ScoreTable Logic_InitScore() {
+    ScoreTable score_out;
+    memset(&score_out, 0, sizeof score_out);
+    return score_out;
+}
+TimerTable Logic_InitTimer() {
+    TimerTable timer_out;
+    memset(&timer_out, 0, sizeof timer_out);
+    return timer_out;
+}
+TimerTable Logic_UpdateTimer(TimerTable timer_in) {
+    (void)timer_in;
+    return timer_in;
+}
+SnakeheadTable Logic_ProcessInput(SnakeheadTable snake_head_in) {
+    (void)snake_head_in;
+    return snake_head_in;
+}
+SnakeheadTable Logic_MoveSnakeHead(SnakeheadTable snake_head_in, TimerTable timer_in) {
+    (void)snake_head_in;
+    (void)timer_in;
+    return snake_head_in;
+}
+SnakebodyTable Logic_MoveSnakeBody(SnakeheadTable snake_head_in, SnakebodyTable snake_body_in, TimerTable timer_in) {
+    (void)snake_head_in;
+    (void)snake_body_in;
+    (void)timer_in;
+    return snake_body_in;
+}
+void Logic_CheckSnackCollision(SnakeheadTable snake_head_in, SnakebodyTable snake_body_in, SnacksTable snacks_in, SnakebodyTable* snake_body_out, SnacksTable* snacks_out) {
+    (void)snake_head_in;
+    (void)snake_body_in;
+    (void)snacks_in;
+    *snake_body_out = snake_body_in;
+    *snacks_out = snacks_in;
+}
+TimerTable Logic_CheckWallCollision(SnakeheadTable snake_head_in, TimerTable timer_in) {
+    (void)snake_head_in;
+    (void)timer_in;
+    return timer_in;
+}
+TimerTable Logic_CheckSelfCollision(SnakeheadTable snake_head_in, SnakebodyTable snake_body_in, TimerTable timer_in) {
+    (void)snake_head_in;
+    (void)snake_body_in;
+    (void)timer_in;
+    return timer_in;
+}
+ScoreTable Logic_UpdateScore(ScoreTable score_in, SnacksTable snacks_in) {
+    (void)score_in;
+    (void)snacks_in;
+    return score_in;
+}
+SnacksTable Logic_SpawnSnack(SnacksTable snacks_in, SnakebodyTable snake_body_in) {
+    (void)snacks_in;
+    (void)snake_body_in;
+    return snacks_in;
+}
+#endif
+
 // --- Generated Wrappers ---
 void Wrapper_InitSnakeHead() {
     state.snake_head_next = Logic_InitSnakeHead();
@@ -141,6 +310,7 @@ void Wrapper_SpawnSnack() {
 void Swap_Buffers() {
     state.snake_head_curr = state.snake_head_next;
     state.snake_body_curr = state.snake_body_next;
+    Snakebody_IndexUpdate(&state.snake_body_curr);
     state.snacks_curr = state.snacks_next;
     state.score_curr = state.score_next;
     state.timer_curr = state.timer_next;
@@ -153,6 +323,7 @@ void Setup() {
     Wrapper_InitSnacks();
     Wrapper_InitScore();
     Wrapper_InitTimer();
+    Snakebody_IndexUpdate(&state.snake_body_curr);
 }
 
 void Loop() {
@@ -168,10 +339,78 @@ void Loop() {
     Swap_Buffers();
 }
 
+#ifdef PTF_BENCH
+// --- Benchmark Entry Point ---
+// usage: <binary> [ticks] [seed]; prints one JSON line.
+#include <time.h>
+
+static unsigned long long Ptf_NowNs(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (unsigned long long)ts.tv_sec * 1000000000ull + (unsigned long long)ts.tv_nsec;
+}
+
+static int Ptf_CompareNs(const void *a, const void *b) {
+    unsigned long long x = *(const unsigned long long *)a, y = *(const unsigned long long *)b;
+    return (x > y) - (x < y);
+}
+
+// Deterministic input script: xorshift32 over the key bitmask.
+static unsigned int ptf_rng;
+static unsigned int Ptf_NextInput(void) {
+    ptf_rng ^= ptf_rng << 13;
+    ptf_rng ^= ptf_rng >> 17;
+    ptf_rng ^= ptf_rng << 5;
+    return ptf_rng;
+}
+
+static void Ptf_Hash(unsigned long long *h, const void *data, size_t size) {
+    const unsigned char *bytes = data;
+    for (size_t i = 0; i < size; i++) {
+        *h = (*h ^ bytes[i]) * 1099511628211ull;
+    }
+}
+
+static unsigned long long Ptf_Checksum(void) {
+    unsigned long long h = 14695981039346656037ull;
+    Ptf_Hash(&h, &state.snake_head_curr, sizeof state.snake_head_curr);
+    Ptf_Hash(&h, &state.snake_body_curr, sizeof state.snake_body_curr);
+    Ptf_Hash(&h, &state.snacks_curr, sizeof state.snacks_curr);
+    Ptf_Hash(&h, &state.score_curr, sizeof state.score_curr);
+    Ptf_Hash(&h, &state.timer_curr, sizeof state.timer_curr);
+    return h;
+}
+
+int main(int argc, char **argv) {
+    long ticks = argc > 1 ? atol(argv[1]) : 100000;
+    unsigned int seed = argc > 2 ? (unsigned int)strtoul(argv[2], NULL, 10) : 1u;
+    if (ticks < 1) ticks = 1;
+    unsigned long long *samples = malloc(sizeof *samples * (size_t)ticks);
+    if (!samples) return 1;
+    ptf_rng = seed ? seed : 1u;
+    srand(seed);
+    Setup();
+    unsigned long long total = 0;
+    for (long t = 0; t < ticks; t++) {
+        ptf_input.keys = Ptf_NextInput();
+        unsigned long long start = Ptf_NowNs();
+        Loop();
+        samples[t] = Ptf_NowNs() - start;
+        total += samples[t];
+    }
+    qsort(samples, (size_t)ticks, sizeof *samples, Ptf_CompareNs);
+    printf("{\"project\": \"Snake\", \"ticks\": %ld, \"seed\": %u, "
+           "\"mean_ns\": %.1f, \"p50_ns\": %llu, \"p99_ns\": %llu, \"checksum\": \"%016llx\"}\n",
+           ticks, seed, (double)total / ticks, samples[ticks / 2], samples[(ticks * 99) / 100], Ptf_Checksum());
+    free(samples);
+    return 0;
+}
+#else
 int main() {
     Setup();
     while (true) {
         Loop();
     }
     return 0;
-}
\ No newline at end of file
+}
+#endif
\ No newline at end of file
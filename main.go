@@ -4,7 +4,9 @@ import (
 	"embed"
 	"fmt"
 	"os"
+	"path/filepath"
 	"strings"
+	"time"
 
 	webview "github.com/webview/webview_go"
 )
@@ -16,6 +18,9 @@ type ProjectData struct {
 	Name string `json:"name"`
 	MD   string `json:"md"`
 	YAML string `json:"yaml"`
+	// Version changes whenever the sources do, so the UI can tell a loaded
+	// game is out of date.
+	Version int `json:"version"`
 }
 
 func main() {
@@ -29,8 +34,39 @@ func main() {
 
 	// Initialize services
 	buildService := NewBuildService()
+	defer buildService.Close()
 	projectService := NewProjectService()
 
+	// Load every project and build it in the background, then keep both
+	// caches current as files change, so switching projects or pressing
+	// "Run Project" never waits on disk or on the generator.
+	go func() {
+		for _, name := range listProjects(".") {
+			projectService.Reload(name)
+			buildService.Rebuild(name)
+		}
+	}()
+	watcher := NewWatcher(".", []string{".md", ".yaml"}, 250*time.Millisecond, 300*time.Millisecond, func(paths []string) {
+		specChanged := make(map[string]bool)
+		for _, path := range paths {
+			ext := filepath.Ext(path)
+			name := strings.TrimSuffix(filepath.Base(path), ext)
+			specChanged[name] = specChanged[name] || ext == ".yaml"
+		}
+		for name, rebuild := range specChanged {
+			// Markdown without a spec (README.md, USAGE.md) is not a project.
+			if !rebuild && statFile(name+".yaml") == (fileStamp{}) {
+				continue
+			}
+			projectService.Reload(name)
+			if rebuild {
+				buildService.Rebuild(name)
+			}
+		}
+	})
+	watcher.Start()
+	defer watcher.Stop()
+
 	// Bind Project Data Fetcher
 	w.Bind("getProjectData", func(name string) ProjectData {
 		data, _ := projectService.GetData(name)
@@ -46,6 +82,15 @@ func main() {
 		return html
 	})
 
+	// Bind Canvas Graph Loader
+	w.Bind("getProjectGraph", func(name string) string {
+		graph, err := buildService.GenerateGraph(name)
+		if err != nil {
+			return fmt.Sprintf("Error: %v", err)
+		}
+		return graph
+	})
+
 	// Load and prepare HTML from embedded files
 	htmlBytes, err := uiFS.ReadFile("ui/index.html")
 	if err != nil {
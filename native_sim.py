@@ -0,0 +1,171 @@
+"""ctypes binding for specs built with the C library target (code_gen.py --c-library).
+
+Runs a batch of native game instances from Python without a process or any
+serialization per step. The GameStates live in one contiguous NumPy buffer
+owned by Python, the library steps them in place, and every _curr column is a
+zero-copy NumPy view into that buffer with the batch as its first dimension:
+
+    sim = NativeSim(build_library("pong.yaml"), batch=100000)
+    sim.setup()
+    sim.step(600, keys=keys)             # keys: (ticks, batch) input bitmasks
+    sim.curr("ball").x[:10]              # a view, not a copy
+    sim.reset(sim.curr("score").p1 >= 5) # re-run Setup for finished games only
+
+The layout is read from the library's own ptf_fields table, so the binding
+follows the spec and the compiler's struct padding without being regenerated.
+A row of `sim.states` is a whole instance (tables, input and spatial indexes),
+so copying rows branches or restores games, e.g. in a tree search.
+"""
+import argparse
+import concurrent.futures
+import ctypes
+import os
+import subprocess
+import time
+
+import numpy as np
+
+from batch_sim import TableView
+from code_gen import iter_c_code, write_atomic
+from spec_ir import load_spec_file
+
+FIELD_DTYPES = {"int32": np.int32, "float32": np.float32, "float64": np.float64, "bool": np.bool_,
+                "uint64": np.uint64}
+
+class PtfField(ctypes.Structure):
+    _fields_ = [("table", ctypes.c_char_p), ("column", ctypes.c_char_p), ("type", ctypes.c_char_p),
+                ("offset", ctypes.c_size_t), ("ndim", ctypes.c_int), ("shape", ctypes.c_size_t * 2)]
+
+def build_library(spec_path, out_dir="generated", cc=None, cflags=("-O2",)):
+    """Generate the library target for a spec and compile it; returns the library path.
+
+    Like bench.py, logic is linked from <project>_logic.c next to the spec when
+    it exists; otherwise the generated placeholder logic is used.
+    """
+    project = os.path.splitext(os.path.basename(spec_path))[0]
+    source = os.path.join(out_dir, f"{project}_lib.c")
+    library = os.path.join(out_dir, f"lib{project}{'.dll' if os.name == 'nt' else '.so'}")
+    os.makedirs(out_dir, exist_ok=True)
+    write_atomic(source, iter_c_code(load_spec_file(spec_path), library=True))
+    sources, defines = [source], []
+    logic_path = os.path.join(os.path.dirname(spec_path), f"{project}_logic.c")
+    if os.path.exists(logic_path):
+        sources.append(logic_path)
+    else:
+        defines.append("-DPTF_STUB_LOGIC")
+    cmd = [cc or os.environ.get("CC", "cc"), *cflags, "-shared", "-fPIC", "-fvisibility=hidden",
+           *defines, *sources, "-o", library, "-lm"]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"compile failed: {' '.join(cmd)}\n{proc.stderr}")
+    return library
+
+class NativeSim:
+    """`batch` instances of a compiled spec, stepped by the shared library."""
+
+    def __init__(self, library_path, batch, seed=0):
+        lib = ctypes.CDLL(os.path.abspath(library_path))
+        lib.ptf_state_size.restype = ctypes.c_size_t
+        lib.ptf_setup.argtypes = [ctypes.c_void_p]
+        lib.ptf_setup_n.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.ptf_step_n.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+        lib.ptf_seed.argtypes = [ctypes.c_uint]
+        self.lib = lib
+        self.batch = batch
+        self.state_size = lib.ptf_state_size()
+        # One row per instance. NumPy aligns the buffer to at least 16 bytes and
+        # sizeof(GameState) is a multiple of its alignment, so every row is aligned.
+        self.states = np.zeros((batch, self.state_size), dtype=np.uint8)
+        self.tick = 0
+        self._views = self._map_fields()
+        lib.ptf_seed(seed)
+
+    def _map_fields(self):
+        count = ctypes.c_int.in_dll(self.lib, "ptf_field_count").value
+        fields = (PtfField * count).in_dll(self.lib, "ptf_fields")
+        columns = {}
+        for field in fields:
+            dtype = np.dtype(FIELD_DTYPES[field.type.decode()])
+            shape = tuple(field.shape[:field.ndim])
+            # Instances are state_size bytes apart; inside one, the column is C-contiguous
+            inner = [dtype.itemsize * int(np.prod(shape[i + 1:], dtype=int)) for i in range(len(shape))]
+            view = np.ndarray((self.batch, *shape), dtype=dtype, buffer=self.states, offset=field.offset,
+                              strides=(self.state_size, *inner))
+            columns.setdefault(field.table.decode(), {})[field.column.decode()] = view
+        return {name: TableView(name, cols) for name, cols in columns.items()}
+
+    def _address(self, start=0):
+        return self.states.ctypes.data + int(start) * self.state_size
+
+    # --- State access ---
+
+    def curr(self, table_name):
+        return self._views[table_name]
+
+    # --- Execution ---
+
+    def setup(self):
+        self.states.fill(0)
+        self.lib.ptf_setup_n(self._address(), self.batch)
+        self.tick = 0
+
+    def step(self, ticks=1, keys=None, threads=1):
+        """Run Loop `ticks` times on every instance. `keys` may be an array of shape (ticks, batch).
+
+        threads > 1 splits the batch into that many slices stepped at the same
+        time; ctypes releases the GIL during each call. Logic that calls rand()
+        then draws from a shared generator in no fixed order.
+        """
+        if keys is not None:
+            keys = np.ascontiguousarray(keys, dtype=np.uint32)
+            if keys.shape != (ticks, self.batch):
+                raise ValueError(f"keys must have shape {(ticks, self.batch)}, got {keys.shape}")
+        bounds = np.linspace(0, self.batch, max(1, min(threads, self.batch)) + 1, dtype=int)
+        slices = list(zip(bounds[:-1], bounds[1:]))
+
+        def run(lo, hi):
+            inputs = None
+            if keys is not None:
+                inputs = keys if len(slices) == 1 else np.ascontiguousarray(keys[:, lo:hi])
+            self.lib.ptf_step_n(self._address(lo), int(hi - lo), ticks,
+                                None if inputs is None else inputs.ctypes.data)
+
+        if len(slices) == 1:
+            run(*slices[0])
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(slices)) as pool:
+                list(pool.map(lambda bounds: run(*bounds), slices))
+        self.tick += ticks
+
+    def reset(self, mask):
+        """Re-run Setup from a zeroed state for the instances where mask is True."""
+        for i in np.flatnonzero(np.asarray(mask, dtype=bool)):
+            self.states[i] = 0
+            self.lib.ptf_setup(self._address(i))
+
+    def snapshot(self, index):
+        """Plain-Python copy of one instance's _curr tables, handy for debugging."""
+        return {name: {col: array[index].tolist() for col, array in view.columns().items()}
+                for name, view in self._views.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a spec as a shared library and measure native batch stepping.")
+    parser.add_argument("project", help="project name (reads <project>.yaml)")
+    parser.add_argument("--batch", type=int, default=10000, help="instances (default: 10000)")
+    parser.add_argument("--ticks", type=int, default=1000, help="Loop ticks per instance (default: 1000)")
+    parser.add_argument("--threads", type=int, default=1, help="threads stepping slices of the batch (default: 1)")
+    parser.add_argument("--cc", default=None, help="C compiler (default: $CC or cc)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sim = NativeSim(build_library(f"{args.project}.yaml", cc=args.cc), batch=args.batch, seed=args.seed)
+    keys = np.random.default_rng(args.seed).integers(0, 1 << 8, size=(args.ticks, args.batch), dtype=np.uint32)
+    sim.setup()
+    start = time.perf_counter()
+    sim.step(args.ticks, keys=keys, threads=args.threads)
+    elapsed = time.perf_counter() - start
+    print(f"{args.project}: {args.batch * args.ticks / elapsed:,.0f} instance-ticks/s "
+          f"({args.batch} x {args.ticks} ticks, {sim.state_size} bytes per state)")
+
+if __name__ == "__main__":
+    main()
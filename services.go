@@ -1,42 +1,137 @@
 package main
 
 import (
+	"bufio"
+	"encoding/json"
 	"fmt"
+	"io"
 	"os"
 	"os/exec"
+	"sync"
 )
 
+const genScript = "code_gen.py"
+
 // BuildService handles the generation of project code using external scripts.
-type BuildService struct{}
+// Generated outputs are kept in memory together with the stamp of the YAML
+// they were built from, and concurrent builds of one project version share a
+// single run.
+type BuildService struct {
+	gen    *GeneratorServer
+	builds flightGroup
+
+	mu      sync.RWMutex
+	outputs map[string]builtOutput // keyed by target + ":" + project
+}
+
+type builtOutput struct {
+	code string
+	yaml fileStamp
+}
+
+// outputFiles maps each generator target the app uses to the file code_gen.py
+// writes for it.
+var outputFiles = map[string]string{
+	"html":  "generated/%s_code.html",
+	"graph": "generated/%s_graph.json",
+}
 
 // NewBuildService creates a new BuildService.
 func NewBuildService() *BuildService {
-	return &BuildService{}
+	return &BuildService{gen: NewGeneratorServer(genScript), outputs: make(map[string]builtOutput)}
 }
 
-// GenerateProject runs the appropriate python generator for a project.
+// Close stops the resident generator process, if one is running.
+func (s *BuildService) Close() {
+	s.gen.Stop()
+}
+
+// GenerateProject returns the generated HTML for a project.
 func (s *BuildService) GenerateProject(name string) (string, error) {
-	htmlFile := fmt.Sprintf("generated/%s_code.html", name)
+	return s.Generate(name, "html")
+}
 
-	// We want to generate if the file doesn't exist OR if we want to force a rebuild
-	if _, err := os.Stat(htmlFile); os.IsNotExist(err) {
-		fmt.Printf("[BuildService] %s not found, running code_gen.py...\n", htmlFile)
+// GenerateGraph returns the canvas graph (nodes, edges and layout) for a
+// project as JSON.
+func (s *BuildService) GenerateGraph(name string) (string, error) {
+	return s.Generate(name, "graph")
+}
 
-		genScript := "code_gen.py"
-		if _, err := os.Stat(genScript); err != nil {
-			return "", fmt.Errorf("generation script %s not found", genScript)
-		}
+// Generate returns one target for a project. Output built from the YAML
+// currently on disk is served from memory; otherwise it is built now, joining
+// a build of the same version that is already running.
+func (s *BuildService) Generate(name, target string) (string, error) {
+	stamp := statFile(name + ".yaml")
+	s.mu.RLock()
+	out, ok := s.outputs[target+":"+name]
+	s.mu.RUnlock()
+	if ok && out.yaml == stamp {
+		return out.code, nil
+	}
+	return s.build(name, target, stamp)
+}
 
-		// code_gen.py processes all yamls, we can just run it
-		cmd := exec.Command("python", genScript)
-		output, err := cmd.CombinedOutput()
+// Rebuild builds every target of a project in the background so the next
+// Generate call finds its output ready.
+func (s *BuildService) Rebuild(name string) {
+	stamp := statFile(name + ".yaml")
+	for target := range outputFiles {
+		go func(target string) {
+			if _, err := s.build(name, target, stamp); err != nil {
+				fmt.Printf("[BuildService] background %s build of %s failed: %v\n", target, name, err)
+			}
+		}(target)
+	}
+}
+
+// build generates a target and caches the result under stamp. The stamp is
+// taken before the generator reads the YAML, so an edit made during the build
+// leaves the cached output marked stale rather than serving it as current.
+func (s *BuildService) build(name, target string, stamp fileStamp) (string, error) {
+	key := fmt.Sprintf("%s:%s@%d:%d", target, name, stamp.modTime, stamp.size)
+	return s.builds.Do(key, func() (string, error) {
+		code, err := s.generate(name, target)
 		if err != nil {
-			return "", fmt.Errorf("generation failed: %v\nOutput: %s", err, string(output))
+			return "", err
 		}
-		fmt.Printf("[BuildService] Projects generated successfully.\n")
+		s.mu.Lock()
+		s.outputs[target+":"+name] = builtOutput{code: code, yaml: stamp}
+		s.mu.Unlock()
+		return code, nil
+	})
+}
+
+// generate asks the resident generator first and falls back to a one-shot
+// code_gen.py run (which writes generated/) if the server cannot be started.
+func (s *BuildService) generate(name, target string) (string, error) {
+	code, err := s.gen.Generate(generatorRequest{Project: name, Target: target})
+	if err == nil {
+		return code, nil
+	}
+	if _, ok := err.(*generatorError); ok {
+		return "", fmt.Errorf("generation failed: %v", err)
+	}
+	fmt.Printf("[BuildService] generator server unavailable (%v), running %s directly...\n", err, genScript)
+	return s.generateOnce(name, target)
+}
+
+func (s *BuildService) generateOnce(name, target string) (string, error) {
+	outFile := fmt.Sprintf(outputFiles[target], name)
+
+	if _, err := os.Stat(genScript); err != nil {
+		return "", fmt.Errorf("generation script %s not found", genScript)
 	}
 
-	content, err := os.ReadFile(htmlFile)
+	// code_gen.py keeps a content-hashed manifest in generated/, so this is a
+	// cheap no-op when the project's YAML has not changed since the last build.
+	cmd := exec.Command("python", genScript, name)
+	output, err := cmd.CombinedOutput()
+	if err != nil {
+		return "", fmt.Errorf("generation failed: %v\nOutput: %s", err, string(output))
+	}
+	fmt.Printf("[BuildService] %s is up to date.\n", outFile)
+
+	content, err := os.ReadFile(outFile)
 	if err != nil {
 		return "", fmt.Errorf("failed to read generated file: %v", err)
 	}
@@ -44,14 +139,163 @@ func (s *BuildService) GenerateProject(name string) (string, error) {
 	return string(content), nil
 }
 
-// ProjectService handles fetching project metadata.
-type ProjectService struct{}
+type generatorRequest struct {
+	ID      int    `json:"id"`
+	Project string `json:"project,omitempty"`
+	YAML    string `json:"yaml,omitempty"`
+	Target  string `json:"target"`
+}
+
+type generatorResponse struct {
+	ID    int    `json:"id"`
+	OK    bool   `json:"ok"`
+	Code  string `json:"code"`
+	Error string `json:"error"`
+}
+
+// generatorError is a build error reported by code_gen.py itself, as opposed
+// to a failure to talk to the process.
+type generatorError struct{ msg string }
+
+func (e *generatorError) Error() string { return e.msg }
+
+// GeneratorServer keeps one `code_gen.py --serve` process alive and talks to
+// it over JSON lines on stdin/stdout, so builds skip interpreter startup and
+// YAML parsing of unchanged specs.
+type GeneratorServer struct {
+	mu     sync.Mutex
+	script string
+	cmd    *exec.Cmd
+	stdin  io.WriteCloser
+	stdout *bufio.Reader
+	nextID int
+}
+
+// NewGeneratorServer creates a server handle; the process starts lazily.
+func NewGeneratorServer(script string) *GeneratorServer {
+	return &GeneratorServer{script: script}
+}
+
+// Generate sends one request and returns the generated source. A dead
+// process is restarted once before giving up.
+func (g *GeneratorServer) Generate(req generatorRequest) (string, error) {
+	g.mu.Lock()
+	defer g.mu.Unlock()
+
+	var err error
+	for attempt := 0; attempt < 2; attempt++ {
+		if g.cmd == nil {
+			if err = g.start(); err != nil {
+				return "", err
+			}
+		}
+		var resp generatorResponse
+		resp, err = g.roundTrip(req)
+		if err != nil {
+			// The stream may be out of sync, so don't wait for a clean exit.
+			g.cmd.Process.Kill()
+			g.stop()
+			continue
+		}
+		if !resp.OK {
+			return "", &generatorError{resp.Error}
+		}
+		return resp.Code, nil
+	}
+	return "", err
+}
+
+func (g *GeneratorServer) start() error {
+	if _, err := os.Stat(g.script); err != nil {
+		return fmt.Errorf("generation script %s not found", g.script)
+	}
+	cmd := exec.Command("python", g.script, "--serve")
+	cmd.Stderr = os.Stderr
+	stdin, err := cmd.StdinPipe()
+	if err != nil {
+		return err
+	}
+	stdout, err := cmd.StdoutPipe()
+	if err != nil {
+		return err
+	}
+	if err := cmd.Start(); err != nil {
+		return err
+	}
+	g.cmd, g.stdin, g.stdout = cmd, stdin, bufio.NewReader(stdout)
+	fmt.Printf("[BuildService] started generator server (pid %d)\n", cmd.Process.Pid)
+	return nil
+}
+
+func (g *GeneratorServer) roundTrip(req generatorRequest) (generatorResponse, error) {
+	var resp generatorResponse
+	g.nextID++
+	req.ID = g.nextID
+	line, err := json.Marshal(req)
+	if err != nil {
+		return resp, err
+	}
+	if _, err := g.stdin.Write(append(line, '\n')); err != nil {
+		return resp, err
+	}
+	reply, err := g.stdout.ReadBytes('\n')
+	if err != nil {
+		return resp, err
+	}
+	if err := json.Unmarshal(reply, &resp); err != nil {
+		return resp, err
+	}
+	if resp.ID != req.ID {
+		return resp, fmt.Errorf("generator replied to request %d, expected %d", resp.ID, req.ID)
+	}
+	return resp, nil
+}
+
+// Stop shuts the generator process down.
+func (g *GeneratorServer) Stop() {
+	g.mu.Lock()
+	defer g.mu.Unlock()
+	g.stop()
+}
+
+func (g *GeneratorServer) stop() {
+	if g.cmd == nil {
+		return
+	}
+	// Closing stdin ends the server's read loop.
+	g.stdin.Close()
+	g.cmd.Wait()
+	g.cmd, g.stdin, g.stdout = nil, nil, nil
+}
+
+// ProjectService handles fetching project metadata. Sources are read from
+// disk once and then served from memory until Reload replaces them.
+type ProjectService struct {
+	loadMu      sync.Mutex // serializes Reload, so an older read never replaces a newer one
+	mu          sync.RWMutex
+	projects    map[string]ProjectData
+	nextVersion int
+}
 
 func NewProjectService() *ProjectService {
-	return &ProjectService{}
+	return &ProjectService{projects: make(map[string]ProjectData)}
 }
 
 func (s *ProjectService) GetData(name string) (ProjectData, error) {
+	s.mu.RLock()
+	data, ok := s.projects[name]
+	s.mu.RUnlock()
+	if ok {
+		return data, nil
+	}
+	return s.Reload(name), nil
+}
+
+// Reload reads a project's sources from disk into the cache. The version
+// changes only when the .md or .yaml content did.
+func (s *ProjectService) Reload(name string) ProjectData {
+	s.loadMu.Lock()
+	defer s.loadMu.Unlock()
 	fmt.Printf("[ProjectService] Loading data for: %s\n", name)
 
 	md, err := os.ReadFile(name + ".md")
@@ -64,9 +308,19 @@ func (s *ProjectService) GetData(name string) (ProjectData, error) {
 		fmt.Printf("  Warning: %s.yaml not found\n", name)
 	}
 
-	return ProjectData{
+	data := ProjectData{
 		Name: name,
 		MD:   string(md),
 		YAML: string(yaml),
-	}, nil
+	}
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	if old, ok := s.projects[name]; ok && old.MD == data.MD && old.YAML == data.YAML {
+		return old
+	}
+	s.nextVersion++
+	data.Version = s.nextVersion
+	s.projects[name] = data
+	return data
 }
@@ -0,0 +1,437 @@
+"""Compiled form of a project spec.
+
+compile_spec() checks a parsed YAML spec once and turns it into small
+__slots__ objects with every name, size and cross-reference resolved:
+
+    spec.tables["snake_body"].columns["pos_x"].size   -> "BOARD_CELLS"
+    spec.functions["MoveBall"].inputs[0].struct_name  -> "BallTable"
+    spec.procedures["Loop"].functions                 -> (Function, ...)
+
+The generators walk these objects instead of the raw dict, so a bad spec
+(an unknown table, an array without a size, ...) fails here with a SpecError
+naming the offending entry. load_spec_bytes() and load_spec_file() parse with
+libyaml when PyYAML was built with it, and keep compiled specs in an on-disk
+pickle cache keyed by the spec's content hash.
+"""
+import ast
+import hashlib
+import math
+import operator
+import os
+import pickle
+import re
+import tempfile
+
+# Bump when the IR classes change shape; cached pickles from another version
+# are ignored. The cache key also includes a hash of this file.
+IR_VERSION = "3"
+SPEC_CACHE_DIR = ".spec_cache"
+
+ENTITY_KIND = "entities"
+SCALAR_TYPES = ("int", "float", "double", "bool")
+ARRAY_ELEMENT_TYPE = "int"
+BITGRID_TYPE = "bitgrid"
+INIT_MARKER = "Init"
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# The only operators size expressions may use. They are evaluated by walking
+# the AST, never with eval().
+_SIZE_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+                   ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod}
+_SIZE_NODES = (ast.Expression, ast.BinOp, ast.Name, ast.Load, ast.Constant, *_SIZE_OPERATORS)
+
+class SpecError(ValueError):
+    """A spec that cannot be compiled; the message names the offending entry."""
+
+class Column:
+    """One column. `size` is the C/JS element-count expression for arrays (None for scalars).
+
+    A bitgrid column has type BITGRID_TYPE, no size, and its width and height
+    in `dims` (C/JS expressions) and `shape` (evaluated).
+    """
+
+    __slots__ = ("name", "type", "size", "length", "dims", "shape")
+
+    def __init__(self, name, type, size=None, length=None, dims=None, shape=None):
+        self.name = name
+        self.type = type        # C element type
+        self.size = size
+        self.length = length    # size evaluated against the config
+        self.dims = dims
+        self.shape = shape
+
+    @property
+    def is_array(self):
+        return self.size is not None
+
+    @property
+    def is_bitgrid(self):
+        return self.type == BITGRID_TYPE
+
+class Index:
+    """Uniform grid over a table's position columns, `cols` x `rows` cells of `cell_size`."""
+
+    __slots__ = ("x", "y", "count", "cell_size", "cols", "rows", "capacity", "macro")
+
+    def __init__(self, x, y, count, cell_size, cols, rows, capacity, macro):
+        self.x = x                  # Column
+        self.y = y                  # Column
+        self.count = count          # name of the column holding the number of rows
+        self.cell_size = cell_size  # C/JS expression
+        self.cols = cols
+        self.rows = rows
+        self.capacity = capacity    # C/JS expression for the maximum number of rows
+        self.macro = macro          # prefix of the generated C macros
+
+    @property
+    def cells(self):
+        return self.cols * self.rows
+
+class Table:
+    __slots__ = ("name", "kind", "columns", "capacity", "capacity_value", "struct_name", "prefix", "index")
+
+    def __init__(self, name, kind, columns, capacity=None, capacity_value=None):
+        self.name = name
+        self.kind = kind
+        self.columns = columns  # column name -> Column, in spec order
+        self.capacity = capacity
+        self.capacity_value = capacity_value
+        self.prefix = name.replace('_', '').capitalize()
+        self.struct_name = f"{self.prefix}Table"
+        self.index = None       # Index, when the spec declares one
+
+    @property
+    def is_entity(self):
+        return self.kind == ENTITY_KIND
+
+    @property
+    def capacity_macro(self):
+        return f"{self.name.upper()}_CAPACITY"
+
+class Function:
+    __slots__ = ("name", "inputs", "outputs", "pure", "body")
+
+    def __init__(self, name, inputs, outputs, pure=True, body=None):
+        self.name = name
+        self.inputs = inputs    # tuple of Table
+        self.outputs = outputs  # tuple of Table
+        self.pure = pure
+        self.body = body
+
+    @property
+    def is_init(self):
+        # Init functions fill _curr directly; everything else writes _next.
+        return INIT_MARKER in self.name
+
+class Procedure:
+    __slots__ = ("name", "functions")
+
+    def __init__(self, name, functions):
+        self.name = name
+        self.functions = functions  # tuple of Function, in call order
+
+class Spec:
+    __slots__ = ("project_name", "config", "tables", "functions", "procedures")
+
+    def __init__(self, project_name, config, tables, functions, procedures):
+        self.project_name = project_name
+        self.config = config
+        self.tables = tables
+        self.functions = functions
+        self.procedures = procedures
+
+def _parse_expr(expr, context):
+    """Syntax tree of a size expression: numbers, names, + - * // % and parentheses."""
+    text = str(expr).strip()
+    if not text:
+        raise SpecError(f"{context}: empty size")
+    try:
+        tree = ast.parse(text, mode="eval")
+    except (SyntaxError, ValueError):
+        tree = None
+    if tree is None or not all(isinstance(node, _SIZE_NODES) for node in ast.walk(tree)):
+        raise SpecError(f"{context}: {text!r} is not an integer expression over config keys "
+                        f"(numbers, config keys, + - * // % and parentheses)")
+    return text, tree.body
+
+def _evaluate(expr, config, context, integer=True):
+    """Value of a size expression. With integer=True every number and config value must be an int."""
+    text, tree = _parse_expr(expr, context)
+    kind = "an integer" if integer else "a number"
+
+    def value(node):
+        if isinstance(node, ast.Constant):
+            number = node.value
+            if isinstance(number, bool) or not isinstance(number, int if integer else (int, float)):
+                raise SpecError(f"{context}: {number!r} in {text!r} is not {kind}")
+            return number
+        if isinstance(node, ast.Name):
+            if node.id not in config:
+                raise SpecError(f"{context}: {node.id!r} is not a config key")
+            number = config[node.id]
+            if integer and not isinstance(number, int):
+                raise SpecError(f"{context}: config {node.id!r} is {number!r}, but sizes need integer config values")
+            return number
+        left, right = value(node.left), value(node.right)
+        if isinstance(node.op, (ast.FloorDiv, ast.Mod)):
+            # Python rounds these toward -inf and C toward zero; they agree on
+            # non-negative integers only.
+            if not (isinstance(left, int) and isinstance(right, int) and left >= 0 and right > 0):
+                raise SpecError(f"{context}: // and % in {text!r} need a non-negative integer "
+                                f"and a positive integer, got {left!r} and {right!r}")
+        return _SIZE_OPERATORS[type(node.op)](left, right)
+
+    return value(tree)
+
+def config_expr(expr, config, context, integer=True):
+    """Turn an int or an expression over config keys into a C/JS constant expression.
+
+    The expression is checked with _evaluate() first. Config keys become their
+    upper-case macros, and `a // b` becomes `(A - A % B) / B`, which is exact
+    in both C and JS because C and JS have no shared integer-division operator.
+    """
+    if isinstance(expr, int) and not isinstance(expr, bool):
+        return str(expr)
+    _evaluate(expr, config, context, integer)
+    _, tree = _parse_expr(expr, context)
+
+    def render(node):
+        if isinstance(node, ast.Name):
+            return ast.Name(node.id.upper(), ast.Load())
+        if isinstance(node, ast.Constant):
+            return node
+        left, right = render(node.left), render(node.right)
+        if isinstance(node.op, ast.FloorDiv):
+            return ast.BinOp(ast.BinOp(left, ast.Sub(), ast.BinOp(left, ast.Mod(), right)), ast.Div(), right)
+        return ast.BinOp(left, node.op, right)
+
+    return ast.unparse(render(tree))
+
+def eval_size(expr, config, context):
+    """Positive integer value of a size; every operand must be an integer."""
+    value = _evaluate(expr, config, context)
+    if value < 1:
+        raise SpecError(f"{context}: {str(expr)!r} must evaluate to a positive integer, got {value!r}")
+    return value
+
+def eval_number(expr, config, context):
+    """Positive value of a length; floats are allowed."""
+    value = _evaluate(expr, config, context, integer=False)
+    if value <= 0:
+        raise SpecError(f"{context}: {str(expr)!r} must evaluate to a positive number, got {value!r}")
+    return value
+
+def _mapping(value, context):
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise SpecError(f"{context} must be a mapping, got {type(value).__name__}")
+    return value
+
+def _identifier(name, context):
+    if not isinstance(name, str) or not _IDENTIFIER.fullmatch(name):
+        raise SpecError(f"{context}: {name!r} is not a valid identifier")
+    return name
+
+def _compile_column(table_name, col_name, col_type, config, entity):
+    context = f"table {table_name!r} column {col_name!r}"
+    _identifier(col_name, context)
+    if col_type in SCALAR_TYPES:
+        return Column(col_name, col_type)
+    text = str(col_type)
+    if text == "array":
+        raise SpecError(f"{context}: array needs a size, e.g. array[10] or array[grid_width * grid_height]")
+    match = re.fullmatch(r"(array|bitgrid)\[(.*)\]", text)
+    if not match:
+        raise SpecError(f"{context}: unknown type {col_type!r} "
+                        f"(expected one of {', '.join(SCALAR_TYPES)}, array[size] or bitgrid[width, height])")
+    if entity:
+        raise SpecError(f"entity table {table_name!r}: column {col_name!r} must be a scalar type")
+    if match.group(1) == BITGRID_TYPE:
+        dims = [dim.strip() for dim in match.group(2).split(",")]
+        if len(dims) != 2:
+            raise SpecError(f"{context}: bitgrid needs a width and a height, e.g. bitgrid[grid_width, grid_height]")
+        names = (f"{table_name}.{col_name}.width", f"{table_name}.{col_name}.height")
+        return Column(col_name, BITGRID_TYPE,
+                      dims=tuple(config_expr(dim, config, name) for dim, name in zip(dims, names)),
+                      shape=tuple(eval_size(dim, config, name) for dim, name in zip(dims, names)))
+    size = config_expr(match.group(2), config, f"{table_name}.{col_name}")
+    return Column(col_name, ARRAY_ELEMENT_TYPE, size, eval_size(match.group(2), config, f"{table_name}.{col_name}"))
+
+INDEX_KEYS = ("x", "y", "count", "cell_size", "width", "height")
+
+def _compile_index(table, index_data, config):
+    context = f"table {table.name!r} index"
+    index_data = _mapping(index_data, context)
+    for key in index_data:
+        if key not in INDEX_KEYS:
+            raise SpecError(f"{context}: unknown key {key!r} (expected {', '.join(INDEX_KEYS)})")
+    for key in ("x", "y", "cell_size", "width", "height"):
+        if key not in index_data:
+            raise SpecError(f"{context} needs {key!r}")
+    x, y = (table.columns.get(index_data[key]) for key in ("x", "y"))
+    for key, col in (("x", x), ("y", y)):
+        if col is None:
+            raise SpecError(f"{context}: {key} references undefined column {index_data[key]!r}")
+    if table.is_entity:
+        if 'count' in index_data:
+            raise SpecError(f"{context}: entity tables count their rows themselves; drop 'count'")
+        count, capacity = "count", table.capacity_macro
+    else:
+        # A plain table indexes parallel arrays, the first `count` entries of each.
+        if not (x.is_array and y.is_array) or x.length != y.length:
+            raise SpecError(f"{context}: x and y must be arrays of the same size")
+        count_col = table.columns.get(index_data.get('count'))
+        if count_col is None or count_col.is_array or count_col.type != "int":
+            raise SpecError(f"{context}: 'count' must name an int column holding the number of rows")
+        count, capacity = count_col.name, x.size
+    # Validate every key as an expression over config before evaluating any of them
+    keys = ("cell_size", "width", "height")
+    exprs = {key: config_expr(index_data[key], config, f"{table.name}.index.{key}", integer=False) for key in keys}
+    sizes = {key: eval_number(index_data[key], config, f"{table.name}.index.{key}") for key in keys}
+    cell_size = exprs['cell_size']
+    return Index(x, y, count, cell_size, math.ceil(sizes['width'] / sizes['cell_size']),
+                 math.ceil(sizes['height'] / sizes['cell_size']), capacity, f"{table.name.upper()}_INDEX")
+
+def _compile_table(table_name, table_data, config):
+    _identifier(table_name, "table name")
+    table_data = _mapping(table_data, f"table {table_name!r}")
+    kind = table_data.get('kind', 'table')
+    if kind not in ('table', ENTITY_KIND):
+        raise SpecError(f"table {table_name!r}: unknown kind {kind!r} (expected {ENTITY_KIND!r} or none)")
+    raw_columns = _mapping(table_data.get('columns'), f"table {table_name!r} columns")
+    if not raw_columns:
+        raise SpecError(f"table {table_name!r} has no columns")
+    entity = kind == ENTITY_KIND
+    if entity and 'count' in raw_columns:
+        raise SpecError(f"entity table {table_name!r}: 'count' is reserved for the live row count")
+    columns = {col_name: _compile_column(table_name, col_name, col_type, config, entity)
+               for col_name, col_type in raw_columns.items()}
+    if not entity:
+        table = Table(table_name, kind, columns)
+    elif 'capacity' not in table_data:
+        raise SpecError(f"entity table {table_name!r} needs a capacity")
+    else:
+        context = f"{table_name}.capacity"
+        capacity = config_expr(table_data['capacity'], config, context)
+        table = Table(table_name, kind, columns, capacity, eval_size(table_data['capacity'], config, context))
+    if 'index' in table_data:
+        table.index = _compile_index(table, table_data['index'], config)
+    return table
+
+def _table_refs(func_name, func_data, key, tables):
+    names = func_data.get(key) or []
+    if not isinstance(names, list):
+        raise SpecError(f"function {func_name!r}: {key} must be a list of table names")
+    refs = []
+    for name in names:
+        if name not in tables:
+            raise SpecError(f"function {func_name!r}: {key} references undefined table {name!r}")
+        if tables[name] in refs:
+            raise SpecError(f"function {func_name!r}: {key} lists table {name!r} twice")
+        refs.append(tables[name])
+    return tuple(refs)
+
+def _compile_function(func_name, func_data, tables):
+    _identifier(func_name, "function name")
+    func_data = _mapping(func_data, f"function {func_name!r}")
+    pure = func_data.get('pure', True)
+    if not isinstance(pure, bool):
+        raise SpecError(f"function {func_name!r}: 'pure' must be true or false, got {pure!r}")
+    return Function(func_name, _table_refs(func_name, func_data, 'inputs', tables),
+                    _table_refs(func_name, func_data, 'outputs', tables), pure, func_data.get('body'))
+
+def compile_spec(data):
+    """Validate a parsed spec mapping and build its Spec."""
+    data = _mapping(data, "spec")
+    project_name = data.get('project_name', 'Unnamed Project')
+    if not isinstance(project_name, str) or not project_name:
+        raise SpecError(f"project_name must be a non-empty string, got {project_name!r}")
+
+    config = {}
+    for key, value in _mapping(data.get('config'), "config").items():
+        _identifier(key, "config key")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SpecError(f"config {key!r} must be a number, got {value!r}")
+        config[key] = value
+
+    tables = {}
+    struct_names = {}
+    for table_name, table_data in _mapping(data.get('tables'), "tables").items():
+        table = _compile_table(table_name, table_data, config)
+        other = struct_names.setdefault(table.struct_name, table_name)
+        if other != table_name:
+            raise SpecError(f"tables {other!r} and {table_name!r} both map to struct {table.struct_name}")
+        tables[table_name] = table
+
+    functions = {func_name: _compile_function(func_name, func_data, tables)
+                 for func_name, func_data in _mapping(data.get('functions'), "functions").items()}
+
+    procedures = {}
+    for proc_name, func_list in _mapping(data.get('procedures'), "procedures").items():
+        _identifier(proc_name, "procedure name")
+        if not isinstance(func_list, list):
+            raise SpecError(f"procedure {proc_name!r} must be a list of function names")
+        for func in func_list:
+            if func not in functions:
+                raise SpecError(f"procedure {proc_name!r} calls undefined function {func!r}")
+        procedures[proc_name] = Procedure(proc_name, tuple(functions[func] for func in func_list))
+
+    return Spec(project_name, config, tables, functions, procedures)
+
+def parse_yaml(text):
+    """Parse spec text with libyaml's CSafeLoader when available."""
+    # yaml is only imported when something actually needs parsing, so builds
+    # served from the cache never pay for the import.
+    import yaml
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+def as_spec(data):
+    """Accept a Spec, a parsed mapping or raw YAML text and return a Spec."""
+    if isinstance(data, Spec):
+        return data
+    if isinstance(data, (str, bytes)):
+        data = parse_yaml(data)
+    return compile_spec(data)
+
+_fingerprint = None
+
+def ir_fingerprint():
+    global _fingerprint
+    if _fingerprint is None:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            _fingerprint = f"{IR_VERSION}-{hashlib.sha256(f.read()).hexdigest()[:16]}"
+    return _fingerprint
+
+def load_spec_bytes(spec_bytes, spec_hash=None, cache_dir=SPEC_CACHE_DIR):
+    """Compile spec text, reusing the cached Spec for identical bytes.
+
+    cache_dir=None disables the on-disk cache. A missing, stale or unreadable
+    cache entry just means parsing again.
+    """
+    if cache_dir is None:
+        return as_spec(spec_bytes)
+    if spec_hash is None:
+        spec_hash = hashlib.sha256(spec_bytes).hexdigest()
+    path = os.path.join(cache_dir, f"{spec_hash}-{ir_fingerprint()}.pickle")
+    try:
+        with open(path, 'rb') as f:
+            spec = pickle.load(f)
+        if isinstance(spec, Spec):
+            return spec
+    except Exception:
+        pass
+    spec = as_spec(spec_bytes)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(spec, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # a read-only tree still builds, just without the cache
+    return spec
+
+def load_spec_file(path, cache_dir=SPEC_CACHE_DIR):
+    with open(path, 'rb') as f:
+        return load_spec_bytes(f.read(), cache_dir=cache_dir)
@@ -0,0 +1,18 @@
+"""Regression tests for the build server cache in code_gen.py."""
+import os
+import shutil
+
+from code_gen import SpecCache, handle_request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def test_project_spec_is_reloaded_after_eviction(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(HERE, "pong.yaml"), tmp_path / "pong.yaml")
+    monkeypatch.chdir(tmp_path)
+    pong = (tmp_path / "pong.yaml").read_text()
+    cache = SpecCache(max_entries=2)
+    first = handle_request(cache, {"project": "pong", "target": "c"})
+    for i in range(3):
+        handle_request(cache, {"yaml": f"{pong}\n# edit {i}\n", "target": "c"})
+    assert cache.stats["pong.yaml"][2] not in cache.specs
+    assert handle_request(cache, {"project": "pong", "target": "c"}) == first
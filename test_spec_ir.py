@@ -0,0 +1,56 @@
+"""Regression tests for spec validation in spec_ir.py."""
+import pytest
+
+from spec_ir import SpecError, compile_spec
+
+# Reaches os.system through a class's __init__ globals if the expression is ever
+# handed to Python's eval.
+ESCAPE = ("[c for c in ().__class__.__base__.__subclasses__() if c.__name__ == '_wrap_close'][0]"
+          ".__init__.__globals__['system']('touch {path}')")
+
+def indexed_spec(**index):
+    index = {"x": "x", "y": "y", "cell_size": "cell", "width": 40, "height": 24, **index}
+    return {
+        "project_name": "Indexed",
+        "config": {"cell": 4.0, "cap": 8},
+        "tables": {"parts": {"kind": "entities", "capacity": "cap", "columns": {"x": "float", "y": "float"},
+                             "index": index}},
+    }
+
+@pytest.mark.parametrize("key", ["cell_size", "width", "height"])
+def test_index_expression_is_not_evaluated_as_python(tmp_path, key):
+    marker = tmp_path / "pwned"
+    with pytest.raises(SpecError):
+        compile_spec(indexed_spec(**{key: ESCAPE.format(path=marker)}))
+    assert not marker.exists()
+
+def test_index_accepts_config_expressions():
+    index = compile_spec(indexed_spec(width="cell * 10")).tables["parts"].index
+    assert (index.cols, index.rows, index.cell_size) == (10, 6, "CELL")
+
+def array_spec(size, **config):
+    return {"project_name": "Sized", "config": {"w": 10, "h": 6, **config},
+            "tables": {"grid": {"columns": {"cells": f"array[{size}]"}}}}
+
+def test_array_size_renders_for_c_and_js():
+    col = compile_spec(array_spec("w * h + w // 4 - h % 4")).tables["grid"].columns["cells"]
+    assert col.length == 60 + 2 - 2
+    assert col.size == "W * H + (W - W % 4) / 4 - H % 4"
+
+@pytest.mark.parametrize("size", [
+    "w / 2",                   # float division in Python, integer division in C
+    "f",                       # non-integer config value
+    "f * 2",
+    "w * 2.0",
+    "abs(w)",
+    "w.real",
+    "-w + 20",
+    "w ** 2",
+    "(w - 20) // 3",           # Python and C round negative quotients differently
+    "w % 0",
+    "undefined_key",
+    ESCAPE.format(path="/tmp/never"),
+])
+def test_array_size_rejects(size):
+    with pytest.raises(SpecError):
+        compile_spec(array_spec(size, f=2.5))
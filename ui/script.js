@@ -7,19 +7,23 @@ async function init() {
     await changeProject('pong');
 }
 
+async function loadProjectData(name) {
+    const data = await window.getProjectData(name);
+    projectData[name] = { yaml: data.yaml, md: data.md, version: data.version };
+    return projectData[name];
+}
+
 async function changeProject(name) {
     console.log('Changing project to:', name);
     currentProject = name;
-    if (!projectData[name]) {
-        console.log('Loading project data for:', name);
-        try {
-            const data = await window.getProjectData(name);
-            projectData[name] = { yaml: data.yaml, md: data.md };
-            console.log('Loaded:', name, 'yaml:', data.yaml?.length, 'md:', data.md?.length);
-        } catch (error) {
-            console.error('Error loading project data:', error);
-            return;
-        }
+    // Always ask the backend: it serves sources from memory and keeps them
+    // current as files change, so this never waits on disk.
+    try {
+        await loadProjectData(name);
+        console.log('Loaded:', name, 'yaml:', projectData[name].yaml?.length, 'md:', projectData[name].md?.length);
+    } catch (error) {
+        console.error('Error loading project data:', error);
+        return;
     }
     
     // Update UI
@@ -36,13 +40,15 @@ async function changeProject(name) {
     console.log('Updated previews for:', name);
     
     // Reset canvas so it re-renders
-    canvasData = null;
+    canvasGraph = null;
     const inner = document.getElementById('canvas-inner');
     if (inner) {
         Array.from(inner.children).forEach(c => {
             if (c.id !== 'connections') c.remove();
         });
     }
+    const edgeLayer = document.getElementById('edges');
+    if (edgeLayer) edgeLayer.innerHTML = '';
     
     // Reset game frame
     const iframe = document.getElementById('game-frame');
@@ -76,8 +82,10 @@ async function runCurrentProject() {
     const iframe = document.getElementById('game-frame');
     const loadingText = document.getElementById('loading-text');
 
-    if (iframe.srcdoc && iframe.dataset.project === currentProject) {
-        return; 
+    // Reuse the running game only while its sources are unchanged
+    const version = String((await loadProjectData(currentProject)).version);
+    if (iframe.srcdoc && iframe.dataset.project === currentProject && iframe.dataset.version === version) {
+        return;
     }
 
     loading.style.display = 'flex';
@@ -90,6 +98,7 @@ async function runCurrentProject() {
         } else {
             iframe.srcdoc = html;
             iframe.dataset.project = currentProject;
+            iframe.dataset.version = version;
         }
     } catch (e) {
         alert('Failed to load project: ' + e);
@@ -99,7 +108,10 @@ async function runCurrentProject() {
 }
 
 // Canvas State
-let canvasData = null;
+// canvasGraph is the layout code_gen.py wrote to generated/<name>_graph.json,
+// plus `rendered`, the node elements currently in the DOM by node index.
+let canvasGraph = null;
+let canvasFrame = 0;
 let transform = { x: 50, y: 50, scale: 1.0 };
 let isPanning = false;
 let activeNode = null;
@@ -112,6 +124,7 @@ function applyTransform() {
     inner.style.transform = "translate(" + transform.x + "px, " + transform.y + "px) scale(" + transform.scale + ")";
     const zoomLevel = document.getElementById('zoom-level');
     if (zoomLevel) zoomLevel.textContent = Math.round(transform.scale * 100) + "%";
+    scheduleCanvasUpdate();
 }
 
 function zoom(delta) {
@@ -140,130 +153,118 @@ function resetZoom() {
 }
 
 async function renderCanvas() {
-    if (canvasData) return;
+    if (canvasGraph) {
+        scheduleCanvasUpdate();
+        return;
+    }
 
     const inner = document.getElementById('canvas-inner');
     if (!inner) return;
 
-    // Ensure project data is loaded
-    if (!projectData[currentProject]) {
-        const data = await window.getProjectData(currentProject);
-        projectData[currentProject] = { yaml: data.yaml, md: data.md };
-    }
-
+    // The generator precomputes the layout, so nothing is parsed or measured here
+    const project = currentProject;
+    let graph;
     try {
-        canvasData = jsyaml.load(projectData[currentProject].yaml);
+        const text = await window.getProjectGraph(project);
+        if (text.startsWith('Error')) {
+            console.error('Failed to load graph:', text);
+            return;
+        }
+        graph = JSON.parse(text);
     } catch (e) {
-        console.error('Failed to parse YAML:', e);
+        console.error('Failed to load graph:', e);
         return;
     }
+    if (project !== currentProject) return;
 
-    const tableNodes = {};
-    const functionNodes = {};
-
-    // Layout params
-    const marginX = 100;
-    const marginY = 50;
-    const spacingX = 400;
-    const spacingY = 200;
-
-    // Create Table Nodes
-    let i = 0;
-    for (const tableName in canvasData.tables) {
-        const table = canvasData.tables[tableName];
-        const node = createNode(tableName, 'table', table.columns);
-        node.style.left = marginX + 'px';
-        node.style.top = (marginY + i * spacingY) + 'px';
-        inner.appendChild(node);
-        tableNodes[tableName] = node;
-        i++;
-    }
+    canvasGraph = graph;
+    canvasGraph.rendered = new Map();
+    inner.style.width = graph.width + 'px';
+    inner.style.height = graph.height + 'px';
+    applyTransform();
+}
 
-    // Create Function Nodes
-    i = 0;
-    for (const funcName in canvasData.functions) {
-        const func = canvasData.functions[funcName];
-        const node = createNode(funcName, 'function', { 
-            in: func.inputs?.join(', ') || 'none',
-            out: func.outputs?.join(', ') || 'none'
-        });
-        node.style.left = (marginX + spacingX) + 'px';
-        node.style.top = (marginY + i * (spacingY * 0.8)) + 'px';
-        inner.appendChild(node);
-        functionNodes[funcName] = node;
-        i++;
-    }
+function scheduleCanvasUpdate() {
+    if (canvasGraph && !canvasFrame) canvasFrame = requestAnimationFrame(updateCanvas);
+}
 
-    updateConnections(canvasData, tableNodes, functionNodes);
-    applyTransform();
+// Draws the part of the graph that is inside the viewport, at most once per
+// frame. Node elements come and go in one batch and all visible edges are
+// written with a single innerHTML, so the DOM is never read back in between.
+function updateCanvas() {
+    canvasFrame = 0;
+    const graph = canvasGraph;
+    const container = document.getElementById('canvas-container');
+    const inner = document.getElementById('canvas-inner');
+    const edgeLayer = document.getElementById('edges');
+    if (!graph || !container || !inner || !edgeLayer) return;
+
+    // Viewport in graph coordinates, padded so short pans find nodes ready
+    const pad = 200 / transform.scale;
+    const left = -transform.x / transform.scale - pad;
+    const top = -transform.y / transform.scale - pad;
+    const right = (container.clientWidth - transform.x) / transform.scale + pad;
+    const bottom = (container.clientHeight - transform.y) / transform.scale + pad;
+    const overlaps = (x0, y0, x1, y1) => x1 >= left && x0 <= right && y1 >= top && y0 <= bottom;
+
+    const fragment = document.createDocumentFragment();
+    graph.nodes.forEach((node, i) => {
+        const el = graph.rendered.get(i);
+        if (overlaps(node.x, node.y, node.x + node.w, node.y + node.h)) {
+            if (!el) {
+                const created = createNode(node, i);
+                graph.rendered.set(i, created);
+                fragment.appendChild(created);
+            }
+        } else if (el && el !== activeNode) {
+            el.remove();
+            graph.rendered.delete(i);
+        }
+    });
+    inner.appendChild(fragment);
+
+    let paths = '';
+    for (const edge of graph.edges) {
+        const from = graph.nodes[edge.from];
+        const to = graph.nodes[edge.to];
+        if (!overlaps(Math.min(from.x, to.x), Math.min(from.y, to.y),
+                      Math.max(from.x + from.w, to.x + to.w), Math.max(from.y + from.h, to.y + to.h))) continue;
+        paths += '<path class="connector ' + edge.kind + '" d="' + edgePath(from, to) + '"/>';
+    }
+    edgeLayer.innerHTML = paths;
 }
 
-function createNode(name, type, info) {
+function createNode(node, index) {
     const div = document.createElement('div');
-    div.className = 'node node-' + type;
-    div.id = 'node-' + name;
-    
+    div.className = 'node node-' + node.kind;
+    div.dataset.index = index;
+    div.style.cssText = 'left:' + node.x + 'px;top:' + node.y + 'px;width:' + node.w + 'px;height:' + node.h + 'px';
+
     const h3 = document.createElement('h3');
-    h3.textContent = name;
+    h3.textContent = node.name;
     div.appendChild(h3);
 
     const details = document.createElement('div');
     details.className = 'details';
-    for (const key in info) {
+    for (const line of node.details) {
         const p = document.createElement('div');
-        p.textContent = key + ': ' + info[key];
+        p.textContent = line;
         details.appendChild(p);
     }
     div.appendChild(details);
     return div;
 }
 
-function updateConnections(data, tableNodes, functionNodes) {
-    const svg = document.getElementById('connections');
-    if (!svg) return;
-    Array.from(svg.querySelectorAll('path.connector')).forEach(p => p.remove());
-
-    for (const funcName in data.functions) {
-        const func = data.functions[funcName];
-        const funcEl = functionNodes[funcName];
-
-        if (func.inputs) {
-            func.inputs.forEach(tableName => {
-                const tableEl = tableNodes[tableName];
-                if (tableEl && funcEl) drawArrow(tableEl, funcEl, 'input');
-            });
-        }
-
-        if (func.outputs) {
-            func.outputs.forEach(tableName => {
-                const tableEl = tableNodes[tableName];
-                if (tableEl && funcEl) drawArrow(funcEl, tableEl, 'output');
-            });
-        }
-    }
-}
-
-function drawArrow(fromEl, toEl, type) {
-    const svg = document.getElementById('connections');
-    if (!svg) return;
-    const path = document.createElementNS('http://www.w3.org/2000/svg', 'path');
-    path.setAttribute('class', 'connector ' + type);
-    svg.appendChild(path);
-
-    function updatePath() {
-        const startX = fromEl.offsetLeft + fromEl.offsetWidth;
-        const startY = fromEl.offsetTop + fromEl.offsetHeight / 2;
-        const endX = toEl.offsetLeft;
-        const endY = toEl.offsetTop + toEl.offsetHeight / 2;
-        const cp1x = startX + (endX - startX) / 2;
-        const cp2x = startX + (endX - startX) / 2;
-        const d = 'M ' + startX + ' ' + startY + ' C ' + cp1x + ' ' + startY + ' ' + cp2x + ' ' + endY + ' ' + endX + ' ' + endY;
-        path.setAttribute('d', d);
-    }
-
-    updatePath();
-    fromEl.addEventListener('move', updatePath);
-    toEl.addEventListener('move', updatePath);
+// Curve from the side of `from` facing `to`, so edges back to an earlier
+// layer (a Loop function writing the tables it reads) loop back cleanly.
+function edgePath(from, to) {
+    const forward = to.x >= from.x + from.w;
+    const startX = forward ? from.x + from.w : from.x;
+    const endX = forward ? to.x : to.x + to.w;
+    const startY = from.y + from.h / 2;
+    const endY = to.y + to.h / 2;
+    const midX = (startX + endX) / 2;
+    return 'M ' + startX + ' ' + startY + ' C ' + midX + ' ' + startY + ' ' + midX + ' ' + endY + ' ' + endX + ' ' + endY;
 }
 
 // Event Handling
@@ -273,10 +274,11 @@ document.addEventListener('DOMContentLoaded', () => {
 
     container.addEventListener('mousedown', e => {
         const node = e.target.closest('.node');
-        if (node) {
+        if (node && canvasGraph) {
+            const data = canvasGraph.nodes[node.dataset.index];
             activeNode = node;
-            nodeOffset.x = (e.clientX - container.getBoundingClientRect().left) / transform.scale - node.offsetLeft;
-            nodeOffset.y = (e.clientY - container.getBoundingClientRect().top) / transform.scale - node.offsetTop;
+            nodeOffset.x = (e.clientX - container.getBoundingClientRect().left) / transform.scale - data.x;
+            nodeOffset.y = (e.clientY - container.getBoundingClientRect().top) / transform.scale - data.y;
             node.style.zIndex = 1000;
         } else {
             isPanning = true;
@@ -290,9 +292,12 @@ document.addEventListener('DOMContentLoaded', () => {
             const containerRect = container.getBoundingClientRect();
             let x = (e.clientX - containerRect.left) / transform.scale - nodeOffset.x;
             let y = (e.clientY - containerRect.top) / transform.scale - nodeOffset.y;
+            const data = canvasGraph.nodes[activeNode.dataset.index];
+            data.x = x;
+            data.y = y;
             activeNode.style.left = x + 'px';
             activeNode.style.top = y + 'px';
-            activeNode.dispatchEvent(new CustomEvent('move'));
+            scheduleCanvasUpdate();
         } else if (isPanning) {
             transform.x = e.clientX - dragStart.x;
             transform.y = e.clientY - dragStart.y;
@@ -327,5 +332,7 @@ document.addEventListener('DOMContentLoaded', () => {
         applyTransform();
     }, { passive: false });
 
+    window.addEventListener('resize', scheduleCanvasUpdate);
+
     init();
 });